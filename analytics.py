@@ -1,41 +1,152 @@
-from typing import Dict
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
 from datetime import datetime, date, timedelta, time as dtime
 
 from storage.sqlite_repo import SQLiteSessionRepository
 
 
+@dataclass(frozen=True)
+class TodaySnapshot:
+    """
+    Агрегати за сьогодні, пораховані один раз на версію даних.
+    category_totals — секунди активності (без idle) по категоріях.
+    """
+    day: str
+    version: int
+    category_totals: Dict[str, int] = field(default_factory=dict)
+    active_sec: int = 0
+    break_sec: int = 0
+
+
+# Кеш знімків: db_path -> TodaySnapshot. Спільний для всіх екземплярів
+# AnalyticsService (дашборд, RuleEngine, RecommendationService).
+_SNAPSHOT_CACHE: Dict[str, TodaySnapshot] = {}
+_SNAPSHOT_LOCK = threading.Lock()
+
+
 class AnalyticsService:
 
-    def __init__(self):
-        self.repo = SQLiteSessionRepository()
+    def __init__(self, repo: Optional[SQLiteSessionRepository] = None):
+        self.repo = repo or SQLiteSessionRepository()
+
+        # Джерело живого стану поточної (ще не збереженої) сесії.
+        # Повертає dict з ключами: category, start_ts, idle, break_start_ts.
+        self._live_source: Optional[Callable[[], Optional[dict]]] = None
+
+    def set_live_source(self, source: Optional[Callable[[], Optional[dict]]]) -> None:
+        self._live_source = source
+
+    # ---------- Знімок "сьогодні" ----------
+
+    def get_today_snapshot(self, include_live: bool = False) -> TodaySnapshot:
+        """
+        Повертає знімок за сьогодні. Запити до БД виконуються лише тоді,
+        коли змінилась версія даних або настав новий день.
+        include_live=True — додає поточну сесію / перерву з живого стану воркера.
+        """
+        snapshot = self._get_stored_snapshot()
+        if include_live:
+            snapshot = self._overlay_live(snapshot)
+        return snapshot
+
+    def _get_stored_snapshot(self) -> TodaySnapshot:
+        today = datetime.now().strftime("%Y-%m-%d")
+        version = self.repo.data_version()
+        key = os.path.abspath(self.repo.db_path)
 
-    def get_today_category_minutes(self) -> Dict[str, float]:
+        with _SNAPSHOT_LOCK:
+            cached = _SNAPSHOT_CACHE.get(key)
+        if cached is not None and cached.day == today and cached.version == version:
+            return cached
 
         totals_sec = self.repo.get_today_category_totals()
+        category_totals = {cat: int(sec) for cat, sec in totals_sec.items() if sec > 0}
+        active_sec = int(sum(category_totals.values()))
+
+        start_ts, end_ts = self._today_bounds()
+        summary = self.repo.get_breaks_summary_for_range(start_ts, end_ts)
+        break_sec = int(summary.get("total_duration_sec", 0) or 0)
+
+        snapshot = TodaySnapshot(
+            day=today,
+            version=version,
+            category_totals=category_totals,
+            active_sec=max(active_sec, 0),
+            break_sec=max(break_sec, 0),
+        )
+        with _SNAPSHOT_LOCK:
+            _SNAPSHOT_CACHE[key] = snapshot
+        return snapshot
+
+    def _overlay_live(self, snapshot: TodaySnapshot) -> TodaySnapshot:
+        if self._live_source is None:
+            return snapshot
+        try:
+            live = self._live_source()
+        except Exception:
+            live = None
+        if not live:
+            return snapshot
+
+        start_ts, _ = self._today_bounds()
+        now_ts = int(datetime.now().timestamp())
+
+        totals = dict(snapshot.category_totals)
+        active_sec = snapshot.active_sec
+        break_sec = snapshot.break_sec
+
+        # Поточна сесія: рахуємо лише частину, що припадає на сьогодні
+        session_start = live.get("start_ts")
+        category = live.get("category")
+        if session_start is not None and not live.get("idle"):
+            elapsed = now_ts - max(int(session_start), start_ts)
+            if elapsed > 0:
+                active_sec += elapsed
+                if category:
+                    totals[category] = totals.get(category, 0) + elapsed
+
+        # Перерва, що триває зараз
+        break_start = live.get("break_start_ts")
+        if break_start is not None:
+            elapsed = now_ts - max(int(break_start), start_ts)
+            if elapsed > 0:
+                break_sec += elapsed
+
+        return TodaySnapshot(
+            day=snapshot.day,
+            version=snapshot.version,
+            category_totals=totals,
+            active_sec=active_sec,
+            break_sec=break_sec,
+        )
+
+    @staticmethod
+    def _today_bounds() -> tuple[int, int]:
+        today: date = datetime.now().date()
+        start_dt = datetime.combine(today, dtime.min)
+        end_dt = datetime.combine(today + timedelta(days=1), dtime.min)
+        return int(start_dt.timestamp()), int(end_dt.timestamp())
+
+    # ---------- Публічні агрегати ----------
+
+    def get_today_category_minutes(self, include_live: bool = False) -> Dict[str, float]:
+
+        snapshot = self.get_today_snapshot(include_live=include_live)
         totals_min: Dict[str, float] = {}
-        for cat, sec in totals_sec.items():
+        for cat, sec in snapshot.category_totals.items():
             if sec <= 0:
                 continue
             totals_min[cat] = round(sec / 60.0, 1)
         return totals_min
 
-    def get_today_activity_vs_breaks(self) -> Dict[str, int]:
+    def get_today_activity_vs_breaks(self, include_live: bool = False) -> Dict[str, int]:
 
         # Активність: сумарний час усіх не-idle сесій за сьогодні
-        totals_sec = self.repo.get_today_category_totals()
-        active_sec = int(sum(sec for sec in totals_sec.values() if sec > 0))
-
         # Перерви: всі перерви з таблиці breaks за сьогодні
-        today: date = datetime.now().date()
-        start_dt = datetime.combine(today, dtime.min)
-        end_dt = datetime.combine(today + timedelta(days=1), dtime.min)
-        start_ts = int(start_dt.timestamp())
-        end_ts = int(end_dt.timestamp())
-
-        summary = self.repo.get_breaks_summary_for_range(start_ts, end_ts)
-        break_sec = int(summary.get("total_duration_sec", 0) or 0)
-
+        snapshot = self.get_today_snapshot(include_live=include_live)
         return {
-            "active_sec": max(active_sec, 0),
-            "break_sec": max(break_sec, 0),
+            "active_sec": max(snapshot.active_sec, 0),
+            "break_sec": max(snapshot.break_sec, 0),
         }
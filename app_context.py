@@ -0,0 +1,101 @@
+import time
+from functools import cached_property
+from typing import List, Optional, Tuple
+
+from config.settings import DB_PATH
+
+
+# ======================================================
+#                  ЗАМІРИ СТАРТУ ЗАСТОСУНКУ
+# ======================================================
+
+class StartupTimer:
+    """
+    Тривалість фаз старту (імпорти, вікно, сервіси, трекер, перше
+    заповнення ...) від t0 — моменту, коли почався імпорт головного вікна.
+    """
+
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._last = self.t0
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str, at: Optional[float] = None) -> None:
+        """Завершує фазу, що тривала від попередньої позначки (до at або "зараз")."""
+        now = time.perf_counter() if at is None else at
+        self.phases.append((name, (now - self._last) * 1000.0))
+        self._last = now
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.t0) * 1000.0
+
+    def report(self) -> str:
+        lines = [f"{name:<20}{ms:>9.1f} ms" for name, ms in self.phases]
+        lines.append(f"{'total':<20}{self.total_ms:>9.1f} ms")
+        return "\n".join(lines)
+
+
+# ======================================================
+#               СПІЛЬНІ РЕПОЗИТОРІЇ ТА СЕРВІСИ
+# ======================================================
+
+class AppContext:
+    """
+    Один набір репозиторіїв і сервісів на процес вікна: сторінки та
+    сервіси отримують їх звідси, а не відкривають власні підключення
+    (кожен SQLiteSessionRepository / SettingsRepository — це окрема
+    ініціалізація схеми). Усе створюється при першому зверненні.
+
+    Воркер трекера працює у своєму потоці й тримає власний репозиторій.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = str(db_path or DB_PATH)
+
+    # ---------- Репозиторії ----------
+
+    @cached_property
+    def sqlite_repo(self):
+        from storage.sqlite_repo import SQLiteSessionRepository
+        return SQLiteSessionRepository(self.db_path)
+
+    @cached_property
+    def json_repo(self):
+        from storage.json_repo import JSONRepository
+        return JSONRepository()
+
+    @cached_property
+    def settings_repo(self):
+        from storage.settings_repo import SettingsRepository
+        return SettingsRepository(self.db_path)
+
+    # ---------- Сервіси ----------
+
+    @cached_property
+    def settings(self):
+        # Один SettingsService — зміни зі сторінки налаштувань одразу
+        # бачать усі підписники settings_changed (воркер, вікно)
+        from core.settings_service import SettingsService
+        return SettingsService(self.settings_repo)
+
+    @cached_property
+    def analytics(self):
+        from core.analytics import AnalyticsService
+        return AnalyticsService(self.sqlite_repo)
+
+    @cached_property
+    def recommendations(self):
+        from core.recommendations import RecommendationService
+        return RecommendationService(self.analytics)
+
+    @cached_property
+    def period_analysis(self):
+        from core.period_analysis import PeriodAnalysisService
+        return PeriodAnalysisService(self.recommendations)
+
+    @cached_property
+    def analytics_engine(self):
+        # numpy потрібен лише сторінці статистики
+        from core.columnar_analytics import ColumnarAnalyticsEngine
+        return ColumnarAnalyticsEngine(self.sqlite_repo)
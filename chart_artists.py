@@ -0,0 +1,783 @@
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from core.utils import format_duration_human
+
+
+# Синхронні назви й кольори категорій
+CATEGORY_LABELS = {
+    "work": "робота",
+    "games": "ігри",
+    "media": "медіа",
+    "browsing": "серфінг",
+    "communication": "спілкування",
+    "social": "соцмережі",
+    "education": "навчання",
+    "other": "інше",
+}
+
+CATEGORY_COLORS = {
+    "work": "#4A90E2",
+    "games": "#F5A623",
+    "media": "#7ED321",
+    "browsing": "#50E3C2",
+    "communication": "#BD10E0",
+    "social": "#F8E71C",
+    "education": "#B8E986",
+    "other": "#9B9B9B",
+}
+
+BACKGROUND = "#202020"
+# Не більше стількох підписів по осі днів — решта проріджується
+MAX_DAY_TICKS = 15
+# Скільки готових зображень тримає кеш кожного графіка
+RENDER_CACHE_SIZE = 6
+
+
+# ======================================================
+#                  ЗАМІРИ РЕНДЕРИНГУ
+# ======================================================
+
+@dataclass
+class ChartTiming:
+    """Повні перемальовування та blit-оновлення одного графіка (мс)."""
+    name: str
+    full_draws: int = 0
+    blits: int = 0
+    cache_hits: int = 0
+    total_ms: float = 0.0
+    last_ms: float = 0.0
+
+    def add(self, ms: float, blit: bool, cached: bool = False) -> None:
+        if cached:
+            self.cache_hits += 1
+        elif blit:
+            self.blits += 1
+        else:
+            self.full_draws += 1
+        self.total_ms += ms
+        self.last_ms = ms
+
+    @property
+    def mean_ms(self) -> float:
+        count = self.full_draws + self.blits + self.cache_hits
+        return self.total_ms / count if count else 0.0
+
+
+RENDER_STATS: Dict[str, ChartTiming] = {}
+
+
+def render_report() -> str:
+    lines = [f"{'chart':<16}{'full':>6}{'blit':>6}{'cache':>6}{'mean ms':>10}{'last ms':>10}"]
+    for t in RENDER_STATS.values():
+        lines.append(
+            f"{t.name:<16}{t.full_draws:>6}{t.blits:>6}{t.cache_hits:>6}"
+            f"{t.mean_ms:>10.2f}{t.last_ms:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+# ---------- Кеш готових зображень ----------
+
+class RenderCache:
+    """
+    LRU готових кадрів графіка: ключ стану (період, режим, версія даних)
+    → знімок пікселів canvas (copy_from_bbox). Кадри прив'язані до розміру
+    canvas: після ресайзу / зміни DPI кеш очищається.
+    """
+
+    def __init__(self, capacity: int = RENDER_CACHE_SIZE):
+        self.capacity = capacity
+        self.size: Optional[Tuple[float, ...]] = None
+        self._frames: "OrderedDict[Hashable, object]" = OrderedDict()
+
+    def get(self, key: Hashable, size: Tuple[float, ...]):
+        if size != self.size:
+            self.clear()
+            self.size = size
+            return None
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+        return frame
+
+    def put(self, key: Hashable, size: Tuple[float, ...], frame) -> None:
+        if size != self.size:
+            self.clear()
+            self.size = size
+        self._frames[key] = frame
+        self._frames.move_to_end(key)
+        while len(self._frames) > self.capacity:
+            self._frames.popitem(last=False)
+
+    def clear(self) -> None:
+        self._frames.clear()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+# ---------- Допоміжні ----------
+
+def duration_tick(value, pos) -> str:
+    """Хвилини по осі → людиночитний час."""
+    seconds = int(round(value * 60))
+    if seconds <= 0:
+        return "0"
+    return format_duration_human(seconds)
+
+
+def nice_ceiling(value: float) -> float:
+    # Межа осі "з запасом" на круглому значенні: поки дані ростуть у її
+    # межах, осі й тики не змінюються і оновлення йде через blit
+    if value <= 0:
+        return 1.0
+    return float(MaxNLocator(nbins=5).tick_values(0, value)[-1])
+
+
+def day_label(day: str) -> str:
+    return f"{day[8:10]}.{day[5:7]}"
+
+
+def day_ticks(n: int) -> range:
+    return range(0, n, max(math.ceil(n / MAX_DAY_TICKS), 1))
+
+
+def _style_axes(ax) -> None:
+    ax.set_facecolor(BACKGROUND)
+    ax.grid(True, linestyle="--", alpha=0.3, color="#AAAAAA")
+    ax.tick_params(axis="x", colors="white")
+    ax.tick_params(axis="y", colors="white")
+    ax.spines["bottom"].set_color("white")
+    ax.spines["left"].set_color("white")
+    ax.spines["top"].set_color("#404040")
+    ax.spines["right"].set_color("#404040")
+
+
+def _placeholder(ax, text: str):
+    return ax.text(
+        0.5, 0.5, text,
+        color="white", ha="center", va="center",
+        transform=ax.transAxes, visible=False,
+    )
+
+
+# ======================================================
+#              БАЗА: АРТИСТИ СТВОРЮЮТЬСЯ ОДИН РАЗ
+# ======================================================
+
+class ArtistChart:
+    """
+    Графік на готових Figure + canvas: осі, форматери, кольорова шкала
+    та артисти даних створюються один раз у _build(), а update() лише
+    змінює їхні дані (set_data, set_height, set_array ...).
+
+    _update() повертає ключ розкладки (підписи, межі осей). Якщо він не
+    змінився, перемальовуються тільки анімовані артисти поверх збереженого
+    фону (blit); інакше — повний draw, після якого фон знімається знову.
+    """
+
+    name = "chart"
+
+    def __init__(self, figure: Figure, canvas):
+        self.figure = figure
+        self.canvas = canvas
+        self.timing = RENDER_STATS.setdefault(self.name, ChartTiming(self.name))
+
+        self._animated: List = []
+        self._background = None
+        self._layout_key: Optional[Hashable] = None
+        self.cache = RenderCache()
+
+        self.figure.patch.set_facecolor(BACKGROUND)
+        self._build()
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    # ---------- Для підкласів ----------
+
+    def _build(self) -> None:
+        raise NotImplementedError
+
+    def _update(self, *args, **kwargs) -> Hashable:
+        raise NotImplementedError
+
+    def animate(self, *artists):
+        for artist in artists:
+            artist.set_animated(True)
+            self._animated.append(artist)
+        return artists[0] if len(artists) == 1 else artists
+
+    def _animated_artists(self) -> List:
+        return self._animated
+
+    # ---------- Рендеринг ----------
+
+    def layout_changed(self, key: Hashable) -> bool:
+        return key != self._layout_key
+
+    def update(self, *args, **kwargs) -> None:
+        t0 = time.perf_counter()
+        key = self._update(*args, **kwargs)
+
+        blit = (
+            not self.layout_changed(key)
+            and self._background is not None
+            and getattr(self.canvas, "supports_blit", False)
+        )
+        if blit:
+            self.canvas.restore_region(self._background)
+            self._draw_animated()
+            self.canvas.blit(self.figure.bbox)
+        else:
+            self._layout_key = key
+            self.canvas.draw()
+
+        self.timing.add((time.perf_counter() - t0) * 1000.0, blit)
+
+    def render(self, cache_key: Optional[Hashable], *args, **kwargs) -> None:
+        """
+        update() з кешем кадрів: стан, уже показаний з тим самим cache_key
+        (і тим самим розміром canvas), відновлюється з пікселів без малювання.
+        cache_key=None — без кешу.
+        """
+        if cache_key is None or not getattr(self.canvas, "supports_blit", False):
+            self.update(*args, **kwargs)
+            return
+
+        t0 = time.perf_counter()
+        size = tuple(self.figure.bbox.bounds)
+        frame = self.cache.get(cache_key, size)
+        if frame is None:
+            self.update(*args, **kwargs)
+            self.cache.put(cache_key, size, self.canvas.copy_from_bbox(self.figure.bbox))
+            return
+
+        # Артисти все одно отримують дані — повний draw (ресайз) покаже той самий стан
+        key = self._update(*args, **kwargs)
+        if self.layout_changed(key):
+            self._layout_key = key
+            # фон знято для іншої розкладки — наступне оновлення піде повним draw
+            self._background = None
+        self.canvas.restore_region(frame)
+        self.canvas.blit(self.figure.bbox)
+        self.timing.add((time.perf_counter() - t0) * 1000.0, blit=True, cached=True)
+
+    def _on_draw(self, event) -> None:
+        # повний draw (у т.ч. після ресайзу) — новий фон без анімованих артистів
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self) -> None:
+        for artist in self._animated_artists():
+            if artist.get_visible():
+                self.figure.draw_artist(artist)
+
+
+# ======================================================
+#            СТОВПЧИКИ КАТЕГОРІЙ (ДАШБОРД, СЬОГОДНІ)
+# ======================================================
+
+class CategoryBarChart(ArtistChart):
+
+    name = "category_bars"
+    BAR_WIDTH = 0.8
+
+    def _build(self) -> None:
+        ax = self.ax = self.figure.add_subplot(111)
+        ax.set_facecolor(BACKGROUND)
+        ax.set_autoscale_on(False)
+
+        ax.yaxis.set_major_formatter(FuncFormatter(duration_tick))
+        ax.set_ylabel("Час", color="#FFFFFF")
+        ax.set_title("Час за категоріями (сьогодні)", color="#FFFFFF")
+        ax.tick_params(axis="x", colors="#FFFFFF", rotation=0)
+        ax.tick_params(axis="y", colors="#FFFFFF")
+        ax.grid(axis="y", color="#444444", linestyle="--", linewidth=0.5, alpha=0.7)
+
+        self._empty = ax.text(
+            0.5, 0.5, "Немає даних за сьогодні",
+            ha="center", va="center", fontsize=9, color="#FFFFFF",
+            transform=ax.transAxes, visible=False,
+        )
+
+        # Стовпчик і підпис на категорію — створюються при першій появі
+        self._bars: Dict[str, object] = {}
+        self._labels: Dict[str, object] = {}
+
+        self.figure.subplots_adjust(left=0.12, right=0.98, top=0.9, bottom=0.18)
+
+    def _bar(self, category: str):
+        if category not in self._bars:
+            bar = self.ax.bar([0], [0], width=self.BAR_WIDTH,
+                              color=CATEGORY_COLORS.get(category, "#4A90E2"))[0]
+            label = self.ax.text(0, 0, "", ha="center", va="bottom", fontsize=8, color="#FFFFFF")
+            self._bars[category] = self.animate(bar)
+            self._labels[category] = self.animate(label)
+        return self._bars[category], self._labels[category]
+
+    def _update(self, data: Dict[str, float]) -> Hashable:
+        # впорядкуємо категорії за ключами, щоб кольори були стабільні
+        categories = [k for k in CATEGORY_LABELS if k in data]
+        shown = set(categories)
+        for cat in self._bars:
+            if cat not in shown:
+                self._bars[cat].set_visible(False)
+                self._labels[cat].set_visible(False)
+
+        if not categories:
+            self._empty.set_visible(True)
+            key = ("empty",)
+            if self.layout_changed(key):
+                self.ax.set_xticks([])
+                self.ax.set_yticks([])
+            return key
+
+        self._empty.set_visible(False)
+        values = [data.get(cat, 0.0) for cat in categories]
+        for i, (cat, minutes) in enumerate(zip(categories, values)):
+            bar, label = self._bar(cat)
+            bar.set_x(i - self.BAR_WIDTH / 2)
+            bar.set_height(minutes)
+            bar.set_visible(True)
+            label.set_position((i, minutes))
+            label.set_text(format_duration_human(int(round(minutes * 60))))
+            label.set_visible(True)
+
+        top = nice_ceiling(max(values) * 1.1)
+        key = (tuple(categories), top)
+        if self.layout_changed(key):
+            ax = self.ax
+            ax.set_xticks(range(len(categories)))
+            ax.set_xticklabels([CATEGORY_LABELS.get(c, c) for c in categories])
+            ax.set_xlim(-0.6, len(categories) - 0.4)
+            ax.set_ylim(0, top)
+            ax.yaxis.set_major_locator(MaxNLocator(nbins=5))
+        return key
+
+
+# ======================================================
+#                 ПАЙ-ЧАРТ КАТЕГОРІЙ (ПЕРІОД)
+# ======================================================
+
+def _fmt_minutes_human(m: float) -> str:
+    total_sec = int(m * 60)
+    if total_sec < 60:
+        return f"{total_sec} с"
+    minutes = total_sec // 60
+    hours = minutes // 60
+    minutes = minutes % 60
+    if hours > 0:
+        if minutes > 0:
+            return f"{hours} год {minutes} хв"
+        return f"{hours} год"
+    return f"{minutes} хв"
+
+
+class CategoryPieChart(ArtistChart):
+
+    name = "category_pie"
+    PCT_DISTANCE = 0.6
+
+    def _build(self) -> None:
+        gs = self.figure.add_gridspec(1, 2, width_ratios=[2, 1], wspace=0.01)
+        ax = self.ax = self.figure.add_subplot(gs[0, 0])        # пай-чарт
+        self.leg_ax = self.figure.add_subplot(gs[0, 1])         # легенда
+
+        ax.set_facecolor(BACKGROUND)
+        self.leg_ax.set_facecolor(BACKGROUND)
+        ax.set_frame_on(False)
+        ax.set_xticks([])
+        ax.set_yticks([])
+        # межі як у ax.pie(), коло — через квадратні осі
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylim(-1.1, 1.1)
+        ax.set_aspect("equal")
+        ax.set_title("Час за категоріями", color="white")
+        self.leg_ax.axis("off")
+
+        self._empty = _placeholder(ax, "Немає даних")
+        self._wedges: Dict[str, Wedge] = {}
+        self._pct: Dict[str, object] = {}
+        self._legend = None
+
+        self.figure.subplots_adjust(left=0.02, right=0.98, top=0.88, bottom=0.12)
+
+    def _wedge(self, category: str):
+        if category not in self._wedges:
+            wedge = Wedge((0, 0), 1.0, 90, 90,
+                          facecolor=CATEGORY_COLORS.get(category, CATEGORY_COLORS["other"]),
+                          clip_on=False)
+            self.ax.add_patch(wedge)
+            text = self.ax.text(0, 0, "", color="white", fontsize=9, ha="center", va="center")
+            self._wedges[category] = self.animate(wedge)
+            self._pct[category] = self.animate(text)
+        return self._wedges[category], self._pct[category]
+
+    def _animated_artists(self) -> List:
+        if self._legend is not None:
+            return self._animated + [self._legend]
+        return self._animated
+
+    def _update(self, cat_minutes: Dict[str, float]) -> Hashable:
+        categories = [c for c in cat_minutes if cat_minutes[c] > 0]
+        for cat in self._wedges:
+            if cat not in categories:
+                self._wedges[cat].set_visible(False)
+                self._pct[cat].set_visible(False)
+
+        if not categories:
+            self._empty.set_visible(True)
+            if self._legend is not None:
+                self._legend.set_visible(False)
+            return ("empty",)
+        self._empty.set_visible(False)
+
+        values = [cat_minutes[c] for c in categories]
+        total = sum(values) or 1.0
+
+        angle = 90.0
+        legend_labels = []
+        for cat, val in zip(categories, values):
+            wedge, pct_text = self._wedge(cat)
+            share = val / total
+            theta2 = angle + share * 360.0
+            wedge.set_theta1(angle)
+            wedge.set_theta2(theta2)
+            wedge.set_visible(True)
+
+            mid = math.radians((angle + theta2) / 2.0)
+            pct_text.set_position((self.PCT_DISTANCE * math.cos(mid), self.PCT_DISTANCE * math.sin(mid)))
+            pct_text.set_text(f"{share * 100:.0f}%" if share * 100 >= 5 else "")
+            pct_text.set_visible(True)
+            angle = theta2
+
+            label = CATEGORY_LABELS.get(cat, cat)
+            legend_labels.append(f"{label} — {_fmt_minutes_human(val)} ({share * 100:.0f}%)")
+
+        key = tuple(categories)
+        if self.layout_changed(key) or self._legend is None:
+            if self._legend is not None:
+                self._legend.remove()
+            self._legend = self.leg_ax.legend(
+                [self._wedges[c] for c in categories],
+                legend_labels,
+                loc="center left",
+                bbox_to_anchor=(-0.05, 0.5),
+                fontsize=9,
+                frameon=False,
+            )
+            self._legend.set_animated(True)
+            for txt in self._legend.get_texts():
+                txt.set_color("white")
+        else:
+            for txt, text in zip(self._legend.get_texts(), legend_labels):
+                txt.set_text(text)
+        self._legend.set_visible(True)
+        return key
+
+
+# ======================================================
+#                 ДЕННИЙ ТРЕНД (ОДНА ЛІНІЯ)
+# ======================================================
+
+class DailyTrendChart(ArtistChart):
+
+    name = "daily_trend"
+
+    def _build(self) -> None:
+        ax = self.ax = self.figure.add_subplot(111)
+        _style_axes(ax)
+        ax.set_autoscale_on(False)
+        ax.yaxis.set_major_formatter(FuncFormatter(duration_tick))
+        ax.set_ylabel("Час", color="white")
+
+        self._line = self.animate(ax.plot([], [], marker="o", linewidth=2.0)[0])
+        self._empty = _placeholder(ax, "Немає даних за обраний період")
+
+        self.figure.subplots_adjust(left=0.20, right=0.98, top=0.9, bottom=0.18)
+
+    def _update(
+        self,
+        daily_totals: Dict[str, float],
+        color: str = "#4FC3F7",
+        title: str = "Динаміка активності по днях",
+    ) -> Hashable:
+        ax = self.ax
+        if not daily_totals:
+            self._line.set_visible(False)
+            self._empty.set_visible(True)
+            key = ("empty",)
+            if self.layout_changed(key):
+                ax.set_axis_off()
+            return key
+
+        days = sorted(daily_totals.keys())
+        values = [daily_totals[d] for d in days]
+
+        self._empty.set_visible(False)
+        self._line.set_data(range(len(days)), values)
+        self._line.set_color(color)
+        self._line.set_visible(True)
+
+        top = nice_ceiling(max(values) * 1.15)
+        key = (tuple(days), top, title)
+        if self.layout_changed(key):
+            ax.set_axis_on()
+            ticks = day_ticks(len(days))
+            ax.set_xticks(list(ticks))
+            ax.set_xticklabels([day_label(days[i]) for i in ticks], rotation=0, ha="center", color="white")
+            ax.set_xlim(-0.5, len(days) - 0.5)
+            ax.set_ylim(0, top)
+            ax.set_title(title, color="white")
+        return key
+
+
+# ======================================================
+#              ТРЕНД ПО КАТЕГОРІЯХ (КІЛЬКА ЛІНІЙ)
+# ======================================================
+
+class MultiTrendChart(ArtistChart):
+
+    name = "multi_trend"
+
+    def __init__(self, figure: Figure, canvas, colors: Dict[str, str]):
+        self.colors = colors
+        super().__init__(figure, canvas)
+
+    def _build(self) -> None:
+        ax = self.ax = self.figure.add_subplot(111)
+        ax.set_facecolor("#1e1e1e")
+        self.figure.patch.set_facecolor("#1e1e1e")
+        ax.set_autoscale_on(False)
+        ax.yaxis.set_major_formatter(FuncFormatter(duration_tick))
+        ax.set_ylabel("Час")
+        ax.set_title("Динаміка активності по днях", color="white")
+        ax.tick_params(axis="x", rotation=45, colors="white")
+        ax.tick_params(axis="y", colors="white")
+
+        self._lines: Dict[str, object] = {}
+        self._legend = None
+        self._empty = _placeholder(ax, "Немає даних для побудови графіка")
+
+    def _line(self, category: str):
+        if category not in self._lines:
+            line = self.ax.plot([], [], label=category, linewidth=2, marker="o",
+                                color=self.colors.get(category, "#cccccc"))[0]
+            self._lines[category] = self.animate(line)
+        return self._lines[category]
+
+    def _update(self, daily_totals: Dict[str, Dict[str, float]]) -> Hashable:
+        for line in self._lines.values():
+            line.set_visible(False)
+
+        if not daily_totals:
+            self._empty.set_visible(True)
+            if self._legend is not None:
+                self._legend.set_visible(False)
+            return ("empty",)
+        self._empty.set_visible(False)
+
+        days = sorted(daily_totals.keys())
+        categories = sorted({cat for d in daily_totals.values() for cat in d})
+        x = np.arange(len(days))
+        top = 0.0
+        for cat in categories:
+            values = [daily_totals[day].get(cat, 0) for day in days]
+            line = self._line(cat)
+            line.set_data(x, values)
+            line.set_visible(True)
+            top = max(top, max(values))
+
+        top = nice_ceiling(top * 1.1)
+        key = (tuple(days), tuple(categories), top)
+        if self.layout_changed(key):
+            ax = self.ax
+            ticks = day_ticks(len(days))
+            ax.set_xticks(list(ticks))
+            ax.set_xticklabels([days[i] for i in ticks])
+            ax.set_xlim(-0.5, len(days) - 0.5)
+            ax.set_ylim(0, top)
+            if self._legend is not None:
+                self._legend.remove()
+            self._legend = ax.legend(
+                [self._lines[c] for c in categories], categories,
+                facecolor="#303030", labelcolor="white",
+            )
+            self.figure.tight_layout()
+        self._legend.set_visible(True)
+        return key
+
+
+# ======================================================
+#                 ТЕПЛОВА КАРТА ГОДИНА × ДЕНЬ
+# ======================================================
+
+class HourHeatmapChart(ArtistChart):
+
+    name = "heatmap"
+
+    def _build(self) -> None:
+        ax = self.ax = self.figure.add_subplot(111)
+        ax.set_facecolor(BACKGROUND)
+        ax.set_xlabel("Дні", color="white")
+        ax.set_ylabel("Години доби", color="white")
+        ax.set_title("Активність по годинах", color="white")
+        ax.tick_params(axis="x", colors="white")
+        ax.tick_params(axis="y", colors="white")
+        for spine in ax.spines.values():
+            spine.set_color("#404040")
+
+        self._image = self.animate(
+            ax.imshow(np.zeros((1, 1)), aspect="auto", origin="lower", cmap="magma")
+        )
+        self.figure.subplots_adjust(left=0.18, right=0.98, top=0.9, bottom=0.18)
+
+        # Кольорова шкала — одна на весь час життя сторінки
+        self._cbar = self.figure.colorbar(self._image, ax=ax)
+        self._cbar.set_label("хвилини активності", color="white")
+        self._cbar.ax.yaxis.set_tick_params(color="white", labelcolor="white")
+
+        self._empty = _placeholder(ax, "")
+
+    def show_message(self, text: str) -> None:
+        """Порожній стан (немає даних / немає активних годин)."""
+        t0 = time.perf_counter()
+        key = ("empty", text)
+        self._empty.set_text(text)
+        if self.layout_changed(key):
+            self._empty.set_visible(True)
+            self._image.set_visible(False)
+            self.ax.set_axis_off()
+            self._cbar.ax.set_visible(False)
+            self._layout_key = key
+            self.canvas.draw()
+        self.timing.add((time.perf_counter() - t0) * 1000.0, False)
+
+    def _update(self, matrix: np.ndarray, x_labels: Sequence[str], y_labels: Sequence[str]) -> Hashable:
+        """matrix — години (рядки) × дні (стовпці), хвилини."""
+        rows, cols = matrix.shape
+        self._image.set_data(matrix)
+        self._image.set_extent((-0.5, cols - 0.5, -0.5, rows - 0.5))
+        vmax = nice_ceiling(float(np.nanmax(matrix)) if matrix.size else 0.0)
+        self._image.set_clim(0, vmax)
+        self._image.set_visible(True)
+
+        key = (tuple(x_labels), tuple(y_labels), vmax)
+        if self.layout_changed(key):
+            ax = self.ax
+            self._empty.set_visible(False)
+            ax.set_axis_on()
+            self._cbar.ax.set_visible(True)
+
+            ticks = day_ticks(cols)
+            ax.set_xticks(list(ticks))
+            ax.set_xticklabels([x_labels[i] for i in ticks], rotation=0, ha="center", color="white")
+            ax.set_yticks(range(rows))
+            ax.set_yticklabels(y_labels, color="white")
+            ax.set_xlim(-0.5, cols - 0.5)
+            ax.set_ylim(-0.5, rows - 0.5)
+            self._cbar.update_normal(self._image)
+        return key
+
+
+# ======================================================
+#              БАЛАНС АКТИВНІСТЬ / ПЕРЕРВИ (ПЕРІОД)
+# ======================================================
+
+def _fmt_seconds(sec: int) -> str:
+    if sec < 60:
+        return f"{sec} с"
+    m = sec // 60
+    h = m // 60
+    m = m % 60
+    if h > 0:
+        return f"{h} год {m} хв"
+    return f"{m} хв"
+
+
+class BalanceBarChart(ArtistChart):
+
+    name = "balance_bar"
+    # Y-позиції (дві тонкі смуги)
+    Y_POS = (0.7, 0.2)
+    BAR_HEIGHT = 0.18
+
+    def _build(self) -> None:
+        ax = self.ax = self.figure.add_subplot(111)
+        ax.set_facecolor(BACKGROUND)
+        ax.set_autoscale_on(False)
+        ax.set_yticks([])
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.set_xlabel("")
+        ax.set_title("Баланс активність / перерви", color="white", pad=8)
+        ax.grid(True, axis="x", linestyle="--", alpha=0.25, color="#AAAAAA")
+        ax.tick_params(axis="x", colors="white")
+        for spine in ax.spines.values():
+            spine.set_color("#404040")
+
+        self._active_bar = self.animate(
+            ax.barh(self.Y_POS[0], 0, height=self.BAR_HEIGHT, color="#4CAF50")[0]
+        )
+        self._break_bar = self.animate(
+            ax.barh(self.Y_POS[1], 0, height=self.BAR_HEIGHT, color="#B0BEC5")[0]
+        )
+        text_kw = dict(va="center", color="white", fontsize=9)
+        self._active_text = self.animate(ax.text(0, self.Y_POS[0], "", **text_kw))
+        self._break_text = self.animate(ax.text(0, self.Y_POS[1], "", **text_kw))
+        # Підпис під графіком
+        self._caption = self.animate(
+            ax.text(0.5, -0.32, "", ha="center", va="center", color="white", fontsize=9)
+        )
+        self._empty = _placeholder(ax, "Немає даних")
+
+        self.figure.subplots_adjust(left=0.10, right=0.95, top=0.80, bottom=0.32)
+
+    @staticmethod
+    def _place(text, pct: float, label: str) -> None:
+        inside = pct > 0.15
+        text.set_x(pct - 0.02 if inside else pct + 0.02)
+        text.set_ha("right" if inside else "left")
+        text.set_text(f"{label} — {pct * 100:.0f}%")
+
+    def _update(self, active_sec: int, break_sec: int) -> Hashable:
+        total = active_sec + break_sec
+        data_artists = (self._active_bar, self._break_bar, self._active_text,
+                        self._break_text, self._caption)
+
+        if total <= 0:
+            for artist in data_artists:
+                artist.set_visible(False)
+            self._empty.set_visible(True)
+            key = ("empty",)
+            if self.layout_changed(key):
+                self.ax.set_axis_off()
+            return key
+
+        active_pct = active_sec / total
+        break_pct = break_sec / total
+
+        self._empty.set_visible(False)
+        for artist in data_artists:
+            artist.set_visible(True)
+        self._active_bar.set_width(active_pct)
+        self._break_bar.set_width(break_pct)
+        self._place(self._active_text, active_pct, "Активність")
+        self._place(self._break_text, break_pct, "Перерви")
+        self._caption.set_text(
+            f"За період: {_fmt_seconds(active_sec)} активності, {_fmt_seconds(break_sec)} перерв "
+            f"({break_pct * 100:.0f}%)."
+        )
+
+        key = ("data",)
+        if self.layout_changed(key):
+            self.ax.set_axis_on()
+        return key
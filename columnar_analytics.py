@@ -0,0 +1,325 @@
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from datetime import date, datetime, timedelta, time as dtime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.hour_split import (
+    day_number,
+    heatmap_to_dict,
+    local_offsets,
+    split_by_hour,
+)
+from storage.sqlite_repo import SQLiteSessionRepository
+
+
+TOP_APPS_LIMIT = 50
+
+
+class AnalyticsCancelled(Exception):
+    """Обчислення скасовано: результат уже нікому не потрібен."""
+
+
+# ======================================================
+#                 КОЛОНКОВЕ ПРЕДСТАВЛЕННЯ
+# ======================================================
+
+@dataclass(frozen=True)
+class SessionColumns:
+    """
+    Сесії діапазону у вигляді паралельних NumPy-масивів.
+    start — epoch-секунди (UTC), local_start — ті самі секунди в локальному
+    часі (для групування по днях / годинах без datetime).
+    app / title / category — інтерновані id, назви у відповідних списках.
+    """
+    start: np.ndarray
+    local_start: np.ndarray
+    duration: np.ndarray
+    category: np.ndarray
+    app: np.ndarray
+    title: np.ndarray
+    idle: np.ndarray
+    app_names: Tuple[str, ...] = ()
+    title_names: Tuple[str, ...] = ()
+    category_names: Tuple[str, ...] = ()
+
+    def __len__(self) -> int:
+        return int(self.start.shape[0])
+
+
+@dataclass(frozen=True)
+class RangeAnalytics:
+    """Результат обчислення аналітики за період (одним об'єктом)."""
+    start_day: date
+    end_day: date
+    days: Tuple[str, ...]                          # усі дні діапазону, "YYYY-MM-DD"
+    cat_minutes: Dict[str, float]
+    apps: List[Tuple[str, str, str, float]]        # (app, title, category, minutes)
+    daily_totals: Dict[str, float]                 # лише дні з активністю
+    heatmap: np.ndarray                            # днів × 24, хвилини (без idle)
+    breaks: List[Dict]
+    breaks_count: int
+    breaks_total_sec: int
+    breaks_by_hour: np.ndarray                     # 24 значення, хвилини
+    columns: Optional[SessionColumns] = field(default=None, repr=False)
+    elapsed_ms: float = 0.0
+
+    def daily_totals_for(
+        self,
+        category: Optional[str] = None,
+        app: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """Денний ряд (хвилини) з фільтром за категорією або застосунком."""
+        cols = self.columns
+        if cols is None or len(cols) == 0:
+            return {}
+
+        mask = ~cols.idle & _starts_in_range(cols, self.start_day)
+        if category is not None:
+            if category not in cols.category_names:
+                return {}
+            mask &= cols.category == cols.category_names.index(category)
+        if app is not None:
+            if app not in cols.app_names:
+                return {}
+            mask &= cols.app == cols.app_names.index(app)
+
+        series = _daily_minutes(cols, mask, self.start_day, len(self.days))
+        return _series_to_dict(self.days, series)
+
+    @property
+    def heatmap_data(self) -> Dict[str, Dict[int, float]]:
+        """heatmap у форматі day -> {hour: minutes} (для AI-звіту; графік бере матрицю)."""
+        return heatmap_to_dict(self.days, self.heatmap)
+
+
+# ======================================================
+#                  ДОПОМІЖНІ ФУНКЦІЇ
+# ======================================================
+
+def _decode(
+    ids: np.ndarray,
+    fetch: Callable[[List[int]], Dict[int, str]],
+    default: str = "",
+) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """
+    id з довідника → щільні коди 0..k-1 та їх назви. Робота з рядками
+    відбувається лише над унікальними id, а не над кожним рядком; з
+    довідника (fetch) читаються лише вони.
+    Різні id з однаковою назвою (наприклад, "" і "other") зливаються.
+    """
+    if ids.size == 0:
+        return np.zeros(0, dtype=np.int32), ()
+    uniq, inverse = np.unique(ids, return_inverse=True)
+    dimension = fetch(uniq.tolist())
+    labels = np.array([dimension.get(int(i)) or default for i in uniq], dtype=object)
+    names, remap = np.unique(labels, return_inverse=True)
+    return remap[inverse].astype(np.int32), tuple(str(n) for n in names)
+
+
+def _starts_in_range(cols: SessionColumns, start_day: date) -> np.ndarray:
+    # Колонки містять і попередній день (для сесій, що перетинають північ
+    # на початку діапазону) — агрегати "за днем старту" його не враховують.
+    return cols.local_start >= day_number(start_day) * 86400
+
+
+def _daily_minutes(cols: SessionColumns, mask: np.ndarray, start_day: date, n_days: int) -> np.ndarray:
+    day_idx = cols.local_start[mask] // 86400 - day_number(start_day)
+    dur = cols.duration[mask]
+    inside = (day_idx >= 0) & (day_idx < n_days)
+    return np.bincount(day_idx[inside], weights=dur[inside], minlength=n_days)[:n_days] / 60.0
+
+
+def _series_to_dict(days: Tuple[str, ...], minutes: np.ndarray) -> Dict[str, float]:
+    nz = np.nonzero(minutes > 0)[0]
+    return {days[i]: float(minutes[i]) for i in nz}
+
+
+# ======================================================
+#                      ENGINE
+# ======================================================
+
+class ColumnarAnalyticsEngine:
+    """
+    Завантажує сесії діапазону один раз у NumPy-колонки та рахує всю
+    аналітику сторінки статистики векторно.
+    """
+
+    def __init__(self, repo: Optional[SQLiteSessionRepository] = None):
+        self.repo = repo or SQLiteSessionRepository()
+
+    # ---------- Завантаження ----------
+
+    def load_columns(self, start_day: date, end_day: date) -> SessionColumns:
+        # + попередній день: його сесії можуть заходити в діапазон після півночі
+        rows = self.repo.get_session_rows(
+            (start_day - timedelta(days=1)).strftime("%Y-%m-%d"),
+            end_day.strftime("%Y-%m-%d"),
+        )
+        if not rows:
+            empty_i = np.zeros(0, dtype=np.int64)
+            return SessionColumns(
+                start=empty_i,
+                local_start=empty_i,
+                duration=empty_i,
+                category=np.zeros(0, dtype=np.int32),
+                app=np.zeros(0, dtype=np.int32),
+                title=np.zeros(0, dtype=np.int32),
+                idle=np.zeros(0, dtype=bool),
+            )
+
+        starts, durations, categories, apps, titles, idles = zip(*rows)
+
+        # epoch (UTC) → локальні секунди для групування по днях / годинах
+        start = np.array(starts, dtype=np.int64)
+        local_start = start + local_offsets(start)
+
+        # з довідників читаються лише id, що є в діапазоні
+        category, category_names = _decode(
+            np.array(categories, dtype=np.int64),
+            partial(self.repo.get_dimension, "categories"),
+            "other",
+        )
+        app, app_names = _decode(
+            np.array(apps, dtype=np.int64), partial(self.repo.get_dimension, "apps")
+        )
+        title, title_names = _decode(
+            np.array(titles, dtype=np.int64), partial(self.repo.get_dimension, "titles")
+        )
+
+        return SessionColumns(
+            start=start,
+            local_start=local_start,
+            duration=np.array(durations, dtype=np.int64),
+            category=category,
+            app=app,
+            title=title,
+            idle=np.array(idles, dtype=bool),
+            app_names=app_names,
+            title_names=title_names,
+            category_names=category_names,
+        )
+
+    # ---------- Обчислення ----------
+
+    def compute(
+        self,
+        start_day: date,
+        end_day: date,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> RangeAnalytics:
+        """cancelled() перевіряється між завантаженням і агрегацією (AnalyticsCancelled)."""
+        t0 = time.perf_counter()
+
+        cols = self.load_columns(start_day, end_day)
+        if cancelled is not None and cancelled():
+            raise AnalyticsCancelled()
+        n_days = (end_day - start_day).days + 1
+        days = tuple(
+            (start_day + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)
+        )
+        first_day = day_number(start_day)
+        in_range = _starts_in_range(cols, start_day)
+        active = ~cols.idle
+
+        # --- категорії (як і раніше — разом з idle-сесіями) ---
+        cat_sec = np.bincount(
+            cols.category[in_range],
+            weights=cols.duration[in_range],
+            minlength=len(cols.category_names),
+        )
+        cat_minutes = {
+            cols.category_names[i]: float(cat_sec[i]) / 60.0
+            for i in range(len(cols.category_names))
+            if cat_sec[i] > 0
+        }
+
+        # --- топ застосунків за (app, title, category) ---
+        apps = self._top_apps(cols, in_range)
+
+        # --- денний ряд (за днем старту) ---
+        daily = _daily_minutes(cols, active & in_range, start_day, n_days)
+        daily_totals = _series_to_dict(days, daily)
+
+        # --- теплова карта: точний розподіл по годинах, без idle ---
+        heatmap = split_by_hour(
+            cols.local_start[active], cols.duration[active], first_day, n_days
+        ) / 60.0
+
+        # --- перерви ---
+        if cancelled is not None and cancelled():
+            raise AnalyticsCancelled()
+        breaks, breaks_by_hour = self._breaks(start_day, end_day, first_day, n_days)
+        breaks_total_sec = int(sum(br["duration_sec"] or 0 for br in breaks))
+
+        return RangeAnalytics(
+            start_day=start_day,
+            end_day=end_day,
+            days=days,
+            cat_minutes=cat_minutes,
+            apps=apps,
+            daily_totals=daily_totals,
+            heatmap=heatmap,
+            breaks=breaks,
+            breaks_count=len(breaks),
+            breaks_total_sec=breaks_total_sec,
+            breaks_by_hour=breaks_by_hour,
+            columns=cols,
+            elapsed_ms=(time.perf_counter() - t0) * 1000.0,
+        )
+
+    def _top_apps(self, cols: SessionColumns, mask: np.ndarray) -> List[Tuple[str, str, str, float]]:
+        if not mask.any():
+            return []
+
+        n_titles = max(len(cols.title_names), 1)
+        n_cats = max(len(cols.category_names), 1)
+        key = (
+            (cols.app[mask].astype(np.int64) * n_titles + cols.title[mask]) * n_cats
+            + cols.category[mask]
+        )
+
+        uniq, inverse = np.unique(key, return_inverse=True)
+        totals = np.bincount(inverse, weights=cols.duration[mask], minlength=uniq.size)
+
+        order = np.argsort(-totals, kind="stable")[:TOP_APPS_LIMIT]
+        result: List[Tuple[str, str, str, float]] = []
+        for i in order:
+            k = int(uniq[i])
+            cat_id = k % n_cats
+            title_id = (k // n_cats) % n_titles
+            app_id = k // (n_cats * n_titles)
+            result.append(
+                (
+                    cols.app_names[app_id],
+                    cols.title_names[title_id] if cols.title_names else "",
+                    cols.category_names[cat_id],
+                    float(totals[i]) / 60.0,
+                )
+            )
+        return result
+
+    def _breaks(
+        self,
+        start_day: date,
+        end_day: date,
+        first_day: int,
+        n_days: int,
+    ) -> Tuple[List[Dict], np.ndarray]:
+        start_ts = int(datetime.combine(start_day, dtime.min).timestamp())
+        end_ts = int(datetime.combine(end_day + timedelta(days=1), dtime.min).timestamp())
+
+        breaks = self.repo.get_breaks_for_range(start_ts, end_ts)
+        if not breaks:
+            return breaks, np.zeros(24, dtype=np.float64)
+
+        b_start = np.fromiter((br["start_ts"] for br in breaks), dtype=np.int64, count=len(breaks))
+        b_dur = np.fromiter(
+            (br["duration_sec"] or 0 for br in breaks), dtype=np.int64, count=len(breaks)
+        )
+        b_local = b_start + local_offsets(b_start)
+
+        by_hour = split_by_hour(b_local, b_dur, first_day, n_days).sum(axis=0) / 60.0
+        return breaks, by_hour
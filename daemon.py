@@ -0,0 +1,345 @@
+"""
+Headless-трекер без Qt: той самий конвеєр (core.pipeline), що й у GUI —
+опитування проби, SessionBuilder, класифікація, збереження в ту саму БД
+і перевірка лімітів.
+
+    python -m core.daemon [--db PATH] [--probe auto|windows|x11|synthetic]
+
+Поки демон працює, GUI не запускає власний BackgroundWorker, а лише
+під'єднується до нього як переглядач (services.daemon_viewer) через
+файл стану поруч з БД. Трекати одну БД може лише один процес —
+демон або GUI, хто першим узяв TrackerLock.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from typing import Optional
+
+from config.settings import DB_PATH, TRACE_CAPACITY, TRACE_PATH, TRACK_INTERVAL
+from core.analytics import AnalyticsService
+from core.classifier import Classifier
+from core.pipeline import TrackingPipeline
+from core.poll_scheduler import AdaptiveScheduler
+from core.probe_trace import TraceRecorder
+from core.probes import WindowProbe, select_probe
+from core.rule_engine import RuleEngine
+from core.session_builder import SessionBuilder, TickResult
+from core.session_compaction import DEFAULT_MERGE_GAP_SEC
+from storage.json_repo import JSONRepository
+from storage.settings_repo import SettingsRepository
+from storage.sqlite_repo import SQLiteSessionRepository
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+DAEMON_STATUS_SUFFIX = ".daemon.json"
+TRACKER_LOCK_SUFFIX = ".tracker.lock"
+
+# Як часто перечитувати налаштування, змінені з GUI (с)
+SETTINGS_POLL_SEC = 10.0
+
+# Інтервал heartbeat у файлі стану (с); переглядач чекає три пропущені
+HEARTBEAT_SEC = 5.0
+
+log = logging.getLogger(__name__)
+
+
+# ======================================================
+#                    ФАЙЛ СТАНУ
+# ======================================================
+
+def status_path(db_path: str = DB_PATH) -> str:
+    return os.path.abspath(db_path) + DAEMON_STATUS_SUFFIX
+
+
+def read_status(db_path: str = DB_PATH) -> Optional[dict]:
+    """
+    Стан працюючого демона або None, якщо демон не запущений
+    (немає файлу, процес завершився або heartbeat застарів).
+    """
+    try:
+        with open(status_path(db_path), "r", encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - float(status.get("heartbeat", 0)) > float(status.get("stale_after", 0)):
+        return None
+    if psutil is not None and not psutil.pid_exists(int(status.get("pid", 0))):
+        return None
+    return status
+
+
+def _write_status(path: str, status: dict) -> None:
+    # атомарна заміна: переглядач ніколи не читає напівзаписаний файл
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ======================================================
+#                ОДИН ТРЕКЕР НА БАЗУ ДАНИХ
+# ======================================================
+
+class TrackerLock:
+    """
+    Ексклюзивне блокування файлу поруч з БД. Його бере і демон, і
+    власний BackgroundWorker GUI: хто б не стартував першим, другий
+    трекер не запускається і не пише дублікати сесій. ОС знімає
+    блокування разом із процесом, навіть після аварійного завершення.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, owner: str = "daemon"):
+        self.path = os.path.abspath(db_path) + TRACKER_LOCK_SUFFIX
+        self.owner = owner
+        self._file = None
+
+    def acquire(self) -> bool:
+        """False — БД уже трекає інший процес."""
+        if self._file is not None:
+            return True
+        f = open(self.path, "a+b")
+        try:
+            _lock_file(f)
+        except OSError:
+            f.close()
+            return False
+
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps({"pid": os.getpid(), "owner": self.owner}).encode("utf-8"))
+        f.flush()
+        self._file = f
+        return True
+
+    def held(self) -> bool:
+        return self._file is not None
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            _unlock_file(self._file)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def holder(self) -> Optional[dict]:
+        """{"pid", "owner"} процесу, що тримає блокування (якщо відомо)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def _lock_file(f) -> None:
+    f.seek(0)
+    if os.name == "nt":
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock_file(f) -> None:
+    f.seek(0)
+    if os.name == "nt":
+        import msvcrt
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# ======================================================
+#                       DAEMON
+# ======================================================
+
+class TrackerDaemon:
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        probe: Optional[WindowProbe] = None,
+        interval: int = TRACK_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.status_file = status_path(db_path)
+        self.scheduler = AdaptiveScheduler(base_interval=interval)
+
+        # ---------- Сервіси ----------
+        self.probe = probe or select_probe()
+        self.settings_repo = SettingsRepository(db_path)
+        self.repo = JSONRepository()
+        self.sqlite_repo = SQLiteSessionRepository(db_path)
+        self.classifier = Classifier()
+        analytics = AnalyticsService(self.sqlite_repo)
+        analytics.set_live_source(lambda: self._live_state)
+        self.rule_engine = RuleEngine(analytics)
+        self.recorder: Optional[TraceRecorder] = (
+            TraceRecorder(TRACE_PATH, TRACE_CAPACITY) if TRACE_PATH else None
+        )
+
+        self.builder = SessionBuilder(classify=None)
+        self._settings: dict = {}
+        self._settings_loaded_at = 0.0
+        self._reload_settings()
+
+        self.pipeline = TrackingPipeline(
+            sample=self.probe.sample,
+            builder=self.builder,
+            classify=self.classifier.classify,
+            sqlite_repo=self.sqlite_repo,
+            json_repo=self.repo,
+            scheduler=self.scheduler,
+            rule_engine=self.rule_engine,
+            recorder=self.recorder,
+            on_activity=self._publish,
+            on_session=self._on_session,
+            on_rule=self._notify,
+            on_tick=self._on_tick,
+            on_heartbeat=self._heartbeat,
+            heartbeat_sec=HEARTBEAT_SEC,
+        )
+
+        self._started_at = time.time()
+        self._sessions_written = 0
+        self._last_session: Optional[dict] = None
+        # Останнє сповіщення — переглядач показує його тостом (seq змінився)
+        self._last_notification: Optional[dict] = None
+        self._live_state: Optional[dict] = None
+        self._activity: Optional[dict] = None
+
+    # ---------- Налаштування ----------
+
+    def _reload_settings(self) -> None:
+        """Ті самі ключі й значення за замовчуванням, що й у SettingsService."""
+        settings = self.settings_repo.all()
+        self._settings_loaded_at = time.monotonic()
+        if settings == self._settings:
+            return
+        self._settings = settings
+
+        self.builder.idle_timeout = settings.get("idle_timeout_sec", 300)
+        self.builder.min_session_sec = settings.get("session_min_duration_sec", 10)
+        self.builder.passive_categories = list(settings.get("passive_allowed_categories", ["media"]))
+        apps = list(settings.get("passive_allowed_apps", ["vlc.exe", "mpv.exe"]))
+        if apps != self.builder.passive_apps:
+            self.builder.passive_apps = apps
+        self.sqlite_repo.merge_gap_sec = settings.get("session_merge_gap_sec", DEFAULT_MERGE_GAP_SEC)
+
+    # ---------- Цикл ----------
+
+    def run(self) -> None:
+        log.info("probe=%s db=%s", self.probe.name, os.path.abspath(self.db_path))
+        try:
+            asyncio.run(self.pipeline.run())
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+            try:
+                os.remove(self.status_file)
+            except OSError:
+                pass
+
+    def stop(self, *_args) -> None:
+        self.pipeline.stop()
+
+    # ---------- Колбеки конвеєра ----------
+
+    def _on_tick(self) -> None:
+        if time.monotonic() - self._settings_loaded_at >= SETTINGS_POLL_SEC:
+            self._reload_settings()
+
+    def _on_session(self, session: dict) -> None:
+        self._sessions_written += 1
+        self._last_session = session
+
+    def _notify(self, text: str, level: str) -> None:
+        # Без GUI тости показати нікому — журнал і файл стану для переглядача
+        log.warning("%s: %s", level, text)
+        seq = (self._last_notification or {}).get("seq", 0) + 1
+        self._last_notification = {"seq": seq, "text": text, "level": level}
+
+    def _publish(self, result: TickResult) -> None:
+        # новий знімок видно переглядачу одразу, не чекаючи heartbeat
+        self._live_state = result.live_state
+        self._activity = result.activity
+        self._heartbeat()
+
+    def _heartbeat(self) -> None:
+        _write_status(
+            self.status_file,
+            {
+                "pid": os.getpid(),
+                "probe": self.probe.name,
+                "started_at": self._started_at,
+                "heartbeat": time.time(),
+                # переглядач вважає демон мертвим, якщо heartbeat старший за це
+                "stale_after": HEARTBEAT_SEC * 3,
+                "activity": self._activity,
+                "live_state": self._live_state,
+                "sessions_written": self._sessions_written,
+                "data_version": self.sqlite_repo.data_version(),
+                "month_versions": self.sqlite_repo.month_versions(),
+                "last_session": self._last_session,
+                "last_notification": self._last_notification,
+                "pipeline": self.pipeline.metrics(),
+            },
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless activity tracker")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite-файл (той самий, що й у GUI)")
+    parser.add_argument("--probe", default=None, help="auto | windows | x11 | synthetic")
+    parser.add_argument("--interval", type=int, default=TRACK_INTERVAL)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if read_status(args.db) is not None:
+        log.error("already running for %s", os.path.abspath(args.db))
+        return 1
+
+    # GUI з власним воркером теж тримає це блокування
+    lock = TrackerLock(args.db, owner="daemon")
+    if not lock.acquire():
+        log.error("already tracking %s %s", os.path.abspath(args.db), lock.holder() or "")
+        return 1
+
+    try:
+        probe = select_probe(args.probe)
+    except RuntimeError as e:
+        log.error("cannot track: %s", e)
+        lock.release()
+        return 1
+
+    try:
+        daemon = TrackerDaemon(args.db, probe=probe, interval=args.interval)
+        # стискання закритих місяців — справа власника блокування
+        daemon.sqlite_repo.compact_closed_months()
+        signal.signal(signal.SIGINT, daemon.stop)
+        signal.signal(signal.SIGTERM, daemon.stop)
+        daemon.run()
+    except RuntimeError as e:
+        # причину вже записав етап, що впав
+        log.error("tracker stopped: %s", e)
+        return 1
+    finally:
+        lock.release()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from core.daemon import read_status
+from core.session_builder import ActivityDelta
+from storage.sqlite_repo import SQLiteSessionRepository
+
+from typing import Optional
+
+
+class DaemonViewer(QObject):
+    """
+    GUI як переглядач headless-демона (core.daemon): читає його файл
+    стану і видає ті самі сигнали, що й BackgroundWorker, тож MainWindow
+    не розрізняє, хто саме трекає активність.
+    """
+
+    session_completed = pyqtSignal(dict)
+    current_activity = pyqtSignal(dict)
+    rule_triggered = pyqtSignal(str, str)
+    # Демон зупинився — вікно може запустити власний воркер
+    detached = pyqtSignal()
+
+    POLL_MS = 1000
+
+    def __init__(self, db_path: str, repo: SQLiteSessionRepository, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.repo = repo
+
+        self._live_state: Optional[dict] = None
+        self._sessions_seen: Optional[int] = None
+        self._version_seen: Optional[int] = None
+        self._months_seen: Optional[dict] = None
+        self._notification_seen: Optional[int] = None
+        self._activity_delta = ActivityDelta()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.POLL_MS)
+        self._timer.timeout.connect(self._poll)
+
+    def get_live_state(self) -> Optional[dict]:
+        return self._live_state
+
+    def start(self) -> None:
+        self._poll()
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def _poll(self) -> None:
+        status = read_status(self.db_path)
+        if status is None:
+            self._live_state = None
+            self.stop()
+            self.detached.emit()
+            return
+
+        self._live_state = status.get("live_state")
+
+        # Сесії / перерви записав інший процес — кеші аналітики мають перечитати БД
+        # (лише змінені місяці, щоб не скидати кеші закритих періодів)
+        version = status.get("data_version")
+        months = status.get("month_versions")
+        if self._version_seen is not None and version != self._version_seen:
+            changed = None
+            if isinstance(months, dict) and self._months_seen is not None:
+                changed = [m for m, v in months.items() if self._months_seen.get(m) != v]
+            self.repo.notify_external_change(changed)
+        self._version_seen = version
+        self._months_seen = months if isinstance(months, dict) else None
+
+        written = int(status.get("sessions_written", 0))
+        if self._sessions_seen is not None and written != self._sessions_seen:
+            last = status.get("last_session")
+            if last:
+                self.session_completed.emit(dict(last))
+        self._sessions_seen = written
+
+        # Ліміти перевіряє демон; тут лише показуємо нове сповіщення
+        notification = status.get("last_notification") or {}
+        seq = int(notification.get("seq", 0))
+        if self._notification_seen is not None and seq != self._notification_seen:
+            self.rule_triggered.emit(notification.get("text", ""), notification.get("level", ""))
+        self._notification_seen = seq
+
+        activity = status.get("activity")
+        if activity:
+            delta = self._activity_delta.diff(activity)
+            if delta is not None:
+                self.current_activity.emit(delta)
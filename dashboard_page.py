@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
 
 from PyQt6.QtWidgets import (
@@ -15,7 +15,6 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 
-from ui.components.category_chart import CategoryChartWidget
 from core.utils import format_duration_human
 
 
@@ -116,10 +115,15 @@ class DashboardPage(QWidget):
         left_col_layout.addWidget(self.current_frame, 3)
         left_col_layout.addWidget(self.balance_frame, 1)
 
-        self.chart_widget = CategoryChartWidget()
+        # Графік (а з ним і matplotlib) створюється з першими даними,
+        # тобто вже після показу вікна — див. update_category_chart()
+        self.chart_widget: Optional[QWidget] = None
+        self._chart_slot = QWidget()
+        self._chart_slot_layout = QVBoxLayout(self._chart_slot)
+        self._chart_slot_layout.setContentsMargins(0, 0, 0, 0)
 
         top_layout.addWidget(left_col_widget, 1)
-        top_layout.addWidget(self.chart_widget, 2)
+        top_layout.addWidget(self._chart_slot, 2)
 
         # -------- Нижній рядок: таблиця + рекомендації --------
 
@@ -244,9 +248,7 @@ class DashboardPage(QWidget):
         cat_text = category if category else "—"
         self.lbl_category.setText(f"Категорія: {cat_text}")
 
-        self.lbl_duration.setText(
-            f"Тривалість: {self._format_duration(duration_sec)}"
-        )
+        self.update_current_duration(duration_sec)
 
         if is_idle:
             self.lbl_idle.setText("Статус: перерва / idle")
@@ -255,6 +257,12 @@ class DashboardPage(QWidget):
             self.lbl_idle.setText("Статус: активний")
             self.lbl_idle.setStyleSheet("color: #a0ffa0;")
 
+    def update_current_duration(self, duration_sec: int):
+        # Щосекундний лічильник — оновлюється лише ця мітка
+        self.lbl_duration.setText(
+            f"Тривалість: {self._format_duration(duration_sec)}"
+        )
+
     def refresh_table(self, rows: List[Dict[str, str]]):
         self.table.setSortingEnabled(False)
         self.table.setRowCount(len(rows))
@@ -294,6 +302,11 @@ class DashboardPage(QWidget):
         self.table.sortItems(0, Qt.SortOrder.AscendingOrder)
 
     def update_category_chart(self, data: Dict[str, float]):
+        if self.chart_widget is None:
+            from ui.components.category_chart import CategoryChartWidget
+
+            self.chart_widget = CategoryChartWidget()
+            self._chart_slot_layout.addWidget(self.chart_widget)
         self.chart_widget.update_data(data)
 
     def update_activity_breaks_summary(self, active_sec: int, break_sec: int):
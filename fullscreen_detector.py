@@ -1,8 +1,16 @@
-import win32gui
-import win32con
+# Поза Windows (Linux-проба, тести) детектор просто каже "не fullscreen"
+try:
+    import win32gui
+    import win32con
+except ImportError:
+    win32gui = None
+    win32con = None
 
 def _get_foreground_window_info():
 
+    if win32gui is None:
+        return None, None
+
     hwnd = win32gui.GetForegroundWindow()
     if not hwnd:
         return None, None
@@ -0,0 +1,106 @@
+import time
+from datetime import date
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+# ======================================================
+#          ТОЧНИЙ РОЗПОДІЛ ІНТЕРВАЛІВ ПО ГОДИНАХ
+# ======================================================
+
+def day_number(d: date) -> int:
+    """Номер дня від 1970-01-01 (відповідає local_seconds // 86400)."""
+    return (d - date(1970, 1, 1)).days
+
+
+def local_offsets(ts: np.ndarray) -> np.ndarray:
+    """
+    Зсув локального часу відносно UTC (секунди) для кожного timestamp.
+    time.localtime викликається лише раз на унікальну годину, а не на рядок.
+    """
+    if ts.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    hours, inverse = np.unique(ts // 3600, return_inverse=True)
+    offsets = np.fromiter(
+        (time.localtime(int(h) * 3600).tm_gmtoff for h in hours),
+        dtype=np.int64,
+        count=hours.size,
+    )
+    return offsets[inverse]
+
+
+def split_by_hour(
+    local_start: np.ndarray,
+    duration: np.ndarray,
+    first_day: int,
+    n_days: int,
+) -> np.ndarray:
+    """
+    Розподіляє інтервали [start, start + duration) по годинних кошиках
+    діапазону (n_days × 24), повертає секунди. Сесія, що перетинає межу
+    години або півночі, ділиться між відповідними кошиками.
+
+    Вартість O(n + n_days * 24) і не залежить від тривалості сесій:
+    часткові перша / остання години додаються через bincount, а повні
+    години між ними — через різницевий масив і cumsum.
+    """
+    n_bins = n_days * 24
+    if n_bins <= 0:
+        return np.zeros((0, 24), dtype=np.float64)
+
+    base = first_day * 86400
+    lo = local_start.astype(np.int64) - base
+    hi = lo + duration.astype(np.int64)
+
+    # обрізаємо інтервали межами діапазону
+    lo = np.clip(lo, 0, n_bins * 3600)
+    hi = np.clip(hi, 0, n_bins * 3600)
+    keep = hi > lo
+    lo = lo[keep]
+    hi = hi[keep]
+
+    if lo.size == 0:
+        return np.zeros((n_days, 24), dtype=np.float64)
+
+    first_bin = lo // 3600
+    last_bin = (hi - 1) // 3600
+    same = first_bin == last_bin
+
+    out = np.zeros(n_bins + 1, dtype=np.float64)
+    out += np.bincount(first_bin[same], weights=(hi - lo)[same], minlength=n_bins + 1)
+
+    multi = ~same
+    if multi.any():
+        fb = first_bin[multi]
+        lb = last_bin[multi]
+        out += np.bincount(fb, weights=(fb + 1) * 3600 - lo[multi], minlength=n_bins + 1)
+        out += np.bincount(lb, weights=hi[multi] - lb * 3600, minlength=n_bins + 1)
+
+        # повні години між першою та останньою
+        marks = np.bincount(fb + 1, minlength=n_bins + 1) - np.bincount(lb, minlength=n_bins + 1)
+        out += np.cumsum(marks) * 3600.0
+
+    return out[:n_bins].reshape(n_days, 24)
+
+
+# Якщо активних годин більше — теплова карта показує всю добу
+HEATMAP_MAX_SPARSE_HOURS = 16
+
+
+def visible_hours(minutes: np.ndarray, max_sparse_hours: int = HEATMAP_MAX_SPARSE_HOURS) -> np.ndarray:
+    """Індекси годин (стовпців днів × 24), де є активність; усі 24, якщо їх забагато."""
+    if minutes.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    hours = np.flatnonzero(minutes.sum(axis=0) > 0)
+    if hours.size > max_sparse_hours:
+        return np.arange(24)
+    return hours
+
+
+def heatmap_to_dict(days: Sequence[str], minutes: np.ndarray) -> Dict[str, Dict[int, float]]:
+    """Матриця днів × 24 → {day: {hour: minutes}} лише для ненульових клітинок."""
+    result: Dict[str, Dict[int, float]] = {}
+    for d_idx, h_idx in zip(*np.nonzero(minutes > 0)):
+        result.setdefault(days[d_idx], {})[int(h_idx)] = float(minutes[d_idx, h_idx])
+    return result
@@ -1,3 +1,9 @@
+import logging
+import time
+
+# Звідси рахується звіт про старт: перша фаза — імпорти головного вікна
+_IMPORT_T0 = time.perf_counter()
+
 from datetime import datetime
 
 from PyQt6.QtWidgets import (
@@ -7,30 +13,88 @@ from PyQt6.QtWidgets import (
     QStackedWidget,
     QApplication,
 )
+from PyQt6.QtCore import QEvent, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 
 from config.settings import DB_PATH  # шлях до SQLite / конфігів
 
-from core.analytics import AnalyticsService
-from core.recommendations import RecommendationService
-from core.rule_engine import RuleEngine
+from core.app_context import AppContext, StartupTimer
 
+# StatsPage / SettingsPage (і matplotlib) імпортуються при першому переході
 from ui.dashboard_page import DashboardPage
-from ui.stats_page import StatsPage
-from ui.settings_page import SettingsPage
 from ui.components.sidebar import Sidebar
 from ui.components.toast import Toast
+from ui.refresh_coordinator import RefreshCoordinator
 
 from services.background_worker import BackgroundWorker
-from storage.json_repo import JSONRepository
+from services.daemon_viewer import DaemonViewer
+from core.daemon import TrackerLock, read_status
+
+
+_IMPORTS_DONE = time.perf_counter()
+
+# Як часто повторювати спробу стати трекером, якщо БД трекає інший процес (мс)
+TRACKER_RETRY_MS = 5000
+
+log = logging.getLogger(__name__)
+
 
-from storage.settings_repo import SettingsRepository
-from core.settings_service import SettingsService
+class _MaintenanceSignals(QObject):
+    # (злито фрагментів, згорнуто сесій, мс) / помилка
+    finished = pyqtSignal(int, int, float)
+    failed = pyqtSignal(str)
+
+
+class _MaintenanceTask(QRunnable):
+    """
+    Обслуговування історії поза UI-потоком: злиття фрагментів у закритих
+    місяцях і згортання старих сирих сесій в агрегати. На багаторічній
+    БД це VACUUM і секунди роботи. Власний екземпляр репозиторію —
+    власні підключення, спільна з вікном лише версія даних.
+    Закриті місяці стискаються лише під TrackerLock: якщо БД трекає
+    демон, це робить він.
+    """
+
+    def __init__(self, db_path: str, merge_gap_sec: int, retention_days: int,
+                 tracker_lock: TrackerLock):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.db_path = db_path
+        self.merge_gap_sec = merge_gap_sec
+        self.retention_days = retention_days
+        self.tracker_lock = tracker_lock
+        self.signals = _MaintenanceSignals()
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            from storage.sqlite_repo import SQLiteSessionRepository
+
+            repo = SQLiteSessionRepository(self.db_path)
+            merged = repo.compact_history(self.merge_gap_sec)
+            folded = repo.apply_retention(self.retention_days)
+
+            # блокування вже в GUI (власний воркер) або береться на час стискання
+            own_lock = not self.tracker_lock.held() and self.tracker_lock.acquire()
+            try:
+                if self.tracker_lock.held():
+                    repo.compact_closed_months()
+            finally:
+                if own_lock:
+                    self.tracker_lock.release()
+        except Exception as e:
+            log.exception("maintenance failed")
+            self.signals.failed.emit(repr(e))
+            return
+        self.signals.finished.emit(merged, folded, (time.perf_counter() - t0) * 1000.0)
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
 
+        self.startup = StartupTimer(_IMPORT_T0)
+        self.startup.mark("imports", at=_IMPORTS_DONE)
+
         self.setWindowTitle("User Activity Monitor")
         self.resize(1200, 800)
 
@@ -47,19 +111,31 @@ class MainWindow(QMainWindow):
         self._is_fullscreen_app: bool = False
         self._deferred_toasts: list[tuple[str, str]] = []
 
+        # Поточна активність: трекер надсилає лише зміни, тривалість
+        # між подіями рахує локальний таймер
+        self._activity: dict = {}
+        self._activity_received: float = 0.0
+        self._duration_timer = QTimer(self)
+        self._duration_timer.setInterval(1000)
+        self._duration_timer.timeout.connect(self._tick_activity_duration)
+        self._duration_timer.start()
 
         # ---- Sidebar ----
         self.sidebar = Sidebar()
 
-        # ---- Pages ----
+        # ---- Pages: дашборд одразу, решта — при першому переході ----
         self.stack = QStackedWidget()
         self.dashboard_page = DashboardPage(parent=self)
-        self.stats_page = StatsPage(parent=self)
-        self.settings_page = SettingsPage(parent=self)
+        self.stats_page = None
+        self.settings_page = None
+        self._page_factories = {
+            1: self._create_stats_page,
+            2: self._create_settings_page,
+        }
 
         self.stack.addWidget(self.dashboard_page)
-        self.stack.addWidget(self.stats_page)
-        self.stack.addWidget(self.settings_page)
+        for _index in self._page_factories:
+            self.stack.addWidget(QWidget())  # заглушка до першого переходу
 
         # ---- Layout ----
         central = QWidget()
@@ -74,24 +150,27 @@ class MainWindow(QMainWindow):
         # ---- Навігація ----
         self.sidebar.page_selected.connect(self.on_page_selected)
 
-        # ---- Services ----
-        self.json_repo = JSONRepository()
-        self.analytics = AnalyticsService()
-        self.recommendations = RecommendationService()
-        self.rule_engine = RuleEngine()
+        self.startup.mark("window")
 
-        # ---- Settings service (для idle, пасивних застосунків тощо) ----
-        self.settings_repo = SettingsRepository(self.db_path)
-        self.settings_service = SettingsService(self.settings_repo)
+        # ---- Services: один спільний набір на все вікно ----
+        self.context = AppContext(self.db_path)
+        self.json_repo = self.context.json_repo
+        self.analytics = self.context.analytics
 
-        # ---- Background worker ----
-        self.worker = BackgroundWorker(
-            settings=self.settings_service,
-            interval=5,
+        # ---- Settings service (для idle, пасивних застосунків тощо) ----
+        self.settings_repo = self.context.settings_repo
+        self.settings_service = self.context.settings
+        self.settings_service.settings_changed.connect(self._on_settings_changed)
+
+        # ---- Оновлення дашборду: не частіше інтервалу і лише видимої сторінки ----
+        self.refresh_coordinator = RefreshCoordinator(
+            self.stack,
+            self.settings_service.get("ui_refresh_interval_ms", 1000),
+            parent=self,
         )
-        self.worker.current_activity.connect(self.on_current_activity)
-        self.worker.session_completed.connect(self.on_session_completed)
-        self.worker.start()
+        self.refresh_coordinator.register("today_table", self.dashboard_page, self.refresh_today_table)
+        self.refresh_coordinator.register("category_chart", self.dashboard_page, self.refresh_category_chart)
+        self.refresh_coordinator.register("balance", self.dashboard_page, self.refresh_today_balance_widget)
 
         # ---- Кнопки Dashboard ----
         self.dashboard_page.btn_refresh_recommendations.clicked.connect(
@@ -101,19 +180,142 @@ class MainWindow(QMainWindow):
             self.on_copy_recommendations
         )
 
+        self.startup.mark("services")
+
+        # Заповнення, обслуговування БД і трекер — вже після показу вікна
+        QTimer.singleShot(0, self._finish_startup)
+
+    # =====================================================
+    #                     СТАРТ
+    # =====================================================
+
+    def _finish_startup(self):
+        self.startup.mark("show")
+
         # Початкове заповнення
-        self.refresh_today_table()
-        self.refresh_category_chart()
-        self.refresh_today_balance_widget()
+        self.refresh_coordinator.mark_dirty()
+        self.refresh_coordinator.flush(force=True)
+        self.startup.mark("initial_fill")
+
+        # ---- Трекер: headless-демон (якщо запущений) або власний воркер ----
+        self._tracker_lock = TrackerLock(self.db_path, owner="gui")
+        self._tracker_busy_reported = False
+        self._attach_tracker()
+        self.startup.mark("tracker")
+
+        # Злиття фрагментів у закритих місяцях, потім старі сирі сесії →
+        # погодинні агрегати (термін з налаштувань) — у фоні: трекер пише
+        # лише поточний місяць, а обслуговування чіпає тільки закриті
+        self._maintenance_task = _MaintenanceTask(
+            self.db_path,
+            self.settings_service.get("session_merge_gap_sec", 30),
+            self.settings_service.get("raw_retention_days", 730),
+            self._tracker_lock,
+        )
+        self._maintenance_task.signals.finished.connect(self._on_maintenance_finished)
+        self._maintenance_task.signals.failed.connect(self._on_maintenance_failed)
+        QThreadPool.globalInstance().start(self._maintenance_task)
+        self.startup.mark("maintenance")
+
+        log.info("startup:\n%s", self.startup.report())
+
+    def _on_maintenance_finished(self, merged: int, folded: int, elapsed_ms: float):
+        self._maintenance_task = None
+        # історію змінив інший потік — кеші й видимі сторінки перечитують БД
+        self.analytics.repo.notify_external_change()
+        self.refresh_coordinator.mark_dirty()
+        log.info("maintenance: merged %d, folded %d in %.1f ms (background)", merged, folded, elapsed_ms)
+
+    def _on_maintenance_failed(self, error: str):
+        # виняток з трасою стеку вже записав _MaintenanceTask
+        self._maintenance_task = None
+
+    def _ensure_page(self, index: int):
+        """Будує сторінку при першому переході на неї (замість заглушки)."""
+        factory = self._page_factories.pop(index, None)
+        if factory is None:
+            return
+
+        t0 = time.perf_counter()
+        placeholder = self.stack.widget(index)
+        self.stack.insertWidget(index, factory())
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        log.info("page %d built in %.1f ms", index, (time.perf_counter() - t0) * 1000.0)
+
+    def _create_stats_page(self):
+        # matplotlib, numpy і колонкова аналітика підтягуються лише тут
+        from ui.stats_page import StatsPage
+
+        self.stats_page = StatsPage(parent=self, context=self.context)
+        return self.stats_page
+
+    def _create_settings_page(self):
+        from ui.settings_page import SettingsPage
+
+        self.settings_page = SettingsPage(parent=self, context=self.context)
+        return self.settings_page
+
+    # =====================================================
+    #                     ТРЕКЕР
+    # =====================================================
+
+    def _attach_tracker(self):
+        if read_status(self.db_path) is not None:
+            self.worker = DaemonViewer(self.db_path, self.analytics.repo, parent=self)
+            self.worker.detached.connect(self._attach_tracker)
+            self._connect_tracker(self.worker)
+            return
+
+        # Те саме блокування бере демон: двоє трекерів писали б дублікати сесій
+        if not self._tracker_lock.acquire():
+            if not self._tracker_busy_reported:
+                self._tracker_busy_reported = True
+                log.info("database is tracked by another process: %s", self._tracker_lock.holder())
+            # демон ще не опублікував стан або трекає інше вікно GUI — чекаємо
+            QTimer.singleShot(TRACKER_RETRY_MS, self._attach_tracker)
+            return
+        self._start_own_worker()
+
+    def _start_own_worker(self):
+        try:
+            worker = BackgroundWorker(
+                settings=self.settings_service,
+                interval=5,
+            )
+        except RuntimeError as e:
+            # немає справжньої проби вікон — історію можна переглядати, але не трекати
+            log.warning("tracker not started: %s", e)
+            self.show_toast(f"Трекер не запущено: {e}", "warning")
+            self._tracker_lock.release()
+            return
+        self.worker = worker
+        self._connect_tracker(self.worker)
+
+    def _connect_tracker(self, tracker):
+        tracker.current_activity.connect(self.on_current_activity)
+        tracker.session_completed.connect(self.on_session_completed)
+        # Ліміти перевіряє етап rules конвеєра трекера, вікно лише показує тости
+        tracker.rule_triggered.connect(self.on_rule_triggered)
+        tracker.start()
+
+        # Дашборд показує "сьогодні" разом із поточною незавершеною сесією
+        self.analytics.set_live_source(tracker.get_live_state)
 
     # =====================================================
     #                     СЛОТИ
     # =====================================================
 
     def on_page_selected(self, index: int):
+        self._ensure_page(index)
         self.stack.setCurrentIndex(index)
 
-    def on_current_activity(self, payload: dict):
+    def on_current_activity(self, delta: dict):
+        # delta — лише змінені поля (перша подія — усі) та duration_sec
+        self._activity.update(delta)
+        self._activity_received = time.monotonic()
+
+        payload = self._activity
         app = payload.get("app", "—")
         title = payload.get("title", "—")
         duration_sec = payload.get("duration_sec", 0)
@@ -141,24 +343,23 @@ class MainWindow(QMainWindow):
             is_idle=idle,
         )
 
-        if category and duration_sec > 0:
-            res = self.rule_engine.check_live_category(category, duration_sec)
-            if res:
-                text, level = res
-                if self._is_fullscreen_app:
-                    self._deferred_toasts.append((text, level))
-                else:
-                    self.show_toast(text, level)
 
+    def _tick_activity_duration(self):
+        if not self._activity or self._activity.get("locked"):
+            return
+        if self.stack.currentWidget() is not self.dashboard_page:
+            return
+        elapsed = int(time.monotonic() - self._activity_received)
+        self.dashboard_page.update_current_duration(
+            self._activity.get("duration_sec", 0) + elapsed
+        )
 
     def on_session_completed(self, session: dict):
         """
         Після завершення сесії:
         - оновлюємо кеш
-        - оновлюємо таблицю
-        - оновлюємо графік
-        - оновлюємо баланс робота/перерви
-        - перевіряємо ліміти правил
+        - позначаємо таблицю, графік і баланс робота/перерви брудними
+          (перемалюються разом, не частіше за ui_refresh_interval_ms)
         """
         app = session.get("app", "")
         title = session.get("title", "")
@@ -167,17 +368,18 @@ class MainWindow(QMainWindow):
         if category:
             self.category_cache[(app, title)] = category
 
-        self.refresh_today_table()
-        self.refresh_category_chart()
-        self.refresh_today_balance_widget()
+        self.refresh_coordinator.mark_dirty()
 
-        res = self.rule_engine.check_overall()
-        if res:
-            text, level = res
-            if self._is_fullscreen_app:
-                self._deferred_toasts.append((text, level))
-            else:
-                self.show_toast(text, level)
+    def _on_settings_changed(self, changed: dict):
+        if "ui_refresh_interval_ms" in changed:
+            self.refresh_coordinator.set_interval(changed["ui_refresh_interval_ms"])
+
+    def on_rule_triggered(self, text: str, level: str):
+        # Поки активна повноекранна програма — тости відкладаються
+        if self._is_fullscreen_app:
+            self._deferred_toasts.append((text, level))
+        else:
+            self.show_toast(text, level)
 
 
     # =====================================================
@@ -225,18 +427,18 @@ class MainWindow(QMainWindow):
         self.dashboard_page.refresh_table(rows)
 
     def refresh_category_chart(self):
-        data = self.analytics.get_today_category_minutes()
+        data = self.analytics.get_today_category_minutes(include_live=True)
         self.dashboard_page.update_category_chart(data)
 
     def refresh_today_balance_widget(self):
-        data = self.analytics.get_today_activity_vs_breaks()
+        data = self.analytics.get_today_activity_vs_breaks(include_live=True)
         self.dashboard_page.update_activity_breaks_summary(
             data.get("active_sec", 0),
             data.get("break_sec", 0),
         )
 
     def on_refresh_recommendations(self):
-        text = self.recommendations.build_today_recommendations()
+        text = self.context.recommendations.build_today_recommendations()
         self.dashboard_page.set_recommendations_text(text)
 
     def on_copy_recommendations(self):
@@ -265,6 +467,16 @@ class MainWindow(QMainWindow):
             t.index = i
             t.reposition()
 
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # Поки вікно згорнуте, дашборд не перемальовується
+        if (
+            event.type() == QEvent.Type.WindowStateChange
+            and not self.isMinimized()
+            and hasattr(self, "refresh_coordinator")
+        ):
+            self.refresh_coordinator.on_window_shown()
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if hasattr(self, "_toasts"):
@@ -276,7 +488,12 @@ class MainWindow(QMainWindow):
     # =====================================================
 
     def closeEvent(self, event):
-        if hasattr(self, "worker") and self.worker.isRunning():
+        if isinstance(getattr(self, "worker", None), DaemonViewer):
+            # демон продовжує трекати й після закриття вікна
+            self.worker.stop()
+        elif hasattr(self, "worker") and self.worker.isRunning():
             self.worker.stop()
             self.worker.wait(2000)
+        if hasattr(self, "_tracker_lock"):
+            self._tracker_lock.release()
         super().closeEvent(event)
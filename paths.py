@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 import sys
 
 
+# Корінь не змінюється за час роботи процесу — resolve() лише раз
+@lru_cache(maxsize=None)
 def app_root() -> Path:
 
     base = getattr(sys, "_MEIPASS", None) 
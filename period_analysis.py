@@ -1,4 +1,5 @@
 import json
+from typing import Optional
 from core.recommendations import RecommendationService
 from config.prompts import PERIOD_ANALYSIS_PROMPT
 
@@ -6,8 +7,8 @@ from config.prompts import PERIOD_ANALYSIS_PROMPT
 class PeriodAnalysisService:
 
 
-    def __init__(self):
-        self.rec = RecommendationService()
+    def __init__(self, rec: Optional[RecommendationService] = None):
+        self.rec = rec or RecommendationService()
 
     def build_period_report(self, data: dict) -> str:
 
@@ -0,0 +1,490 @@
+"""
+Асинхронний конвеєр трекера:
+
+    probe → sessionizer → classifier → writer → rules
+
+Кожен етап — окрема корутина з власною обмеженою чергою на вході, тож
+повільний етап (LLM-класифікація, запис на диск, підрахунок лімітів)
+не зупиняє опитування проби: пропускна здатність визначається
+найповільнішим етапом, а не сумою всіх.
+
+Блокуючі виклики (classify, SQLite / JSON, RuleEngine) ідуть у
+asyncio.to_thread, а стан SessionBuilder змінюється лише в циклі подій.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from core.poll_scheduler import SUSPEND, AdaptiveScheduler, ClockGapDetector
+from core.probe_trace import TraceRecorder
+from core.probes import ProbeSample
+from core.rule_engine import RuleEngine
+from core.session_builder import BreakEvent, SessionBuilder, TickResult
+from core.session_compaction import normalize_title
+from core.utils import now
+from storage.json_repo import JSONRepository
+from storage.sqlite_repo import SQLiteSessionRepository
+
+
+# Політики переповнення черги
+BLOCK = "block"              # продюсер чекає (backpressure)
+DROP_OLDEST = "drop_oldest"  # найстаріший елемент відкидається
+MERGE = "merge"              # злиття з останнім елементом, інакше drop_oldest
+
+# Скільки останніх замірів тримати для перцентилів
+LATENCY_WINDOW = 1024
+
+# Скільки разів етап перезапускається після винятку, перш ніж зупинити конвеєр
+STAGE_RESTARTS = 3
+
+log = logging.getLogger(__name__)
+
+
+# ======================================================
+#                      МЕТРИКИ
+# ======================================================
+
+@dataclass
+class StageMetrics:
+    """Лічильники етапу та ковзне вікно часу обробки / очікування в черзі."""
+    name: str
+    processed: int = 0
+    dropped: int = 0
+    merged: int = 0
+    blocked: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def observe(self, seconds: float) -> None:
+        self.processed += 1
+        self.latencies.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        lat = sorted(self.latencies)
+        waits = sorted(self.waits)
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "merged": self.merged,
+            "blocked": self.blocked,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "p50_ms": _percentile(lat, 0.50) * 1000.0,
+            "p95_ms": _percentile(lat, 0.95) * 1000.0,
+            "max_ms": (lat[-1] if lat else 0.0) * 1000.0,
+            "wait_p95_ms": _percentile(waits, 0.95) * 1000.0,
+        }
+
+
+def _percentile(ordered, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+# ======================================================
+#                  ОБМЕЖЕНА ЧЕРГА
+# ======================================================
+
+class StageQueue:
+    """
+    Обмежена черга між етапами з політикою переповнення.
+
+    close() — кінець потоку: get() віддає решту елементів, потім None.
+    put() у закриту чергу відкидає елемент (споживач уже не працює).
+    """
+
+    def __init__(
+        self,
+        metrics: StageMetrics,
+        maxsize: int,
+        policy: str = BLOCK,
+        merge: Optional[Callable[[Any, Any], Any]] = None,
+    ):
+        self.metrics = metrics
+        self.maxsize = max(int(maxsize), 1)
+        self.policy = policy
+        # merge(last, new) -> злитий елемент або None, якщо злити не можна
+        self.merge = merge
+        self._items: Deque[Tuple[float, Any]] = deque()
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+    async def put(self, item: Any) -> None:
+        async with self._cond:
+            if self._closed:
+                self.metrics.dropped += 1
+                return
+
+            if len(self._items) >= self.maxsize:
+                if self.policy == MERGE and self.merge is not None:
+                    merged = self.merge(self._items[-1][1], item)
+                    if merged is not None:
+                        self._items[-1] = (self._items[-1][0], merged)
+                        self.metrics.merged += 1
+                        return
+
+                if self.policy == BLOCK:
+                    self.metrics.blocked += 1
+                    await self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+                    if self._closed:
+                        self.metrics.dropped += 1
+                        return
+                else:
+                    self._items.popleft()
+                    self.metrics.dropped += 1
+
+            self._items.append((time.perf_counter(), item))
+            self._track_depth()
+            self._cond.notify_all()
+
+    async def get(self) -> Any:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._items or self._closed)
+            if not self._items:
+                return None
+            queued_at, item = self._items.popleft()
+            self.metrics.waits.append(time.perf_counter() - queued_at)
+            self._track_depth()
+            self._cond.notify_all()
+            return item
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _track_depth(self) -> None:
+        self.metrics.depth = len(self._items)
+        self.metrics.max_depth = max(self.metrics.max_depth, self.metrics.depth)
+
+
+def _merge_samples(last: tuple, new: tuple) -> Optional[tuple]:
+    # те саме вікно — проміжний знімок нічого не додає (як пропущений тік);
+    # знімок після розриву (сон, стрибок годинника) не зливається
+    if new[2] is not None:
+        return None
+    a, b = last[1], new[1]
+    if (a.app, a.title, a.fullscreen, a.locked) == (b.app, b.title, b.fullscreen, b.locked):
+        return (new[0], b, last[2])
+    return None
+
+
+def _merge_rule_checks(last: tuple, new: tuple) -> Optional[tuple]:
+    # live-перевірка тієї самої категорії — актуальна лише найновіша
+    if last[0] == new[0] == "live" and last[1] == new[1]:
+        return new
+    if last[0] == new[0] == "overall":
+        return last
+    return None
+
+
+# ======================================================
+#                      КОНВЕЄР
+# ======================================================
+
+class TrackingPipeline:
+    """
+    Конвеєр поверх SessionBuilder (з classify=None — класифікує етап
+    classifier). Колбеки викликаються в потоці циклу подій:
+      on_activity(TickResult) — після кожного знімка;
+      on_session(dict)        — сесію записано;
+      on_rule(text, level)    — спрацювало правило лімітів;
+      on_tick()               — перед кожним опитуванням проби;
+      on_heartbeat()          — кожні heartbeat_sec, незалежно від етапів.
+    """
+
+    SAMPLE_QUEUE = 32
+    EVENT_QUEUE = 256
+    RULE_QUEUE = 16
+
+    def __init__(
+        self,
+        sample: Callable[[], ProbeSample],
+        builder: SessionBuilder,
+        classify: Callable[[str, str], str],
+        sqlite_repo: SQLiteSessionRepository,
+        json_repo: JSONRepository,
+        scheduler: AdaptiveScheduler,
+        rule_engine: Optional[RuleEngine] = None,
+        recorder: Optional[TraceRecorder] = None,
+        on_activity: Optional[Callable[[TickResult], None]] = None,
+        on_session: Optional[Callable[[dict], None]] = None,
+        on_rule: Optional[Callable[[str, str], None]] = None,
+        on_tick: Optional[Callable[[], None]] = None,
+        on_heartbeat: Optional[Callable[[], None]] = None,
+        heartbeat_sec: float = 5.0,
+        clock: Callable[[], datetime] = now,
+        gaps: Optional[ClockGapDetector] = None,
+    ):
+        self.sample = sample
+        self.builder = builder
+        self.classify = classify
+        self.sqlite_repo = sqlite_repo
+        self.json_repo = json_repo
+        self.scheduler = scheduler
+        self.rule_engine = rule_engine
+        self.recorder = recorder
+        self.on_activity = on_activity
+        self.on_session = on_session
+        self.on_rule = on_rule
+        self.on_tick = on_tick
+        self.on_heartbeat = on_heartbeat
+        self.heartbeat_sec = heartbeat_sec
+        self.clock = clock
+        self.gaps = gaps or ClockGapDetector()
+
+        self._metrics: Dict[str, StageMetrics] = {
+            name: StageMetrics(name)
+            for name in ("probe", "sessionize", "classify", "write", "rules")
+        }
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._stop_requested = False
+        # Виняток етапу, що вичерпав перезапуски — run() піднімає його
+        self._failure: Optional[Exception] = None
+
+        # Стан, який етап sessionize повертає пробі (для розкладу)
+        self._effective_idle = False
+        # Остання категорія активної сесії — для BreakEvent.last_category
+        self._last_active_category: Optional[str] = None
+
+    # ---------- Керування ----------
+
+    async def run(self) -> None:
+        """
+        Працює до stop(), потім дочікується, поки всі черги спорожніють.
+        RuntimeError — етап падав більше за STAGE_RESTARTS разів.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._failure = None
+        if self._stop_requested:
+            self._stop_event.set()
+
+        m = self._metrics
+        self._samples = StageQueue(m["sessionize"], self.SAMPLE_QUEUE, MERGE, _merge_samples)
+        self._events = StageQueue(m["classify"], self.EVENT_QUEUE, BLOCK)
+        self._writes = StageQueue(m["write"], self.EVENT_QUEUE, BLOCK)
+        self._rules = StageQueue(m["rules"], self.RULE_QUEUE, MERGE, _merge_rule_checks)
+
+        stages = [
+            self._guard(self._probe_stage, None, self._samples),
+            self._guard(self._sessionize_stage, self._samples, self._events),
+            self._guard(self._classify_stage, self._events, self._writes),
+            self._guard(self._write_stage, self._writes, self._rules),
+            self._guard(self._rules_stage, self._rules, None),
+        ]
+        if self.on_heartbeat is not None:
+            stages.append(self._guard(self._heartbeat_stage, None, None))
+        await asyncio.gather(*stages)
+
+        if self._failure is not None:
+            raise RuntimeError("tracking pipeline stopped after a stage failure") from self._failure
+
+    def stop(self) -> None:
+        """Потокобезпечна зупинка: проба зупиняється, решта етапів дочищує черги."""
+        self._stop_requested = True
+        loop, event = self._loop, self._stop_event
+        if loop is not None and event is not None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # цикл уже завершився
+                pass
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        return {name: stage.summary() for name, stage in self._metrics.items()}
+
+    async def _guard(self, stage, inbox: Optional[StageQueue], outbox: Optional[StageQueue]) -> None:
+        """
+        Після винятку етап перезапускається (елемент, на якому він упав,
+        втрачено; черги та стан SessionBuilder лишаються). Після
+        STAGE_RESTARTS перезапусків конвеєр зупиняється, а run() падає.
+        """
+        name = stage.__name__
+        try:
+            for attempt in range(STAGE_RESTARTS + 1):
+                try:
+                    await stage()
+                    return
+                except Exception as e:
+                    if attempt < STAGE_RESTARTS:
+                        log.exception("stage %s failed, restarting (%d/%d)", name, attempt + 1, STAGE_RESTARTS)
+                        continue
+                    log.exception("stage %s failed, stopping the pipeline", name)
+                    if self._failure is None:
+                        self._failure = e
+                    self._stop_event.set()
+                    # продюсер не має чекати на мертвого споживача
+                    if inbox is not None:
+                        await inbox.close()
+        finally:
+            if outbox is not None:
+                await outbox.close()
+
+    # ======================================================
+    #                       ЕТАПИ
+    # ======================================================
+
+    async def _probe_stage(self) -> None:
+        last_key = None
+        delay = 0.0
+        while not self._stop_event.is_set():
+            if self.on_tick is not None:
+                self.on_tick()
+
+            # Проба швидка (мілісекунди), тож опитується прямо в циклі подій
+            t0 = time.perf_counter()
+            sample = self.sample()
+            now_dt = self.clock()
+            if self.recorder is not None:
+                self.recorder.record(now_dt.timestamp(), sample)
+            self._metrics["probe"].observe(time.perf_counter() - t0)
+
+            gap = self.gaps.observe(now_dt, expected_sec=delay)
+            if gap is not None:
+                log.info("%s: %s → %s", gap.kind, f"{gap.last_dt:%H:%M:%S}", f"{gap.now_dt:%H:%M:%S}")
+            await self._samples.put((now_dt, sample, gap))
+
+            # Заблоковано — вікна не опитуються, лише рідка перевірка блокування
+            key = (sample.app, normalize_title(sample.title), sample.locked)
+            self.scheduler.plan(
+                changed=key != last_key,
+                idle=self._effective_idle,
+                suspended=sample.locked,
+            )
+            last_key = key
+
+            delay = self.scheduler.next_delay()
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                self.scheduler.record_wakeup()
+
+    async def _heartbeat_stage(self) -> None:
+        # власний таймер: heartbeat не залежить від знімків і етапу sessionize
+        while not self._stop_event.is_set():
+            self.on_heartbeat()
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.heartbeat_sec)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sessionize_stage(self) -> None:
+        while True:
+            item = await self._samples.get()
+            if item is None:
+                break
+            now_dt, sample, gap = item
+
+            if gap is not None:
+                # сесія закривається на останньому реальному знімку, а не через години
+                await self._emit(self.builder.interrupt(gap.last_dt, gap.now_dt, as_break=gap.kind == SUSPEND))
+
+            t0 = time.perf_counter()
+            result = self.builder.feed(sample, now_dt)
+            self._metrics["sessionize"].observe(time.perf_counter() - t0)
+
+            self._effective_idle = result.activity["idle"]
+            if self.on_activity is not None:
+                self.on_activity(result)
+            await self._emit(result)
+
+            activity = result.activity
+            category = activity.get("category") or self.builder.last_categories.get(
+                (activity["app"], activity["title"])
+            )
+            if category and activity["duration_sec"] > 0:
+                await self._rules.put(("live", category, activity["duration_sec"]))
+
+        # Черга знімків вичерпана — закриваємо поточну сесію
+        await self._emit(self.builder.close(self.clock()))
+
+    async def _emit(self, result: TickResult) -> None:
+        for br in result.breaks:
+            await self._events.put(("break", br))
+        for session in result.sessions:
+            await self._events.put(("session", session))
+
+    async def _classify_stage(self) -> None:
+        while True:
+            item = await self._events.get()
+            if item is None:
+                break
+            kind, payload = item
+
+            if kind == "break":
+                # категорія відома лише тут: сесії до перерви вже класифіковані
+                payload = replace(payload, last_category=self._last_active_category)
+            else:
+                t0 = time.perf_counter()
+                category = await asyncio.to_thread(self.classify, payload["app"], payload["title"])
+                self._metrics["classify"].observe(time.perf_counter() - t0)
+
+                self.builder.apply_category(payload, category)
+                if not payload["idle"]:
+                    self._last_active_category = payload["category"]
+
+            await self._writes.put((kind, payload))
+
+    async def _write_stage(self) -> None:
+        while True:
+            item = await self._writes.get()
+            if item is None:
+                break
+            kind, payload = item
+
+            t0 = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write, kind, payload)
+            except Exception:
+                log.exception("failed to save %s", kind)
+                continue
+            finally:
+                self._metrics["write"].observe(time.perf_counter() - t0)
+
+            if kind == "session":
+                if self.on_session is not None:
+                    self.on_session(payload)
+                await self._rules.put(("overall",))
+
+    def _write(self, kind: str, payload) -> None:
+        if kind == "break":
+            br: BreakEvent = payload
+            self.sqlite_repo.save_break(
+                start_ts=br.start_ts,
+                end_ts=br.end_ts,
+                last_category=br.last_category,
+            )
+        else:
+            self.json_repo.save_session(payload)
+            self.sqlite_repo.save_session(payload)
+
+    async def _rules_stage(self) -> None:
+        while True:
+            item = await self._rules.get()
+            if item is None:
+                break
+            if self.rule_engine is None:
+                continue
+
+            t0 = time.perf_counter()
+            res = await asyncio.to_thread(self._check_rule, item)
+            self._metrics["rules"].observe(time.perf_counter() - t0)
+
+            if res and self.on_rule is not None:
+                self.on_rule(*res)
+
+    def _check_rule(self, item: tuple) -> Optional[Tuple[str, str]]:
+        if item[0] == "live":
+            return self.rule_engine.check_live_category(item[1], item[2])
+        return self.rule_engine.check_overall()
@@ -0,0 +1,197 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+
+# ======================================================
+#          АДАПТИВНИЙ ПЛАНУВАЛЬНИК ОПИТУВАННЯ
+# ======================================================
+
+@dataclass(frozen=True)
+class SchedulerMetrics:
+    """Статистика дедлайнів (секунди)."""
+    ticks: int
+    missed: int
+    max_lateness: float
+    avg_lateness: float
+    interval: float
+
+
+class AdaptiveScheduler:
+    """
+    Тікер на монотонному годиннику з дедлайнами без дрейфу: наступний
+    дедлайн = попередній + інтервал, тож час роботи циклу не накопичується.
+
+    Інтервал адаптивний:
+      - одразу після зміни вікна — min_interval (точні межі сесій);
+      - у стабільній сесії та в idle — поступово росте до max_interval;
+      - при заблокованому екрані — одразу max_interval.
+    Пропущений дедлайн (цикл працював довше за інтервал або потік
+    прокинувся запізно) рахується в метриках, а розклад зсувається на
+    "зараз" замість серії тіків наздогін.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = 5.0,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        backoff: float = 1.5,
+        stable_after_sec: float = 60.0,
+        late_tolerance: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_interval = float(base_interval)
+        self.min_interval = min(float(min_interval), self.base_interval)
+        self.max_interval = max(float(max_interval), self.base_interval)
+        self.backoff = backoff
+        self.stable_after_sec = stable_after_sec
+        self.late_tolerance = late_tolerance
+        self._clock = clock
+
+        self.interval = self.base_interval
+        self._deadline = clock()
+        self._last_change = self._deadline
+
+        self._ticks = 0
+        self._missed = 0
+        self._lateness_sum = 0.0
+        self._lateness_max = 0.0
+
+    # ---------- Вибір інтервалу ----------
+
+    def plan(self, changed: bool, idle: bool, suspended: bool = False) -> float:
+        """Обирає інтервал до наступного тіку за станом активності."""
+        now = self._clock()
+        if suspended:
+            # опитувати нічого — лише зрідка перевіряємо, чи не розблоковано
+            self.interval = self.max_interval
+        elif changed:
+            self._last_change = now
+            self.interval = self.min_interval
+        elif idle or now - self._last_change >= self.stable_after_sec:
+            self.interval = min(max(self.interval, self.base_interval) * self.backoff, self.max_interval)
+        else:
+            self.interval = self.base_interval
+        return self.interval
+
+    # ---------- Очікування ----------
+
+    def next_delay(self) -> float:
+        """
+        Зсуває дедлайн на інтервал і повертає, скільки спати до нього.
+        Чекає сам цикл (етап probe в core.pipeline), після пробудження —
+        record_wakeup().
+        """
+        self._deadline += self.interval
+        now = self._clock()
+        if now > self._deadline + self.late_tolerance:
+            # цикл не встиг — не наздоганяємо, а починаємо від "зараз"
+            self._missed += 1
+            self._deadline = now
+        return max(self._deadline - now, 0.0)
+
+    def record_wakeup(self) -> None:
+        lateness = max(self._clock() - self._deadline, 0.0)
+        self._ticks += 1
+        self._lateness_sum += lateness
+        self._lateness_max = max(self._lateness_max, lateness)
+        if lateness > self.late_tolerance:
+            self._missed += 1
+
+    # ---------- Метрики ----------
+
+    def metrics(self) -> SchedulerMetrics:
+        return SchedulerMetrics(
+            ticks=self._ticks,
+            missed=self._missed,
+            max_lateness=self._lateness_max,
+            avg_lateness=self._lateness_sum / self._ticks if self._ticks else 0.0,
+            interval=self.interval,
+        )
+
+
+# ======================================================
+#          РОЗРИВИ: СОН, ГІБЕРНАЦІЯ, СТРИБОК ГОДИННИКА
+# ======================================================
+
+SUSPEND = "suspend"
+CLOCK_JUMP = "clock_jump"
+
+# Проміжок між знімками, довший за запланований на стільки, — сон / гібернація
+SUSPEND_GAP_SEC = 90.0
+# Допустима розбіжність настінного та монотонного годинників між знімками
+CLOCK_JUMP_TOLERANCE_SEC = 10.0
+
+
+def elapsed_clock() -> float:
+    """
+    Монотонний годинник, що йде й під час сну: CLOCK_BOOTTIME на Linux
+    (time.monotonic там сон не рахує), на Windows — time.monotonic.
+    """
+    if hasattr(time, "CLOCK_BOOTTIME"):
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.monotonic()
+
+
+@dataclass(frozen=True)
+class ClockGap:
+    """Розрив між двома сусідніми знімками."""
+    kind: str           # SUSPEND | CLOCK_JUMP
+    last_dt: datetime   # останній реальний знімок перед розривом
+    now_dt: datetime
+
+
+class ClockGapDetector:
+    """
+    Порівнює настінний годинник знімків (now()) з монотонним, що йде
+    й під час сну (elapsed_clock):
+      - настінний розійшовся з монотонним (назад чи вперед) — CLOCK_JUMP
+        (NTP, ручна зміна часу); перевіряється першим, бо стрибок вперед
+        на години інакше виглядав би як сон;
+      - за монотонним годинником минуло значно більше за запланований
+        інтервал — SUSPEND (процес не працював: сон, гібернація).
+    clock=None — лише настінний час (відтворення trace-файлу).
+    """
+
+    def __init__(
+        self,
+        suspend_after_sec: float = SUSPEND_GAP_SEC,
+        jump_tolerance_sec: float = CLOCK_JUMP_TOLERANCE_SEC,
+        clock: Optional[Callable[[], float]] = elapsed_clock,
+    ):
+        self.suspend_after_sec = suspend_after_sec
+        self.jump_tolerance_sec = jump_tolerance_sec
+        self._clock = clock
+        self._last: Optional[tuple] = None
+
+        self.suspends = 0
+        self.clock_jumps = 0
+
+    def observe(self, now_dt: datetime, expected_sec: float = 0.0) -> Optional[ClockGap]:
+        """Наступний знімок; expected_sec — скільки планувалось спати перед ним."""
+        real = self._clock() if self._clock is not None else None
+        last, self._last = self._last, (now_dt, real)
+        if last is None:
+            return None
+
+        last_dt, last_real = last
+        wall = (now_dt - last_dt).total_seconds()
+        elapsed = real - last_real if real is not None else wall
+
+        if abs(wall - elapsed) > self.jump_tolerance_sec:
+            kind = CLOCK_JUMP
+        elif elapsed > expected_sec + self.suspend_after_sec:
+            kind = SUSPEND
+        else:
+            return None
+
+        if kind == SUSPEND:
+            self.suspends += 1
+        else:
+            self.clock_jumps += 1
+        return ClockGap(kind, last_dt, now_dt)
+
+    def reset(self) -> None:
+        self._last = None
@@ -0,0 +1,114 @@
+import os
+import struct
+from typing import Iterator, Tuple
+
+from core.probes import ProbeSample
+
+
+# ======================================================
+#              БІНАРНИЙ КІЛЬЦЕВИЙ ФАЙЛ ЗНІМКІВ
+# ======================================================
+#
+# Заголовок: magic, версія, розмір запису, місткість, head (наступний
+# слот для запису), count (скільки слотів заповнено).
+# Запис фіксованого розміру: ts (float64), idle_sec (uint32), прапорці
+# (біт 0 — fullscreen, біт 1 — locked), app і title в UTF-8, обрізані до фіксованої довжини.
+# Коли файл заповнено, нові записи перезаписують найстаріші.
+
+TRACE_MAGIC = b"UAMTRACE"
+TRACE_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHIQQ")
+_COUNTERS = struct.Struct("<QQ")
+_COUNTERS_OFFSET = _HEADER.size - _COUNTERS.size
+
+APP_BYTES = 40
+TITLE_BYTES = 160
+_RECORD = struct.Struct(f"<dIB{APP_BYTES}s{TITLE_BYTES}s")
+
+_FLAG_FULLSCREEN = 0x01
+_FLAG_LOCKED = 0x02
+
+DEFAULT_CAPACITY = 100_000   # ~21 МБ, близько тижня при опитуванні раз на 5 с
+
+
+def _fit(text: str, limit: int) -> bytes:
+    # обрізаємо по байтах, не розриваючи багатобайтовий символ
+    return (text or "").encode("utf-8")[:limit].decode("utf-8", errors="ignore").encode("utf-8")
+
+
+def _unfit(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="ignore")
+
+
+class TraceRecorder:
+    """Пише сирі знімки проби у кільцевий файл (opt-in, див. config.settings.TRACE_PATH)."""
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if os.path.exists(path) and os.path.getsize(path) >= _HEADER.size:
+            self._file = open(path, "r+b")
+            magic, version, record_size, capacity, head, count = _HEADER.unpack(
+                self._file.read(_HEADER.size)
+            )
+            if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != _RECORD.size:
+                self._file.close()
+                raise ValueError(f"{path}: не trace-файл або інша версія формату")
+        else:
+            self._file = open(path, "w+b")
+            head = count = 0
+            self._file.write(
+                _HEADER.pack(TRACE_MAGIC, TRACE_VERSION, _RECORD.size, capacity, head, count)
+            )
+
+        self.capacity = int(capacity)
+        self._head = int(head)
+        self._count = int(count)
+
+    def record(self, ts: float, sample: ProbeSample) -> None:
+        flags = (_FLAG_FULLSCREEN if sample.fullscreen else 0) | (_FLAG_LOCKED if sample.locked else 0)
+        payload = _RECORD.pack(
+            float(ts),
+            max(int(sample.idle_sec), 0) & 0xFFFFFFFF,
+            flags,
+            _fit(sample.app, APP_BYTES),
+            _fit(sample.title, TITLE_BYTES),
+        )
+        self._file.seek(_HEADER.size + self._head * _RECORD.size)
+        self._file.write(payload)
+
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self._file.seek(_COUNTERS_OFFSET)
+        self._file.write(_COUNTERS.pack(self._head, self._count))
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_trace(path: str) -> Iterator[Tuple[float, ProbeSample]]:
+    """Записи trace-файлу в хронологічному порядку: (ts, ProbeSample)."""
+    with open(path, "rb") as f:
+        magic, version, record_size, capacity, head, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != _RECORD.size:
+            raise ValueError(f"{path}: не trace-файл або інша версія формату")
+
+        # після заповнення найстаріший запис — той, що стоїть у слоті head
+        first = head if count == capacity else 0
+        f.seek(_HEADER.size)
+        data = f.read(count * _RECORD.size)
+
+    for i in range(count):
+        slot = (first + i) % capacity
+        ts, idle_sec, flags, app, title = _RECORD.unpack_from(data, slot * _RECORD.size)
+        yield ts, ProbeSample(
+            app=_unfit(app),
+            title=_unfit(title),
+            idle_sec=idle_sec,
+            fullscreen=bool(flags & _FLAG_FULLSCREEN),
+            locked=bool(flags & _FLAG_LOCKED),
+        )
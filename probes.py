@@ -0,0 +1,511 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from config.settings import PROBE, PROBE_SCRIPT
+
+# Windows-залежності — лише для WindowsProbe
+try:
+    import win32gui
+    import win32process
+except ImportError:
+    win32gui = None
+    win32process = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# ======================================================
+#                   ІНТЕРФЕЙС ПРОБИ
+# ======================================================
+
+@dataclass(frozen=True)
+class ProbeSample:
+    """Стан робочого столу в момент опитування."""
+    app: str
+    title: str
+    pid: Optional[int] = None
+    idle_sec: int = 0
+    fullscreen: bool = False
+    # Екран заблоковано — вікно та idle не опитуються
+    locked: bool = False
+
+
+class ProcessNameCache:
+    """
+    Обмежений кеш імен процесів за ключем (pid, create_time) — pid після
+    завершення процесу може дістатись іншому, а create_time — ні.
+
+    Поки активне те саме вікно того самого pid, ім'я повертається без
+    жодного системного виклику: вікно не переживає свій процес, тож зміна
+    процесу завжди означає зміну дескриптора. Для нового вікна читається
+    лише create_time; якщо процес уже завершився — його записи видаляються.
+    """
+
+    def __init__(
+        self,
+        create_time: Callable[[int], Optional[float]],
+        resolve_name: Callable[[int], str],
+        maxsize: int = 256,
+    ):
+        self._create_time = create_time
+        self._resolve_name = resolve_name
+        self.maxsize = maxsize
+        self._names: "OrderedDict[Tuple[int, float], str]" = OrderedDict()
+        self._last: Optional[Tuple[Optional[int], int, str]] = None   # (handle, pid, name)
+
+    def lookup(self, handle: Optional[int], pid: Optional[int]) -> str:
+        if pid is None:
+            return "unknown"
+        last = self._last
+        if last is not None and handle is not None and last[0] == handle and last[1] == pid:
+            return last[2]
+
+        ctime = self._create_time(pid)
+        if ctime is None:
+            # процес завершився (або доступ заборонено) — старі записи вже невалідні
+            self.invalidate(pid)
+            self._last = None
+            return self._resolve_name(pid)
+
+        key = (pid, ctime)
+        name = self._names.get(key)
+        if name is None:
+            name = self._resolve_name(pid)
+            self._names[key] = name
+            if len(self._names) > self.maxsize:
+                self._names.popitem(last=False)
+        else:
+            self._names.move_to_end(key)
+
+        self._last = (handle, pid, name)
+        return name
+
+    def invalidate(self, pid: int) -> None:
+        for key in [k for k in self._names if k[0] == pid]:
+            del self._names[key]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class WindowProbe:
+    """
+    Джерело даних про активне вікно. Платформні реалізації перевизначають
+    active_window / process_name / idle_seconds / is_fullscreen, а sample()
+    збирає все за один виклик. Імена процесів кешуються (ProcessNameCache),
+    якщо реалізація вміє повертати process_create_time.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.names = ProcessNameCache(self.process_create_time, self.process_name)
+
+    def process_create_time(self, pid: int) -> Optional[float]:
+        """Час створення процесу (будь-яка монотонна для процесу величина) або None."""
+        return None
+
+    def active_window(self) -> Tuple[Optional[int], str, Optional[int]]:
+        """(дескриптор вікна, заголовок, pid)."""
+        raise NotImplementedError
+
+    def process_name(self, pid: Optional[int]) -> str:
+        raise NotImplementedError
+
+    def idle_seconds(self) -> int:
+        raise NotImplementedError
+
+    def is_fullscreen(self, handle: Optional[int]) -> bool:
+        raise NotImplementedError
+
+    def is_locked(self) -> bool:
+        """Сесію заблоковано (або ввімкнено заставку) — дешева перевірка без вікон."""
+        return False
+
+    def sample(self) -> ProbeSample:
+        if self.is_locked():
+            return ProbeSample(app="", title="", locked=True)
+
+        handle, title, pid = self.active_window()
+        return ProbeSample(
+            app=self.names.lookup(handle, pid),
+            title=title,
+            pid=pid,
+            idle_sec=self.idle_seconds(),
+            fullscreen=self.is_fullscreen(handle),
+        )
+
+
+# ======================================================
+#                       WINDOWS
+# ======================================================
+
+class _LASTINPUTINFO(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_ulong)]
+
+
+_DESKTOP_SWITCHDESKTOP = 0x0100
+
+
+class _RECT(ctypes.Structure):
+    _fields_ = [
+        ("left", ctypes.c_long),
+        ("top", ctypes.c_long),
+        ("right", ctypes.c_long),
+        ("bottom", ctypes.c_long),
+    ]
+
+
+class WindowsProbe(WindowProbe):
+    """win32gui / psutil / user32 — поведінка колишнього ActiveWindowTracker."""
+
+    name = "windows"
+
+    def __init__(self):
+        if win32gui is None or not hasattr(ctypes, "windll"):
+            raise RuntimeError("WindowsProbe потребує Windows та pywin32")
+        super().__init__()
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        # HDESK — вказівник, інакше на x64 ctypes обріже його до int
+        self._user32.OpenInputDesktop.restype = ctypes.c_void_p
+        self._user32.SwitchDesktop.argtypes = [ctypes.c_void_p]
+        self._user32.CloseDesktop.argtypes = [ctypes.c_void_p]
+
+    def active_window(self) -> Tuple[Optional[int], str, Optional[int]]:
+        hwnd = win32gui.GetForegroundWindow()
+        title = win32gui.GetWindowText(hwnd)
+        pid = None
+        try:
+            pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            pass
+        return hwnd, title, pid
+
+    def process_create_time(self, pid: int) -> Optional[float]:
+        if psutil is None:
+            return None
+        try:
+            return psutil.Process(pid).create_time()
+        except Exception:
+            return None
+
+    def process_name(self, pid: Optional[int]) -> str:
+        if pid is None or psutil is None:
+            return "unknown"
+        try:
+            return psutil.Process(pid).name()
+        except Exception:
+            return "unknown"
+
+    def idle_seconds(self) -> int:
+        last_input_info = _LASTINPUTINFO()
+        last_input_info.cbSize = ctypes.sizeof(last_input_info)
+
+        if self._user32.GetLastInputInfo(ctypes.byref(last_input_info)):
+            millis = self._kernel32.GetTickCount() - last_input_info.dwTime
+            return int(millis / 1000)
+        return 0
+
+    def is_fullscreen(self, handle: Optional[int]) -> bool:
+        if not handle:
+            return False
+
+        rect = _RECT()
+        if not self._user32.GetWindowRect(handle, ctypes.byref(rect)):
+            return False
+
+        width = rect.right - rect.left
+        height = rect.bottom - rect.top
+
+        screen_w = self._user32.GetSystemMetrics(0)
+        screen_h = self._user32.GetSystemMetrics(1)
+
+        # Невелика похибка на рамки / панель задач
+        return width >= screen_w - 1 and height >= screen_h - 1
+
+    def is_locked(self) -> bool:
+        # Поки активний захищений робочий стіл (Win+L, екран входу),
+        # вхідний стіл не відкривається або на нього не можна перемкнутись
+        desktop = self._user32.OpenInputDesktop(0, False, _DESKTOP_SWITCHDESKTOP)
+        if not desktop:
+            return True
+        try:
+            return not self._user32.SwitchDesktop(desktop)
+        finally:
+            self._user32.CloseDesktop(desktop)
+
+
+# ======================================================
+#                   LINUX (X11 + procfs)
+# ======================================================
+
+_SCREEN_SAVER_ON = 1
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("eventMask", ctypes.c_ulong),
+    ]
+
+
+class X11Probe(WindowProbe):
+    """
+    EWMH-властивості кореневого вікна через libX11 (ctypes), ім'я процесу
+    з /proc/<pid>/comm, idle — через розширення XScreenSaver (якщо є).
+    """
+
+    name = "x11"
+
+    _ANY_PROPERTY_TYPE = 0
+
+    def __init__(self, display: Optional[str] = None):
+        lib = ctypes.util.find_library("X11")
+        if not lib:
+            raise RuntimeError("X11Probe: libX11 не знайдено")
+        super().__init__()
+        x11 = ctypes.cdll.LoadLibrary(lib)
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XInternAtom.restype = ctypes.c_ulong
+        x11.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        x11.XGetWindowProperty.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_long, ctypes.c_long,
+            ctypes.c_int, ctypes.c_ulong,
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_void_p),
+        ]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+
+        self._x11 = x11
+        self._display = x11.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise RuntimeError("X11Probe: не вдалося під'єднатися до X-сервера")
+        self._root = x11.XDefaultRootWindow(self._display)
+        self._atoms = {
+            name: x11.XInternAtom(self._display, name.encode(), 0)
+            for name in (
+                "_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "WM_NAME", "_NET_WM_PID",
+                "_NET_WM_STATE", "_NET_WM_STATE_FULLSCREEN",
+            )
+        }
+
+        self._xss = None
+        xss_lib = ctypes.util.find_library("Xss")
+        if xss_lib:
+            self._xss = ctypes.cdll.LoadLibrary(xss_lib)
+            self._xss.XScreenSaverQueryInfo.argtypes = [
+                ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XScreenSaverInfo),
+            ]
+
+    def _property(self, window: int, atom: str) -> Tuple[int, bytes, int]:
+        """(формат, сирі байти, кількість елементів) властивості вікна."""
+        actual_type = ctypes.c_ulong()
+        actual_format = ctypes.c_int()
+        n_items = ctypes.c_ulong()
+        bytes_after = ctypes.c_ulong()
+        data = ctypes.c_void_p()
+        status = self._x11.XGetWindowProperty(
+            self._display, window, self._atoms[atom], 0, 1024, 0, self._ANY_PROPERTY_TYPE,
+            ctypes.byref(actual_type), ctypes.byref(actual_format),
+            ctypes.byref(n_items), ctypes.byref(bytes_after), ctypes.byref(data),
+        )
+        if status != 0 or not data.value:
+            return 0, b"", 0
+        try:
+            fmt = actual_format.value
+            # формат 32 у Xlib — це масив C long незалежно від розрядності
+            size = n_items.value * (ctypes.sizeof(ctypes.c_long) if fmt == 32 else fmt // 8)
+            return fmt, ctypes.string_at(data.value, size), n_items.value
+        finally:
+            self._x11.XFree(data)
+
+    def _longs(self, window: int, atom: str) -> List[int]:
+        fmt, raw, count = self._property(window, atom)
+        if fmt != 32 or not count:
+            return []
+        return list((ctypes.c_ulong * count).from_buffer_copy(raw))
+
+    def active_window(self) -> Tuple[Optional[int], str, Optional[int]]:
+        active = self._longs(self._root, "_NET_ACTIVE_WINDOW")
+        window = active[0] if active else 0
+        if not window:
+            return None, "", None
+
+        _, raw, _ = self._property(window, "_NET_WM_NAME")
+        if not raw:
+            _, raw, _ = self._property(window, "WM_NAME")
+        title = raw.decode("utf-8", errors="replace")
+
+        pids = self._longs(window, "_NET_WM_PID")
+        return window, title, (int(pids[0]) if pids else None)
+
+    def process_create_time(self, pid: int) -> Optional[float]:
+        # starttime (22-е поле /proc/<pid>/stat) у тіках від старту системи;
+        # ім'я процесу в дужках може містити пробіли, тож ріжемо після ")"
+        try:
+            with open(f"/proc/{pid}/stat", "r", encoding="utf-8", errors="replace") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return float(fields[19])
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def process_name(self, pid: Optional[int]) -> str:
+        if pid is None:
+            return "unknown"
+        try:
+            with open(f"/proc/{pid}/comm", "r", encoding="utf-8") as f:
+                return f.read().strip() or "unknown"
+        except OSError:
+            return "unknown"
+
+    def idle_seconds(self) -> int:
+        if self._xss is None:
+            return 0
+        info = _XScreenSaverInfo()
+        if not self._xss.XScreenSaverQueryInfo(self._display, self._root, ctypes.byref(info)):
+            return 0
+        return int(info.idle / 1000)
+
+    def is_locked(self) -> bool:
+        # Локери (xscreensaver, light-locker, xss-lock) вмикають заставку
+        if self._xss is None:
+            return False
+        info = _XScreenSaverInfo()
+        if not self._xss.XScreenSaverQueryInfo(self._display, self._root, ctypes.byref(info)):
+            return False
+        return info.state == _SCREEN_SAVER_ON
+
+    def is_fullscreen(self, handle: Optional[int]) -> bool:
+        if not handle:
+            return False
+        return self._atoms["_NET_WM_STATE_FULLSCREEN"] in self._longs(handle, "_NET_WM_STATE")
+
+
+# ======================================================
+#                      SYNTHETIC
+# ======================================================
+
+class SyntheticProbe(WindowProbe):
+    """
+    Сценарій для тестів і профілювання без робочого столу:
+    послідовність (тривалість у секундах, ProbeSample), яку проба
+    "відтворює" за годинником (за замовчуванням time.monotonic).
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        script: Sequence[Tuple[float, ProbeSample]] = (),
+        loop: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.script = list(script) or [(60.0, ProbeSample(app="synthetic", title="idle desk"))]
+        self.loop = loop
+        self._clock = clock
+        self._t0 = clock()
+        self._total = sum(max(d, 0.0) for d, _ in self.script)
+
+    @classmethod
+    def from_json(cls, path: str, **kwargs) -> "SyntheticProbe":
+        """
+        JSON-список кроків:
+        [{"duration": 30, "app": "code.exe", "title": "main.py", "idle_sec": 0, "fullscreen": false}, ...]
+        "locked": true — крок із заблокованим екраном.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            steps = json.load(f)
+        script = [
+            (
+                float(step.get("duration", 5)),
+                ProbeSample(
+                    app=step.get("app", "unknown"),
+                    title=step.get("title", ""),
+                    pid=step.get("pid"),
+                    idle_sec=int(step.get("idle_sec", 0)),
+                    fullscreen=bool(step.get("fullscreen", False)),
+                    locked=bool(step.get("locked", False)),
+                ),
+            )
+            for step in steps
+        ]
+        return cls(script, **kwargs)
+
+    def current(self) -> ProbeSample:
+        elapsed = self._clock() - self._t0
+        if self.loop and self._total > 0:
+            elapsed %= self._total
+        for duration, sample in self.script:
+            if elapsed < duration:
+                return sample
+            elapsed -= duration
+        return self.script[-1][1]
+
+    def sample(self) -> ProbeSample:
+        return self.current()
+
+    def active_window(self) -> Tuple[Optional[int], str, Optional[int]]:
+        sample = self.current()
+        return None, sample.title, sample.pid
+
+    def process_name(self, pid: Optional[int]) -> str:
+        return self.current().app
+
+    def idle_seconds(self) -> int:
+        return self.current().idle_sec
+
+    def is_fullscreen(self, handle: Optional[int]) -> bool:
+        return self.current().fullscreen
+
+    def is_locked(self) -> bool:
+        return self.current().locked
+
+
+# ======================================================
+#                  ВИБІР ПРОБИ НА СТАРТІ
+# ======================================================
+
+def select_probe(name: Optional[str] = None) -> WindowProbe:
+    """
+    name (або config.settings.PROBE): "windows" | "x11" | "synthetic" | "auto".
+    "auto" — Windows на win32, X11 за наявності DISPLAY. synthetic пише
+    вигадану активність, тож лише на явний запит: якщо справжньої проби
+    немає, "auto" кидає RuntimeError.
+    """
+    name = (name or PROBE or "auto").lower()
+
+    if name == "synthetic":
+        if PROBE_SCRIPT:
+            return SyntheticProbe.from_json(PROBE_SCRIPT)
+        return SyntheticProbe()
+    if name == "windows":
+        return WindowsProbe()
+    if name == "x11":
+        return X11Probe()
+
+    if sys.platform == "win32":
+        return WindowsProbe()
+    if not os.environ.get("DISPLAY"):
+        raise RuntimeError("немає проби вікон: DISPLAY не задано (для тестів — UAM_PROBE=synthetic)")
+    # X11Probe сам кидає RuntimeError, якщо X-сервер недоступний
+    return X11Probe()
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import subprocess
 
 from core.analytics import AnalyticsService
@@ -10,8 +10,8 @@ from config.settings import OLLAMA_EXECUTABLE, OLLAMA_MODEL
 class RecommendationService:
 
 
-    def __init__(self):
-        self.analytics = AnalyticsService()
+    def __init__(self, analytics: Optional[AnalyticsService] = None):
+        self.analytics = analytics or AnalyticsService()
         self.limits_repo = CategoryLimitsRepository()
         self.ollama_exec = OLLAMA_EXECUTABLE
         self.ollama_model = OLLAMA_MODEL
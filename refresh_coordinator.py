@@ -0,0 +1,82 @@
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtWidgets import QStackedWidget, QWidget
+
+
+class RefreshCoordinator(QObject):
+    """
+    Згладжує оновлення UI під час сплесків подій (швидкі перемикання вікон):
+    події лише позначають вигляди брудними, а перемальовування відбувається
+    не частіше ніж раз на interval_ms і тільки для видимої сторінки.
+    Приховані сторінки лишаються брудними й оновлюються, коли їх відкриють.
+    """
+
+    def __init__(self, stack: QStackedWidget, interval_ms: int = 1000, parent=None):
+        super().__init__(parent)
+        self.stack = stack
+        self.interval_ms = max(int(interval_ms), 0)
+
+        # name -> (сторінка в стеку, функція оновлення)
+        self._views: Dict[str, Tuple[QWidget, Callable[[], None]]] = {}
+        self._dirty: Set[str] = set()
+        self._last_flush = 0.0
+        self.flushes = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+        self.stack.currentChanged.connect(self._on_page_changed)
+
+    def register(self, name: str, page: QWidget, refresh: Callable[[], None]) -> None:
+        self._views[name] = (page, refresh)
+
+    def set_interval(self, interval_ms: int) -> None:
+        self.interval_ms = max(int(interval_ms), 0)
+
+    # ---------- Позначки ----------
+
+    def mark_dirty(self, *names: str) -> None:
+        """Без аргументів — усі зареєстровані вигляди."""
+        self._dirty.update(names or self._views.keys())
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer.isActive() or not self._visible_dirty():
+            return
+        # перше оновлення після паузи — одразу, далі не частіше за інтервал
+        since = (time.monotonic() - self._last_flush) * 1000.0
+        self._timer.start(int(max(self.interval_ms - since, 0)))
+
+    # ---------- Оновлення ----------
+
+    def flush(self, force: bool = False) -> None:
+        """Оновлює брудні видимі вигляди (force=True — усі брудні)."""
+        self._timer.stop()
+        names = set(self._dirty) if force else self._visible_dirty()
+        if not names:
+            return
+
+        self._last_flush = time.monotonic()
+        self.flushes += 1
+        for name in [n for n in self._views if n in names]:
+            self._dirty.discard(name)
+            self._views[name][1]()
+
+    def _visible_dirty(self) -> Set[str]:
+        return {name for name in self._dirty if self._is_visible(self._views[name][0])}
+
+    def _is_visible(self, page: Optional[QWidget]) -> bool:
+        if page is None or self.stack.currentWidget() is not page:
+            return False
+        window = page.window()
+        return page.isVisible() and not window.isMinimized()
+
+    def _on_page_changed(self, _index: int) -> None:
+        self._schedule()
+
+    def on_window_shown(self) -> None:
+        """Вікно розгорнули / показали — оновити те, що накопичилось."""
+        self._schedule()
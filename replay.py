@@ -0,0 +1,300 @@
+"""
+Відтворення trace-файлу (core.probe_trace) через той самий
+TrackingPipeline, що й у трекері: записані знімки замість проби,
+класифікація з заглушкою LLM, ті самі черги, політики переповнення
+та заміри етапів.
+
+    python -m core.replay TRACE [--db PATH] [--llm-latency-ms N] [--speed X] [--no-write]
+
+--speed 0 (за замовчуванням) — без пауз між знімками, тобто
+максимальне навантаження; --speed 1 — записані інтервали як є.
+Дані пишуться в тимчасову БД (або --db), а не в робочу.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import core.classifier as classifier_module
+from core.analytics import AnalyticsService
+from core.classifier import Classifier
+from core.pipeline import TrackingPipeline
+from core.poll_scheduler import ClockGapDetector
+from core.probe_trace import read_trace
+from core.probes import ProbeSample
+from core.rule_engine import RuleEngine
+from core.session_builder import SessionBuilder
+from storage.json_repo import JSONRepository
+from storage.sqlite_repo import SQLiteSessionRepository
+
+
+# Детермінована "LLM": перше ключове слово в app / title визначає категорію
+STUB_KEYWORDS = (
+    ("code", "work"),
+    ("pycharm", "work"),
+    ("excel", "work"),
+    ("steam", "games"),
+    ("youtube", "media"),
+    ("vlc", "media"),
+    ("netflix", "media"),
+    ("telegram", "communication"),
+    ("discord", "communication"),
+    ("slack", "communication"),
+    ("instagram", "social"),
+    ("course", "education"),
+    ("chrome", "browsing"),
+    ("firefox", "browsing"),
+)
+
+
+class StubLLMClassifier(Classifier):
+    """Classifier з тими ж правилами / історією, але без виклику Ollama."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__()
+        self.latency_sec = max(latency_ms, 0.0) / 1000.0
+        self.llm_calls = 0
+
+    def _classify_via_llm(self, app: str, title: str) -> str:
+        self.llm_calls += 1
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        text = f"{app} {title}".lower()
+        for keyword, category in STUB_KEYWORDS:
+            if keyword in text:
+                return category
+        return "other"
+
+
+# ======================================================
+#             TRACE-ФАЙЛ ЯК ПРОБА І ГОДИННИК
+# ======================================================
+
+class TraceFeed:
+    """
+    Записані знімки замість проби: sample() віддає наступний знімок,
+    clock() — його час із trace-файлу. Після останнього знімка конвеєр
+    зупиняється, а решта етапів дочищує свої черги.
+    """
+
+    def __init__(self, items: List[Tuple[float, ProbeSample]]):
+        self.items = items
+        self.index = -1
+        self.pipeline: Optional[TrackingPipeline] = None
+
+    def sample(self) -> ProbeSample:
+        self.index = min(self.index + 1, len(self.items) - 1)
+        if self.index == len(self.items) - 1 and self.pipeline is not None:
+            self.pipeline.stop()
+        return self.items[self.index][1]
+
+    def clock(self) -> datetime:
+        return datetime.fromtimestamp(self.items[max(self.index, 0)][0])
+
+    def next_interval(self) -> float:
+        """Скільки секунд між поточним і наступним записаним знімком."""
+        if self.index + 1 >= len(self.items):
+            return 0.0
+        return max(self.items[self.index + 1][0] - self.items[self.index][0], 0.0)
+
+
+class TraceScheduler:
+    """
+    Розклад опитування за trace-файлом: пауза перед наступним знімком —
+    записаний інтервал, поділений на speed (1 — реальний час).
+    speed <= 0 — без пауз: проба видає знімки так швидко, як їх
+    приймають черги, тож видно backpressure і відкинуті знімки.
+    """
+
+    def __init__(self, feed: TraceFeed, speed: float = 0.0):
+        self.feed = feed
+        self.speed = speed
+
+    def plan(self, changed: bool, idle: bool, suspended: bool = False) -> float:
+        # інтервали вже визначені записом
+        return self.feed.next_interval()
+
+    def next_delay(self) -> float:
+        if self.speed <= 0:
+            return 0.0
+        return self.feed.next_interval() / self.speed
+
+    def record_wakeup(self) -> None:
+        pass
+
+
+class NullWriter:
+    """Сховище, що нічого не пише: замір конвеєра без дискового I/O."""
+
+    def save_session(self, session: dict) -> None:
+        pass
+
+    def save_break(self, start_ts: int, end_ts: int, last_category: Optional[str] = None) -> None:
+        pass
+
+
+class _CountingBuilder(SessionBuilder):
+    """SessionBuilder, що рахує перерви з кожного TickResult (feed, interrupt, close)."""
+
+    breaks = 0
+
+    def _count(self, result):
+        self.breaks += len(result.breaks)
+        return result
+
+    def feed(self, sample, now_dt):
+        return self._count(super().feed(sample, now_dt))
+
+    def interrupt(self, last_dt, now_dt, as_break):
+        return self._count(super().interrupt(last_dt, now_dt, as_break))
+
+    def close(self, now_dt):
+        return self._count(super().close(now_dt))
+
+
+# ======================================================
+#                      ЗВІТ
+# ======================================================
+
+@dataclass
+class ReplayReport:
+    ticks: int = 0
+    sessions: int = 0
+    breaks: int = 0
+    rules_fired: int = 0
+    llm_calls: int = 0
+    elapsed_sec: float = 0.0
+    # метрики етапів TrackingPipeline.metrics()
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def format(self) -> str:
+        elapsed = max(self.elapsed_sec, 1e-9)
+        lines = [
+            f"ticks:     {self.ticks}  ({self.ticks / elapsed:,.0f}/s)",
+            f"sessions:  {self.sessions}  ({self.sessions / elapsed:,.1f}/s)",
+            f"breaks:    {self.breaks}",
+            f"rules:     {self.rules_fired}",
+            f"llm calls: {self.llm_calls}",
+            f"elapsed:   {self.elapsed_sec:.3f} s",
+            "",
+            f"{'stage':<12}{'done':>8}{'dropped':>9}{'merged':>8}{'blocked':>9}{'max q':>7}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'wait p95':>10}",
+        ]
+        for name, s in self.stages.items():
+            lines.append(
+                f"{name:<12}{s['processed']:>8}{s['dropped']:>9}{s['merged']:>8}{s['blocked']:>9}"
+                f"{s['max_depth']:>7}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['max_ms']:>10.3f}"
+                f"{s['wait_p95_ms']:>10.3f}"
+            )
+        return "\n".join(lines)
+
+
+# ======================================================
+#                      REPLAY
+# ======================================================
+
+def replay(
+    trace_path: str,
+    db_path: Optional[str] = None,
+    json_dir: Optional[str] = None,
+    llm_latency_ms: float = 0.0,
+    idle_timeout: int = 300,
+    min_session_sec: int = 10,
+    passive_apps: Optional[List[str]] = None,
+    passive_categories: Optional[List[str]] = None,
+    speed: float = 0.0,
+    write: bool = True,
+) -> ReplayReport:
+    report = ReplayReport()
+    items = list(read_trace(trace_path))
+    if not items:
+        return report
+
+    # тимчасові БД і JSON-журнал прибираються разом з каталогом
+    with tempfile.TemporaryDirectory(prefix="uam-replay-") as workdir:
+        sqlite_repo = SQLiteSessionRepository(db_path or os.path.join(workdir, "replay.sqlite3"))
+        json_repo = JSONRepository(json_dir or os.path.join(workdir, "raw"))
+        writer = None if write else NullWriter()
+
+        classifier_module.DEBUG_CLASSIFIER = False
+        classifier = StubLLMClassifier(latency_ms=llm_latency_ms)
+
+        # classify=None: як у трекері, класифікує окремий етап конвеєра
+        builder = _CountingBuilder(
+            classify=None,
+            idle_timeout=idle_timeout,
+            passive_apps=passive_apps if passive_apps is not None else ["vlc.exe", "mpv.exe"],
+            passive_categories=passive_categories if passive_categories is not None else ["media"],
+            min_session_sec=min_session_sec,
+        )
+
+        def on_session(_session: dict) -> None:
+            report.sessions += 1
+
+        def on_rule(_text: str, _level: str) -> None:
+            report.rules_fired += 1
+
+        feed = TraceFeed(items)
+        pipeline = TrackingPipeline(
+            sample=feed.sample,
+            builder=builder,
+            classify=classifier.classify,
+            sqlite_repo=writer or sqlite_repo,
+            json_repo=writer or json_repo,
+            scheduler=TraceScheduler(feed, speed),
+            rule_engine=RuleEngine(AnalyticsService(sqlite_repo)),
+            on_session=on_session,
+            on_rule=on_rule,
+            clock=feed.clock,
+            # У trace-файлі лише настінний час: розриви — це довгі проміжки між знімками
+            gaps=ClockGapDetector(clock=None),
+        )
+        feed.pipeline = pipeline
+
+        started = time.perf_counter()
+        asyncio.run(pipeline.run())
+        report.elapsed_sec = time.perf_counter() - started
+
+        report.stages = pipeline.metrics()
+        report.ticks = int(report.stages["probe"]["processed"])
+        report.breaks = builder.breaks
+        report.llm_calls = classifier.llm_calls
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a probe trace through the tracking pipeline")
+    parser.add_argument("trace", help="trace-файл, записаний TraceRecorder")
+    parser.add_argument("--db", help="SQLite-файл для сесій (за замовчуванням — тимчасовий)")
+    parser.add_argument("--json-dir", help="каталог для JSON-журналу (за замовчуванням — тимчасовий)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="штучна затримка заглушки LLM")
+    parser.add_argument("--idle-timeout", type=int, default=300)
+    parser.add_argument("--min-session", type=int, default=10)
+    parser.add_argument(
+        "--speed", type=float, default=0.0,
+        help="1 — записані інтервали в реальному часі, 60 — хвилина за секунду, 0 — без пауз",
+    )
+    parser.add_argument("--no-write", action="store_true", help="не писати сесії (NullWriter)")
+    args = parser.parse_args(argv)
+
+    report = replay(
+        args.trace,
+        db_path=args.db,
+        json_dir=args.json_dir,
+        llm_latency_ms=args.llm_latency_ms,
+        idle_timeout=args.idle_timeout,
+        min_session_sec=args.min_session,
+        speed=args.speed,
+        write=not args.no_write,
+    )
+    print(report.format())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,8 +10,8 @@ class RuleEngine:
     COOLDOWN_WARNING = 20 * 60   # 20 хв для post-toast
     COOLDOWN_OVER = 5 * 60       # 5 хв для post-toast
 
-    def __init__(self):
-        self.analytics = AnalyticsService()
+    def __init__(self, analytics: Optional[AnalyticsService] = None):
+        self.analytics = analytics or AnalyticsService()
         self.limits_repo = CategoryLimitsRepository()
 
         # для post-toast (після завершення сесії): category -> timestamp
@@ -0,0 +1,409 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from core.probes import ProbeSample
+from core.session_compaction import normalize_title
+
+
+# ======================================================
+#                       ПОДІЇ
+# ======================================================
+
+@dataclass(frozen=True)
+class BreakEvent:
+    """Завершена перерва (idle → active)."""
+    start_ts: int
+    end_ts: int
+    last_category: Optional[str]
+
+
+@dataclass
+class TickResult:
+    """
+    Результат обробки одного знімка.
+    sessions — завершені (вже класифіковані) сесії у форматі репозиторіїв,
+    activity — payload для сигналу current_activity,
+    live_state — стан поточної сесії / перерви для оверлею "сьогодні".
+    """
+    sessions: List[dict] = field(default_factory=list)
+    breaks: List[BreakEvent] = field(default_factory=list)
+    changed: bool = False
+    activity: Optional[dict] = None
+    live_state: Optional[dict] = None
+
+
+class PassiveAppMatcher:
+    """
+    Скомпільовані правила пасивних застосунків: "vlc.exe" (увесь застосунок)
+    або "chrome.exe::youtube.com" (застосунок + підрядок заголовка).
+
+    Правила розбираються один раз: множина цілих застосунків і
+    exe -> один regex з усіх доменів (заголовок проглядається за один прохід).
+    Результат для (app, title) запам'ятовується, доки не зміниться вікно.
+    """
+
+    def __init__(self, rules: Sequence[str] = ()):
+        self.rules: List[str] = list(rules)
+        self._whole_apps = set()
+        self._domains: Dict[str, Pattern] = {}
+
+        domains: Dict[str, set] = {}
+        for rule in self.rules:
+            rule = rule.lower()
+            if "::" not in rule:
+                self._whole_apps.add(rule)
+                continue
+            exe, domain = rule.split("::", 1)
+            if not domain:
+                self._whole_apps.add(exe)
+            else:
+                domains.setdefault(exe, set()).add(domain)
+
+        for exe, items in domains.items():
+            if exe in self._whole_apps:
+                continue
+            self._domains[exe] = re.compile("|".join(re.escape(d) for d in sorted(items)))
+
+        self._last_key: Optional[Tuple[str, str]] = None
+        self._last_result = False
+
+    def matches(self, app: str, title: str) -> bool:
+        key = (app, title)
+        if key == self._last_key:
+            return self._last_result
+
+        app_l = (app or "").lower()
+        if app_l in self._whole_apps:
+            result = True
+        else:
+            pattern = self._domains.get(app_l)
+            result = bool(pattern is not None and pattern.search((title or "").lower()))
+
+        self._last_key = key
+        self._last_result = result
+        return result
+
+
+class ActivityDelta:
+    """
+    Стискає потік activity (по одному на тік) до подій змін: віддає лише
+    поля, що змінились (перша подія — усі), плюс duration_sec як точку
+    відліку для локального лічильника в UI. Тіки, де зросла лише
+    тривалість, відсіюються.
+    """
+
+    FIELDS = ("app", "title", "idle", "is_fullscreen", "category", "locked", "start_ts")
+
+    def __init__(self):
+        self._last: Dict[str, object] = {}
+
+    def diff(self, activity: dict) -> Optional[dict]:
+        delta = {
+            key: activity.get(key)
+            for key in self.FIELDS
+            if key not in self._last or self._last[key] != activity.get(key)
+        }
+        if not delta:
+            return None
+        self._last.update(delta)
+        delta["duration_sec"] = activity.get("duration_sec", 0)
+        return delta
+
+    def reset(self) -> None:
+        self._last = {}
+
+
+# ======================================================
+#                    SESSION BUILDER
+# ======================================================
+
+class SessionBuilder:
+    """
+    Чиста (без Qt, годинника та I/O) логіка трекера: з потоку знімків
+    проби з явними часовими мітками будує сесії та перерви.
+
+    - межі сесій з debounce коротких перемикань (min_session_sec);
+    - idle → перерви, пасивні застосунки / категорії ніколи не idle;
+    - заблокований екран і сон (interrupt) — перерва, а сесія
+      закривається на останньому реальному знімку;
+    - класифікація завершеної сесії через переданий classify(app, title).
+
+    classify=None — сесії віддаються без категорії, а класифікує їх
+    наступний етап (core.pipeline) через apply_category().
+    """
+
+    def __init__(
+        self,
+        classify: Optional[Callable[[str, str], str]],
+        idle_timeout: int = 300,
+        passive_apps: Sequence[str] = (),
+        passive_categories: Sequence[str] = (),
+        min_session_sec: int = 10,
+    ):
+        self.classify = classify
+        self.idle_timeout = idle_timeout
+        self.passive_apps = passive_apps
+        self.passive_categories = list(passive_categories)
+        self.min_session_sec = min_session_sec
+
+        # ---------- Стан сесії ----------
+        self.current_session: Optional[dict] = None
+        self.current_start_dt: Optional[datetime] = None
+        # Нормалізований заголовок поточної сесії — ключ порівняння вікон
+        self._title_key: str = ""
+        # Кандидат на нову сесію: (app, ключ заголовка, коли вперше побачили, заголовок)
+        self._pending_switch: Optional[tuple] = None
+
+        # ---------- Стан для перерв ----------
+        self._is_idle: bool = False
+        self._current_break_start: Optional[int] = None
+        self._last_active_category: Optional[str] = None
+        self._locked: bool = False
+
+        # Остання відома категорія для (app, title) — щоб поточна сесія
+        # враховувалась у "сьогодні" ще до її завершення.
+        self.last_categories: Dict[Tuple[str, str], str] = {}
+
+    # ---------- Правила пасивних застосунків ----------
+
+    @property
+    def passive_apps(self) -> List[str]:
+        return self._passive_matcher.rules
+
+    @passive_apps.setter
+    def passive_apps(self, rules: Sequence[str]) -> None:
+        # компілюється при зміні налаштувань, а не на кожному тіку
+        self._passive_matcher = PassiveAppMatcher(rules)
+
+    # ---------- Обробка знімка ----------
+
+    def feed(self, sample: ProbeSample, now_dt: datetime) -> TickResult:
+        if sample.locked:
+            return self._feed_locked(now_dt)
+
+        result = TickResult()
+
+        app = sample.app
+        title = sample.title or ""
+        # "(3) Inbox" → "(4) Inbox" — це те саме вікно, а не нова сесія;
+        # сесія зберігає справжній заголовок першого фрагмента
+        title_key = normalize_title(title)
+        raw_idle = sample.idle_sec >= self.idle_timeout
+        now_ts = int(now_dt.timestamp())
+
+        # Категорія для passive_categories — тільки якщо сесія вже класифікована
+        category = self.current_session["category"] if self.current_session else None
+
+        passive = (
+            (category in self.passive_categories)
+            or self._passive_matcher.matches(app, title)
+        )
+
+        # Кінцевий idle, який іде в UI та в breaks
+        effective_idle = raw_idle and not passive
+
+        # Чи змінилось щось із попереднього тіку (для адаптивного інтервалу)
+        result.changed = (
+            self._locked
+            or self.current_session is None
+            or effective_idle != self._is_idle
+            or app != self.current_session["app"]
+            or title_key != self._title_key
+        )
+
+        self._locked = False
+        self._handle_idle_transition(effective_idle, now_ts, result)
+
+        if self.current_session is None:
+            # Перша сесія
+            self._start_session(app, title, effective_idle, now_dt)
+        elif (
+            app == self.current_session["app"]
+            and title_key == self._title_key
+        ):
+            # Повернулись у те саме вікно — короткий перехід іде в поточну сесію
+            self._pending_switch = None
+        else:
+            # Зміна активного вікна стає новою сесією, лише якщо вікно
+            # протрималось min_session_sec (debounce швидких перемикань)
+            if self._pending_switch is None or self._pending_switch[:2] != (app, title_key):
+                self._pending_switch = (app, title_key, now_dt, title)
+            switch_dt = self._pending_switch[2]
+
+            if (now_dt - switch_dt).total_seconds() >= self.min_session_sec:
+                switch_title = self._pending_switch[3]
+                self._pending_switch = None
+                self.current_session["idle"] = effective_idle
+                result.sessions.append(self._finish_session(switch_dt))
+                self._start_session(app, switch_title, effective_idle, switch_dt)
+
+        # Далі — стабільна сесія (кандидат ще може виявитись коротким переходом)
+        app = self.current_session["app"]
+        title = self.current_session["title"]
+
+        result.live_state = {
+            "app": app,
+            "category": self.last_categories.get((app, title)),
+            "start_ts": int(self.current_start_dt.timestamp()),
+            "idle": effective_idle,
+            "break_start_ts": self._current_break_start,
+        }
+        result.activity = {
+            "app": app,
+            "title": title,
+            "idle": effective_idle,
+            "duration_sec": int((now_dt - self.current_start_dt).total_seconds()),
+            "category": self.current_session.get("category") or result.live_state["category"],
+            "is_fullscreen": sample.fullscreen,
+            "locked": False,
+            "start_ts": result.live_state["start_ts"],
+        }
+        return result
+
+    def close(self, now_dt: datetime) -> TickResult:
+        """Завершує поточну сесію (зупинка трекера)."""
+        result = TickResult()
+        if self.current_session and self.current_session["end"] is None:
+            self._close_session(now_dt, result)
+        self._drop_session()
+        return result
+
+    # ---------- Блокування та розриви ----------
+
+    def _feed_locked(self, now_dt: datetime) -> TickResult:
+        """Екран заблоковано: сесія закривається, далі — перерва до розблокування."""
+        result = TickResult(changed=not self._locked)
+        self._locked = True
+
+        if self.current_session is not None:
+            self._close_session(now_dt, result)
+        if self._current_break_start is None:
+            self._current_break_start = int(now_dt.timestamp())
+        self._is_idle = True
+
+        result.live_state = {
+            "app": None,
+            "category": None,
+            "start_ts": None,
+            "idle": True,
+            "break_start_ts": self._current_break_start,
+        }
+        result.activity = {
+            "app": "",
+            "title": "",
+            "idle": True,
+            "duration_sec": 0,
+            "category": None,
+            "is_fullscreen": False,
+            "locked": True,
+            "start_ts": None,
+        }
+        return result
+
+    def interrupt(self, last_dt: datetime, now_dt: datetime, as_break: bool) -> TickResult:
+        """
+        Розрив у потоці знімків (див. core.poll_scheduler.ClockGapDetector).
+        Поточна сесія закривається на last_dt — останньому реальному знімку,
+        а не на now_dt через години. as_break=True (сон) — проміжок до now_dt
+        стає перервою; інакше (стрибок годинника) просто починається нова сесія.
+        """
+        result = TickResult(changed=True)
+        if self.current_session is not None:
+            self._close_session(last_dt, result)
+
+        if self._locked and as_break:
+            # сон під час блокування — та сама перерва триває
+            return result
+
+        last_ts = int(last_dt.timestamp())
+        break_start = self._current_break_start
+        if as_break and break_start is None:
+            break_start = last_ts
+        break_end = int(now_dt.timestamp()) if as_break else last_ts
+        if break_start is not None and break_end > break_start:
+            result.breaks.append(BreakEvent(break_start, break_end, self._last_active_category))
+
+        self._current_break_start = None
+        self._is_idle = False
+        self._locked = False
+        return result
+
+    def _close_session(self, end_dt: datetime, result: TickResult) -> None:
+        """
+        Закриває поточну сесію на end_dt (блокування, розрив, зупинка).
+        Пропускається лише нульовий уривок (сон чи блокування одразу після
+        розблокування). Коротка сесія тут — завжди перша після старту чи
+        перерви (після перемикання вона вже триває min_session_sec), тож
+        дописати її нема до чого: вона записується як є, час не губиться.
+        """
+        duration = (end_dt - self.current_start_dt).total_seconds()
+        if duration > 0:
+            result.sessions.append(self._finish_session(end_dt))
+        self._drop_session()
+
+    def _drop_session(self) -> None:
+        self.current_session = None
+        self.current_start_dt = None
+        self._pending_switch = None
+
+    # ---------- Перерви ----------
+
+    def _handle_idle_transition(self, is_idle_now: bool, now_ts: int, result: TickResult) -> None:
+        was_idle = self._is_idle
+
+        # ACTIVE → IDLE — початок перерви
+        if not was_idle and is_idle_now:
+            self._current_break_start = now_ts
+
+        # IDLE → ACTIVE — кінець перерви
+        elif was_idle and not is_idle_now:
+            if self._current_break_start is not None:
+                result.breaks.append(
+                    BreakEvent(
+                        start_ts=self._current_break_start,
+                        end_ts=now_ts,
+                        last_category=self._last_active_category,
+                    )
+                )
+                self._current_break_start = None
+
+        self._is_idle = is_idle_now
+
+    # ---------- Сесії ----------
+
+    def _start_session(self, app: str, title: str, idle: bool, start_dt: datetime) -> None:
+        self.current_start_dt = start_dt
+        self._title_key = normalize_title(title)
+        self.current_session = {
+            "start": start_dt.isoformat(),
+            "end": None,
+            "app": app,
+            "title": title,
+            "category": None,
+            "idle": idle,
+        }
+
+    def _finish_session(self, end_dt: datetime) -> dict:
+        session = self.current_session
+        session["end"] = end_dt.isoformat()
+        session["duration_sec"] = max(int((end_dt - self.current_start_dt).total_seconds()), 0)
+
+        # Класифікація (якщо її не винесено в окремий етап)
+        if self.classify is not None:
+            self.apply_category(session, self.classify(session["app"], session["title"]))
+
+            # Оновлюємо останню активну категорію (для майбутніх breaks)
+            if not session["idle"]:
+                self._last_active_category = session["category"]
+
+        return session.copy()
+
+    def apply_category(self, session: dict, category: str) -> dict:
+        """Записує категорію в сесію; медіа / пасивні категорії — ніколи не idle."""
+        session["category"] = category
+        self.last_categories[(session["app"], session["title"])] = category
+        if category in self.passive_categories:
+            session["idle"] = False
+        return session
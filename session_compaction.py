@@ -0,0 +1,41 @@
+import re
+from typing import Optional
+
+
+# Фрагменти одного застосунку, між якими менше цього проміжку (с), зливаються
+DEFAULT_MERGE_GAP_SEC = 30
+
+# Версія правил злиття: місячний файл, стиснутий старшою версією, проходить ще раз
+COMPACTION_VERSION = 1
+
+
+# ======================================================
+#               НОРМАЛІЗАЦІЯ ЗАГОЛОВКІВ
+# ======================================================
+
+# Лічильники та маркери, які змінюються без зміни самого вікна:
+#   "(3) Inbox - Gmail", "[12] Telegram", "● main.py - VS Code", "* notes.txt"
+_TITLE_PREFIXES = re.compile(r"^(?:\(\d+\+?\)\s*|\[\d+\+?\]\s*|[●•*]\s+)+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Заголовок без лічильників непрочитаного / маркерів незбережених змін."""
+    if not title:
+        return ""
+    title = _TITLE_PREFIXES.sub("", title.strip())
+    return _SPACES.sub(" ", title)
+
+
+def can_merge(prev: tuple, nxt: tuple, max_gap_sec: int) -> bool:
+    """
+    Чи можна дописати фрагмент nxt до prev.
+    Обидва — (start_ts, end_ts, app_id, title, category_id, is_idle),
+    title — нормалізований заголовок (normalize_title), лише як ключ. Зливаються лише фрагменти того самого
+    застосунку / заголовка / категорії / idle-стану з малим проміжком.
+    """
+    return (
+        prev[2:] == nxt[2:]
+        and nxt[0] >= prev[0]
+        and nxt[0] - prev[1] <= max_gap_sec
+    )
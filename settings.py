@@ -1,6 +1,18 @@
+import os
+
 DB_PATH = "user_activity.sqlite3"
 TRACK_INTERVAL = 5
 
 OLLAMA_EXECUTABLE = r"C:\Users\kinga\AppData\Local\Programs\Ollama\ollama.exe"
 
 OLLAMA_MODEL = "llama3"
+
+# Джерело даних про активне вікно: auto | windows | x11 | synthetic
+PROBE = os.environ.get("UAM_PROBE", "auto")
+# JSON-сценарій для synthetic-проби (див. core.probes.SyntheticProbe.from_json)
+PROBE_SCRIPT = os.environ.get("UAM_PROBE_SCRIPT")
+
+# Запис сирих знімків проби у кільцевий файл для відтворення (core.replay).
+# Вимкнено, якщо шлях не задано.
+TRACE_PATH = os.environ.get("UAM_TRACE_PATH")
+TRACE_CAPACITY = int(os.environ.get("UAM_TRACE_CAPACITY", "100000"))
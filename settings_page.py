@@ -54,7 +54,7 @@ def save_toast_settings(cfg: dict) -> None:
 
 
 class SettingsPage(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, context=None):
         super().__init__(parent)
 
         # --- репозиторії ---
@@ -82,13 +82,13 @@ class SettingsPage(QWidget):
         }
         self._weekday_profile_combos: Dict[str, QComboBox] = {}
 
-        # налаштування idle / passive
-        from storage.settings_repo import SettingsRepository
-        from core.settings_service import SettingsService
-        from config.settings import DB_PATH
+        # налаштування idle / passive — спільний SettingsService вікна,
+        # тож зміни одразу отримують воркер і дашборд
+        from core.app_context import AppContext
 
-        self.settings_repo_idle = SettingsRepository(DB_PATH)
-        self.settings_idle = SettingsService(self.settings_repo_idle)
+        context = context or AppContext()
+        self.settings_repo_idle = context.settings_repo
+        self.settings_idle = context.settings
 
         # ===================================================================
         # ROOT: 2 КОЛОНКИ
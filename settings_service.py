@@ -32,6 +32,27 @@ class SettingsService(QObject):
             self.cache["break_min_visible_sec"] = 5
             self.repo.set("break_min_visible_sec", 5)
 
+        # Скільки днів зберігати сирі сесії; старші згортаються в погодинні
+        # агрегати (0 — зберігати все)
+        if "raw_retention_days" not in self.cache:
+            self.cache["raw_retention_days"] = 730
+            self.repo.set("raw_retention_days", 730)
+
+        # Вікна, активні менше за стільки секунд, додаються до сусідньої сесії
+        if "session_min_duration_sec" not in self.cache:
+            self.cache["session_min_duration_sec"] = 10
+            self.repo.set("session_min_duration_sec", 10)
+
+        # Фрагменти одного вікна з розривом до стількох секунд зливаються
+        if "session_merge_gap_sec" not in self.cache:
+            self.cache["session_merge_gap_sec"] = 30
+            self.repo.set("session_merge_gap_sec", 30)
+
+        # Найчастіше перемальовування дашборду після завершення сесій (мс)
+        if "ui_refresh_interval_ms" not in self.cache:
+            self.cache["ui_refresh_interval_ms"] = 1000
+            self.repo.set("ui_refresh_interval_ms", 1000)
+
     def get(self, key, default=None):
         return self.cache.get(key, default)
 
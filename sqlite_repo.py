@@ -1,17 +1,281 @@
 import os
 import sqlite3
-from datetime import datetime
-from typing import Dict, List, Optional
+import stat
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from config.settings import DB_PATH
+from core.session_compaction import (
+    COMPACTION_VERSION,
+    DEFAULT_MERGE_GAP_SEC,
+    can_merge,
+    normalize_title,
+)
+
+
+# Версія даних для кожного файлу БД. Спільна для всіх екземплярів репозиторію
+# в процесі: будь-який запис сесії / перерви її інкрементує, а кеші
+# (наприклад, знімок "сьогодні" в AnalyticsService) звіряються з нею.
+_DATA_VERSIONS: Dict[str, int] = {}
+_DATA_VERSIONS_LOCK = threading.Lock()
+
+# Те саме по місяцях ("YYYY-MM" -> лічильник): кеш закритого періоду
+# звіряється лише з місяцями свого діапазону, тож запис поточної сесії
+# його не скидає. "*" — зміна в невідомих місяцях (інший процес).
+_MONTH_VERSIONS: Dict[str, Dict[str, int]] = {}
+ALL_MONTHS = "*"
+
+# Файли БД, для яких цей процес уже створив схему та провів міграції:
+# наступні екземпляри репозиторію (сторінки, сервіси) їх не повторюють
+_INITIALIZED_DBS: set = set()
+_INIT_LOCK = threading.Lock()
+
+# Розмір пакета для міграції старих TEXT-дат у цілі epoch-колонки
+MIGRATION_BATCH_SIZE = 5000
+
+_EPOCH_DAY = date(1970, 1, 1)
+
+# Довідники для dictionary encoding: таблиця -> колонка зі значенням
+DIMENSIONS = (("apps", "name"), ("titles", "text"), ("categories", "name"))
+
+# Скільки значень кожного довідника тримати в пам'яті на шляху запису
+DIMENSION_CACHE_SIZE = 2048
+
+# Скільки id передавати в одному WHERE id IN (...) (ліміт параметрів SQLite)
+DIMENSION_QUERY_CHUNK = 900
+
+# Щомісячні файли з сесіями та перервами лежать поруч з основною БД:
+# user_activity.sqlite3 -> user_activity.months/2025-03.sqlite3
+SHARDS_DIR_SUFFIX = ".months"
+SHARD_ALIAS = "shard"
+
+
+def day_to_num(day: str | date) -> int:
+    """'YYYY-MM-DD' (або date) → номер дня від 1970-01-01 (локальна дата)."""
+    if isinstance(day, str):
+        day = datetime.strptime(day, "%Y-%m-%d").date()
+    return (day - _EPOCH_DAY).days
+
+
+def num_to_day(day_num: int) -> str:
+    """Номер дня → 'YYYY-MM-DD'."""
+    return (_EPOCH_DAY + timedelta(days=int(day_num))).strftime("%Y-%m-%d")
+
+
+def month_of_day_num(day_num: int) -> str:
+    """Номер дня → ключ місяця 'YYYY-MM'."""
+    return num_to_day(day_num)[:7]
+
+
+def month_of_ts(ts: int) -> str:
+    """Epoch-секунди → ключ місяця 'YYYY-MM' за локальним часом."""
+    return datetime.fromtimestamp(int(ts)).strftime("%Y-%m")
+
+
+def months_between(first_month: str, last_month: str) -> List[str]:
+    """Усі ключі місяців від first до last включно."""
+    year, month = int(first_month[:4]), int(first_month[5:7])
+    result: List[str] = []
+    while True:
+        key = f"{year:04d}-{month:02d}"
+        if key > last_month:
+            break
+        result.append(key)
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return result
+
+
+# Таблиці, які живуть у місячних файлах (і в основній БД для сумісності)
+_PARTITION_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.session_facts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        day_num INTEGER NOT NULL,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        duration_sec INTEGER NOT NULL,
+        app_id INTEGER NOT NULL,
+        title_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        is_idle INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_facts_day_num ON session_facts (day_num, is_idle)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_facts_start_ts ON session_facts (start_ts)",
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.breaks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        duration_sec INTEGER NOT NULL,
+        last_category TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_breaks_start_ts ON breaks (start_ts)",
+    # Агрегати для сесій, старших за термін зберігання: година × застосунок
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.session_rollups (
+        hour_ts INTEGER NOT NULL,
+        day_num INTEGER NOT NULL,
+        app_id INTEGER NOT NULL,
+        title_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        is_idle INTEGER NOT NULL DEFAULT 0,
+        duration_sec INTEGER NOT NULL,
+        sessions_count INTEGER NOT NULL,
+        PRIMARY KEY (hour_ts, app_id, category_id, is_idle)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_rollups_day_num ON session_rollups (day_num, is_idle)",
+    # Сирі сесії + агрегати як "сесії" тривалістю до години — читачам
+    # байдуже, чи діапазон перетинає межу зберігання
+    """
+    CREATE VIEW IF NOT EXISTS {schema}.session_rows AS
+    SELECT day_num, start_ts, duration_sec, app_id, title_id, category_id, is_idle
+    FROM session_facts
+    UNION ALL
+    SELECT day_num, hour_ts, duration_sec, app_id, title_id, category_id, is_idle
+    FROM session_rollups
+    """,
+)
+
+
+def _hour_pieces(start_ts: int, duration_sec: int) -> Iterator[tuple]:
+    """
+    Розбиває сесію на частини по локальних годинах:
+    (початок години epoch, номер дня, секунди в цій годині).
+    """
+    end_ts = start_ts + max(int(duration_sec or 0), 0)
+    dt = datetime.fromtimestamp(start_ts)
+    hour_ts = start_ts - dt.minute * 60 - dt.second
+    cursor = start_ts
+    while True:
+        next_hour = hour_ts + 3600
+        part = min(end_ts, next_hour) - cursor
+        yield hour_ts, day_to_num(datetime.fromtimestamp(hour_ts).date()), max(part, 0)
+        if end_ts <= next_hour:
+            return
+        cursor = hour_ts = next_hour
+
+
+# Сумісне представлення sessions зі старими TEXT-колонками: сирі сесії +
+# погодинні агрегати одного місячного файлу (schema). Постійне
+# представлення в основній БД не бачить під'єднаних файлів, тож sessions
+# існує як TEMP-представлення з'єднання compat_connection()
+_SESSIONS_VIEW_SELECT = """
+    SELECT f.id AS id,
+           date(f.day_num * 86400, 'unixepoch') AS day,
+           strftime('%Y-%m-%dT%H:%M:%S', f.start_ts, 'unixepoch', 'localtime') AS start,
+           strftime('%Y-%m-%dT%H:%M:%S', f.end_ts, 'unixepoch', 'localtime') AS end,
+           f.duration_sec AS duration_sec,
+           a.name AS app,
+           t.text AS title,
+           c.name AS category,
+           f.is_idle AS is_idle,
+           f.start_ts AS start_ts,
+           f.end_ts AS end_ts,
+           f.day_num AS day_num
+    FROM {schema}.session_facts f
+    JOIN main.apps a ON a.id = f.app_id
+    JOIN main.titles t ON t.id = f.title_id
+    JOIN main.categories c ON c.id = f.category_id
+    UNION ALL
+    SELECT NULL,
+           date(r.day_num * 86400, 'unixepoch'),
+           strftime('%Y-%m-%dT%H:%M:%S', r.hour_ts, 'unixepoch', 'localtime'),
+           strftime('%Y-%m-%dT%H:%M:%S', r.hour_ts + r.duration_sec, 'unixepoch', 'localtime'),
+           r.duration_sec,
+           a.name,
+           t.text,
+           c.name,
+           r.is_idle,
+           r.hour_ts,
+           r.hour_ts + r.duration_sec,
+           r.day_num
+    FROM {schema}.session_rollups r
+    JOIN main.apps a ON a.id = r.app_id
+    JOIN main.titles t ON t.id = r.title_id
+    JOIN main.categories c ON c.id = r.category_id
+"""
+
+
+# Колонки таблиць місячних файлів (без id — він свій у кожному файлі)
+_PARTITION_COLUMNS = {
+    "session_facts": "day_num, start_ts, end_ts, duration_sec, app_id, title_id, category_id, is_idle",
+    "breaks": "start_ts, end_ts, duration_sec, last_category",
+}
 
 
 class SQLiteSessionRepository:
+    """
+    Сесії та перерви зберігаються в окремих файлах на кожен місяць.
+    Основна БД містить довідники (apps / titles / categories) і налаштування;
+    потрібні місячні файли під'єднуються (ATTACH) лише на час запиту.
+    Поточний місяць — "гарячий" і невеликий; закриті місяці стискаються
+    (VACUUM) і стають лише для читання.
+    """
 
     def __init__(self, db_path: str | None = None):
         self.db_path = db_path or DB_PATH
         os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
-        self._init_db()
+        self._version_key = os.path.abspath(self.db_path)
+        self._dim_cache: Dict[str, "OrderedDict[str, int]"] = {
+            table: OrderedDict() for table, _ in DIMENSIONS
+        }
+
+        # Сесія, що почалась не пізніше ніж через стільки секунд після
+        # попередньої з тим самим app / title / category, дописується до неї
+        self.merge_gap_sec: int = DEFAULT_MERGE_GAP_SEC
+
+        db_file = Path(self._version_key)
+        self.shards_dir = db_file.with_name(db_file.stem + SHARDS_DIR_SUFFIX)
+        self.shards_dir.mkdir(parents=True, exist_ok=True)
+
+        with _INIT_LOCK:
+            if self._version_key not in _INITIALIZED_DBS or not db_file.exists():
+                self._init_db()
+                _INITIALIZED_DBS.add(self._version_key)
+
+    # ---------- Версія даних ----------
+
+    def data_version(self, first_day: str | date | None = None, last_day: str | date | None = None) -> int:
+        """
+        Поточна версія даних БД (змінюється після кожного запису).
+        З діапазоном днів — версія лише місяців цього діапазону.
+        """
+        with _DATA_VERSIONS_LOCK:
+            if first_day is None:
+                return _DATA_VERSIONS.get(self._version_key, 0)
+            versions = _MONTH_VERSIONS.get(self._version_key, {})
+            months = months_between(
+                month_of_day_num(day_to_num(first_day)),
+                month_of_day_num(day_to_num(last_day if last_day is not None else first_day)),
+            )
+            return versions.get(ALL_MONTHS, 0) + sum(versions.get(m, 0) for m in months)
+
+    def month_versions(self) -> Dict[str, int]:
+        """Лічильники змін по місяцях (для файлу стану демона)."""
+        with _DATA_VERSIONS_LOCK:
+            return dict(_MONTH_VERSIONS.get(self._version_key, {}))
+
+    def notify_external_change(self, months: Optional[Iterable[str]] = None) -> None:
+        """
+        Дані змінив інший процес (headless-демон) — кеші мають перечитати БД.
+        months — змінені місяці, якщо відомі (інакше — усі).
+        """
+        self._bump_version(months)
+
+    def _bump_version(self, months: Optional[Iterable[str]] = None) -> None:
+        with _DATA_VERSIONS_LOCK:
+            _DATA_VERSIONS[self._version_key] = _DATA_VERSIONS.get(self._version_key, 0) + 1
+            versions = _MONTH_VERSIONS.setdefault(self._version_key, {})
+            for month in (ALL_MONTHS,) if months is None else months:
+                versions[month] = versions.get(month, 0) + 1
 
     # ---------- Внутрішні методи ----------
 
@@ -24,43 +288,417 @@ class SQLiteSessionRepository:
         with self._get_conn() as conn:
             cur = conn.cursor()
 
-            # --- sessions ---
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    day TEXT NOT NULL,
-                    start TEXT NOT NULL,
-                    end TEXT NOT NULL,
-                    duration_sec INTEGER NOT NULL,
-                    app TEXT NOT NULL,
-                    title TEXT,
-                    category TEXT,
-                    is_idle INTEGER NOT NULL DEFAULT 0
+            # --- довідники (dictionary encoding) ---
+            for table, column in DIMENSIONS:
+                cur.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY,
+                        {column} TEXT NOT NULL UNIQUE
+                    )
+                    """
                 )
-                """
+
+            # --- факти сесій та перерви в основній БД: лише для міграції ---
+            for sql in _PARTITION_SCHEMA:
+                cur.execute(sql.format(schema="main"))
+
+            # --- стара таблиця sessions (TEXT) → міграції й перенесення у факти ---
+            if self._object_type(cur, "sessions") == "table":
+                # Міграція 01: якщо старе поле is_idle не існує
+                try:
+                    cur.execute("SELECT is_idle FROM sessions LIMIT 1").fetchall()
+                except sqlite3.OperationalError:
+                    cur.execute("ALTER TABLE sessions ADD COLUMN is_idle INTEGER NOT NULL DEFAULT 0")
+
+                # Міграція 02: цілі epoch-колонки замість порівняння TEXT-дат
+                self._migrate_epoch_columns(conn)
+
+                # Міграція 03: довідники app / title / category
+                self._migrate_to_facts(conn)
+
+            # --- постійне представлення sessions читало main.session_facts, які
+            # після переходу на місячні файли порожні (0 рядків замість даних);
+            # старі запити працюють через compat_connection() ---
+            cur.execute("DROP VIEW IF EXISTS sessions")
+
+            conn.commit()
+
+            # Міграція 04: перенесення фактів і перерв у місячні файли
+            self._migrate_to_shards(conn)
+
+        self._upgrade_shards()
+
+    @staticmethod
+    def _object_type(cur, name: str) -> Optional[str]:
+        cur.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def _migrate_epoch_columns(self, conn) -> None:
+        """
+        start_ts / end_ts — epoch-секунди (UTC), day_num — номер локального дня.
+        Існуючі рядки заповнюються пакетами по id, щоб не тримати довгу
+        транзакцію на великій історії.
+        """
+        cur = conn.cursor()
+        existing = {row[1] for row in cur.execute("PRAGMA table_info(sessions)")}
+        for column in ("start_ts", "end_ts", "day_num"):
+            if column not in existing:
+                cur.execute(f"ALTER TABLE sessions ADD COLUMN {column} INTEGER")
+
+        cur.execute("SELECT MIN(id), MAX(id) FROM sessions WHERE start_ts IS NULL")
+        lo, hi = cur.fetchone()
+        if lo is not None:
+            batch_lo = lo
+            while batch_lo <= hi:
+                batch_hi = batch_lo + MIGRATION_BATCH_SIZE - 1
+                # 'utc' переводить локальний ISO-час у UTC за часовим поясом системи
+                cur.execute(
+                    """
+                    UPDATE sessions
+                    SET start_ts = COALESCE(
+                            CAST(strftime('%s', start, 'utc') AS INTEGER),
+                            CAST(strftime('%s', day, 'utc') AS INTEGER),
+                            0
+                        ),
+                        day_num = COALESCE(
+                            CAST(julianday(day) - 2440587.5 AS INTEGER),
+                            CAST(julianday(substr(start, 1, 10)) - 2440587.5 AS INTEGER),
+                            0
+                        )
+                    WHERE id BETWEEN ? AND ? AND start_ts IS NULL
+                    """,
+                    (batch_lo, batch_hi),
+                )
+                cur.execute(
+                    """
+                    UPDATE sessions
+                    SET end_ts = COALESCE(
+                            CAST(strftime('%s', end, 'utc') AS INTEGER),
+                            start_ts + duration_sec
+                        )
+                    WHERE id BETWEEN ? AND ? AND end_ts IS NULL
+                    """,
+                    (batch_lo, batch_hi),
+                )
+                conn.commit()
+                batch_lo = batch_hi + 1
+
+    def _migrate_to_facts(self, conn) -> None:
+        """
+        Переносить стару таблицю sessions у session_facts + довідники
+        (пакетами по id). Id рядків зберігаються, тож перерване перенесення
+        просто продовжується з наступного запуску (INSERT OR IGNORE).
+        Стара таблиця видаляється лише після перевірки, що скопійовано все.
+        """
+        cur = conn.cursor()
+
+        cur.execute("INSERT OR IGNORE INTO apps (name) SELECT DISTINCT COALESCE(app, '') FROM sessions")
+        cur.execute("INSERT OR IGNORE INTO titles (text) SELECT DISTINCT COALESCE(title, '') FROM sessions")
+        cur.execute(
+            "INSERT OR IGNORE INTO categories (name) SELECT DISTINCT COALESCE(category, '') FROM sessions"
+        )
+        conn.commit()
+
+        cur.execute("SELECT MIN(id), MAX(id) FROM sessions")
+        lo, hi = cur.fetchone()
+        if lo is not None:
+            batch_lo = lo
+            while batch_lo <= hi:
+                batch_hi = batch_lo + MIGRATION_BATCH_SIZE - 1
+                cur.execute(
+                    """
+                    INSERT OR IGNORE INTO session_facts (
+                        id, day_num, start_ts, end_ts, duration_sec,
+                        app_id, title_id, category_id, is_idle
+                    )
+                    SELECT s.id, s.day_num, s.start_ts, s.end_ts, s.duration_sec,
+                           a.id, t.id, c.id, s.is_idle
+                    FROM sessions s
+                    JOIN apps a ON a.name = COALESCE(s.app, '')
+                    JOIN titles t ON t.text = COALESCE(s.title, '')
+                    JOIN categories c ON c.name = COALESCE(s.category, '')
+                    WHERE s.id BETWEEN ? AND ?
+                    """,
+                    (batch_lo, batch_hi),
+                )
+                conn.commit()
+                batch_lo = batch_hi + 1
+
+        cur.execute(
+            """
+            SELECT COUNT(*) FROM sessions s
+            WHERE NOT EXISTS (SELECT 1 FROM session_facts f WHERE f.id = s.id)
+            """
+        )
+        missing = cur.fetchone()[0]
+        if missing:
+            # стара таблиця лишається — нічого не губимо, наступний запуск повторить
+            raise sqlite3.DatabaseError(
+                f"Migration to session_facts incomplete: {missing} legacy rows not copied"
             )
 
-            # Міграція 01: якщо старе поле is_idle не існує
-            try:
-                cur.execute("SELECT is_idle FROM sessions LIMIT 1")
-            except sqlite3.OperationalError:
-                cur.execute("ALTER TABLE sessions ADD COLUMN is_idle INTEGER NOT NULL DEFAULT 0")
+        cur.execute("DROP TABLE sessions")
+        conn.commit()
+
+        # Повертаємо місце, звільнене дубльованими рядками
+        conn.execute("VACUUM")
 
-            # --- breaks (НОВА ТАБЛИЦЯ) ---
+    def _migrate_to_shards(self, conn) -> None:
+        """
+        Переносить session_facts / breaks з основної БД у місячні файли
+        пакетами по id. Після міграції в основній БД ці таблиці порожні.
+        """
+        cur = conn.cursor()
+        for table, columns in _PARTITION_COLUMNS.items():
+            ts_column = "start_ts"
             cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS breaks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    start_ts INTEGER NOT NULL,
-                    end_ts INTEGER NOT NULL,
-                    duration_sec INTEGER NOT NULL,
-                    last_category TEXT
-                )
+                f"""
+                SELECT DISTINCT strftime('%Y-%m', {ts_column}, 'unixepoch', 'localtime')
+                FROM main.{table}
                 """
             )
+            months = [row[0] for row in cur.fetchall() if row[0]]
+            for month in months:
+                self._attach_shard(conn, month, writable=True)
+                try:
+                    while True:
+                        cur.execute(
+                            f"""
+                            SELECT id FROM main.{table}
+                            WHERE strftime('%Y-%m', {ts_column}, 'unixepoch', 'localtime') = ?
+                            ORDER BY id LIMIT ?
+                            """,
+                            (month, MIGRATION_BATCH_SIZE),
+                        )
+                        ids = [row[0] for row in cur.fetchall()]
+                        if not ids:
+                            break
+                        lo, hi = ids[0], ids[-1]
+                        cur.execute(
+                            f"""
+                            INSERT INTO {SHARD_ALIAS}.{table} ({columns})
+                            SELECT {columns} FROM main.{table}
+                            WHERE id BETWEEN ? AND ?
+                              AND strftime('%Y-%m', {ts_column}, 'unixepoch', 'localtime') = ?
+                            """,
+                            (lo, hi, month),
+                        )
+                        cur.execute(
+                            f"""
+                            DELETE FROM main.{table}
+                            WHERE id BETWEEN ? AND ?
+                              AND strftime('%Y-%m', {ts_column}, 'unixepoch', 'localtime') = ?
+                            """,
+                            (lo, hi, month),
+                        )
+                        conn.commit()
+                finally:
+                    self._detach_shard(conn)
 
-            conn.commit()
+    # ---------- Місячні файли ----------
+
+    def _shard_path(self, month: str) -> Path:
+        return self.shards_dir / f"{month}.sqlite3"
+
+    def _existing_months(self, first_month: str, last_month: str) -> List[str]:
+        return [m for m in months_between(first_month, last_month) if self._shard_path(m).exists()]
+
+    @staticmethod
+    def _current_month() -> str:
+        return datetime.now().strftime("%Y-%m")
+
+    def _attach_shard(self, conn, month: str, writable: bool = False) -> None:
+        """
+        Під'єднує файл місяця як SHARD_ALIAS. Для запису файл за потреби
+        створюється (і знімається read-only з уже закритого місяця).
+        """
+        path = self._shard_path(month)
+        if writable:
+            if path.exists() and not self._is_writable(path):
+                os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+            conn.execute("ATTACH DATABASE ? AS " + SHARD_ALIAS, (str(path),))
+            for sql in _PARTITION_SCHEMA:
+                conn.execute(sql.format(schema=SHARD_ALIAS))
+        else:
+            uri = path.resolve().as_uri() + "?mode=ro"
+            conn.execute("ATTACH DATABASE ? AS " + SHARD_ALIAS, (uri,))
+
+    @staticmethod
+    def _is_writable(path: Path) -> bool:
+        # біти прав, а не os.access: від root os.access завжди "можна"
+        return bool(path.stat().st_mode & stat.S_IWUSR)
+
+    @staticmethod
+    def _detach_shard(conn) -> None:
+        conn.commit()
+        conn.execute("DETACH DATABASE " + SHARD_ALIAS)
+
+    def _shard_conn(self) -> sqlite3.Connection:
+        # URI-режим потрібен, щоб під'єднувати закриті місяці як mode=ro
+        conn = sqlite3.connect(Path(self._version_key).as_uri(), uri=True)
+        conn.row_factory = None
+        return conn
+
+    def _query_shards(self, months: List[str], sql: str, params: tuple = ()) -> Iterator[tuple]:
+        """
+        Виконує той самий запит по черзі в кожному місячному файлі
+        (SHARD_ALIAS у SQL) і віддає рядки з усіх. Одночасно під'єднано
+        лише один файл, тож ліміт ATTACH не обмежує довжину діапазону.
+        """
+        if not months:
+            return
+        conn = self._shard_conn()
+        try:
+            for month in months:
+                self._attach_shard(conn, month)
+                try:
+                    yield from conn.execute(sql, params).fetchall()
+                finally:
+                    self._detach_shard(conn)
+        finally:
+            conn.close()
+
+    def compat_connection(
+        self,
+        first_day: str | date | None = None,
+        last_day: str | date | None = None,
+    ) -> sqlite3.Connection:
+        """
+        Підключення для старих запитів до sessions (лише читання): місячні
+        файли діапазону (за замовчуванням — усі) під'єднуються mode=ro, а
+        sessions — TEMP-представлення над їхніми сирими сесіями та
+        погодинними агрегатами зі старими TEXT-колонками. Файлів не більше
+        за ліміт ATTACH SQLite — якщо місяців більше, беруться останні.
+        """
+        conn = self._shard_conn()
+        conn.row_factory = sqlite3.Row
+        if first_day is None:
+            months = sorted(p.stem for p in self.shards_dir.glob("*.sqlite3"))
+        else:
+            months = self._months_for_days(
+                day_to_num(first_day), day_to_num(last_day if last_day is not None else first_day)
+            )
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if hasattr(conn, "getlimit") else 10
+        months = months[-limit:]
+
+        parts = []
+        for month in months:
+            schema = "m_" + month.replace("-", "_")
+            uri = self._shard_path(month).resolve().as_uri() + "?mode=ro"
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+            parts.append(_SESSIONS_VIEW_SELECT.format(schema=schema))
+        # без місячних файлів — порожні таблиці основної БД
+        select = " UNION ALL ".join(parts) or _SESSIONS_VIEW_SELECT.format(schema="main")
+        conn.execute("CREATE TEMP VIEW sessions AS " + select)
+        return conn
+
+    def _months_for_days(self, first_day_num: int, last_day_num: int) -> List[str]:
+        return self._existing_months(month_of_day_num(first_day_num), month_of_day_num(last_day_num))
+
+    def _months_for_ts(self, start_ts: int, end_ts: int) -> List[str]:
+        return self._existing_months(month_of_ts(start_ts), month_of_ts(max(start_ts, end_ts - 1)))
+
+    def _upgrade_shards(self) -> None:
+        """Додає нові таблиці / представлення у файли, створені старішою версією."""
+        for path in sorted(self.shards_dir.glob("*.sqlite3")):
+            conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                has_view = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'session_rows'"
+                ).fetchone()
+            finally:
+                conn.close()
+            if has_view:
+                continue
+            conn = self._shard_conn()
+            try:
+                self._attach_shard(conn, path.stem, writable=True)
+                self._detach_shard(conn)
+            finally:
+                conn.close()
+
+    def compact_closed_months(self) -> None:
+        """
+        Закриті місяці (старші за поточний) стискаються один раз і
+        позначаються лише для читання — далі їх тільки читають.
+        Викликає лише обслуговування процесу, що тримає TrackerLock.
+        """
+        current = self._current_month()
+        for path in sorted(self.shards_dir.glob("*.sqlite3")):
+            month = path.stem
+            if month >= current or not self._is_writable(path):
+                continue
+            try:
+                conn = sqlite3.connect(str(path))
+                try:
+                    conn.execute("VACUUM")
+                    conn.execute("PRAGMA journal_mode = DELETE")
+                finally:
+                    conn.close()
+                self._lock_shard(month)
+            except (sqlite3.Error, OSError) as e:
+                print(f"[SQLiteSessionRepository] Failed to compact month {month}:", repr(e))
+
+    def _lock_shard(self, month: str) -> None:
+        """Позначає файл закритого місяця лише для читання."""
+        os.chmod(self._shard_path(month), stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    # ---------- Довідники ----------
+
+    def _intern(self, cur, table: str, column: str, value: str) -> int:
+        """
+        Повертає id значення в довіднику, додаючи його за потреби.
+        Гарячі значення тримаються в LRU, тож на шляху запису зазвичай
+        немає жодного SELECT по довідниках.
+        """
+        cache = self._dim_cache[table]
+        key = value or ""
+        dim_id = cache.get(key)
+        if dim_id is not None:
+            cache.move_to_end(key)
+            return dim_id
+
+        cur.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (key,))
+        cur.execute(f"SELECT id FROM {table} WHERE {column} = ?", (key,))
+        dim_id = int(cur.fetchone()[0])
+
+        cache[key] = dim_id
+        if len(cache) > DIMENSION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return dim_id
+
+    def _lookup_id(self, table: str, column: str, value: str) -> Optional[int]:
+        cached = self._dim_cache[table].get(value)
+        if cached is not None:
+            return cached
+        with self._get_conn() as conn:
+            row = conn.execute(
+                f"SELECT id FROM {table} WHERE {column} = ?", (value,)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def get_dimension(self, table: str, ids: Optional[Iterable[int]] = None) -> Dict[int, str]:
+        """
+        Довідник id -> значення (apps / titles / categories): увесь або
+        лише вказані id — titles росте з усією історією, а діапазону
+        потрібна лише його частина.
+        """
+        column = dict(DIMENSIONS)[table]
+        with self._get_conn() as conn:
+            if ids is None:
+                rows = conn.execute(f"SELECT id, {column} FROM {table}").fetchall()
+            else:
+                ids = [int(i) for i in ids]
+                rows = []
+                for i in range(0, len(ids), DIMENSION_QUERY_CHUNK):
+                    chunk = ids[i:i + DIMENSION_QUERY_CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    rows += conn.execute(
+                        f"SELECT id, {column} FROM {table} WHERE id IN ({marks})", chunk
+                    ).fetchall()
+        return {int(r[0]): r[1] for r in rows}
 
     # ---------- Збереження звичайних сесій ----------
 
@@ -73,136 +711,401 @@ class SQLiteSessionRepository:
         category = session.get("category") or ""
         is_idle = 1 if session.get("idle") else 0
 
-        day = ""
+        start_ts = end_ts = day_num = None
         if start:
             try:
-                day = datetime.fromisoformat(start).strftime("%Y-%m-%d")
+                start_dt = datetime.fromisoformat(start)
+                start_ts = int(start_dt.timestamp())
+                day_num = day_to_num(start_dt.date())
             except Exception:
-                day = start[:10]
+                start_ts = None
+        if start_ts is None:
+            now_dt = datetime.now()
+            start_ts = int(now_dt.timestamp()) - duration_sec
+            day_num = day_to_num(now_dt.date())
+        if end:
+            try:
+                end_ts = int(datetime.fromisoformat(end).timestamp())
+            except Exception:
+                end_ts = None
+        if end_ts is None:
+            end_ts = start_ts + duration_sec
 
         with self._get_conn() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO sessions (day, start, end, duration_sec, app, title, category, is_idle)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (day, start, end, duration_sec, app, title, category, is_idle),
-            )
+            app_id = self._intern(cur, "apps", "name", app)
+            title_id = self._intern(cur, "titles", "text", title)
+            category_id = self._intern(cur, "categories", "name", category)
             conn.commit()
 
+            # Сесія потрапляє у файл місяця, в якому вона почалась
+            self._attach_shard(conn, month_of_day_num(day_num), writable=True)
+            try:
+                # Фрагмент тієї самої сесії (мерехтіння заголовка, короткий
+                # розрив) — продовжуємо останній рядок замість нового;
+                # заголовок рядка лишається заголовком першого фрагмента
+                last = cur.execute(
+                    f"""
+                    SELECT f.id, f.start_ts, f.end_ts, f.app_id, t.text, f.category_id, f.is_idle
+                    FROM {SHARD_ALIAS}.session_facts f
+                    JOIN main.titles t ON t.id = f.title_id
+                    ORDER BY f.start_ts DESC, f.id DESC
+                    LIMIT 1
+                    """
+                ).fetchone()
+                fragment = (start_ts, end_ts, app_id, normalize_title(title), category_id, is_idle)
+                if last is not None and can_merge(
+                    last[1:4] + (normalize_title(last[4]),) + last[5:], fragment, self.merge_gap_sec
+                ):
+                    cur.execute(
+                        f"""
+                        UPDATE {SHARD_ALIAS}.session_facts
+                        SET end_ts = MAX(end_ts, ?), duration_sec = duration_sec + ?
+                        WHERE id = ?
+                        """,
+                        (end_ts, duration_sec, last[0]),
+                    )
+                else:
+                    cur.execute(
+                        f"""
+                        INSERT INTO {SHARD_ALIAS}.session_facts (
+                            day_num, start_ts, end_ts, duration_sec,
+                            app_id, title_id, category_id, is_idle
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (day_num, start_ts, end_ts, duration_sec, app_id, title_id, category_id, is_idle),
+                    )
+            finally:
+                self._detach_shard(conn)
+
+        # частина сесії після півночі 31-го належить уже наступному місяцю
+        last_month = month_of_ts(max(start_ts, end_ts - 1))
+        self._bump_version(months_between(month_of_day_num(day_num), last_month))
+
     # ---------- AGG: Категорії за сьогодні ----------
 
     def get_today_category_totals(self) -> Dict[str, int]:
-        today = datetime.now().strftime("%Y-%m-%d")
-        with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT category, SUM(duration_sec)
-                FROM sessions
-                WHERE day = ? AND is_idle = 0
-                GROUP BY category
-                """,
-                (today,),
-            )
-            rows = cur.fetchall()
+        today = day_to_num(datetime.now().date())
+        rows = self._query_shards(
+            self._months_for_days(today, today),
+            f"""
+            SELECT category_id, SUM(duration_sec)
+            FROM {SHARD_ALIAS}.session_rows
+            WHERE day_num = ? AND is_idle = 0
+            GROUP BY category_id
+            """,
+            (today,),
+        )
+        categories = self.get_dimension("categories")
 
         totals: Dict[str, int] = {}
-        for cat, total in rows:
-            cat = cat or "other"
-            totals[cat] = int(total or 0)
+        for category_id, total in rows:
+            cat = categories.get(category_id) or "other"
+            totals[cat] = totals.get(cat, 0) + int(total or 0)
         return totals
 
     # ---------- Трендові діаграми ----------
 
-    def get_daily_totals(self, start_day: str, end_day: str) -> Dict[str, float]:
+    def _daily_minutes(self, start_day: str, end_day: str, extra_where: str = "", extra_params: tuple = ()) -> Dict[str, float]:
+        first, last = day_to_num(start_day), day_to_num(end_day)
+        rows = self._query_shards(
+            self._months_for_days(first, last),
+            f"""
+            SELECT day_num, SUM(duration_sec)
+            FROM {SHARD_ALIAS}.session_rows
+            WHERE day_num BETWEEN ? AND ? AND is_idle = 0{extra_where}
+            GROUP BY day_num
+            """,
+            (first, last) + extra_params,
+        )
+        totals: Dict[int, float] = {}
+        for day_num, total in rows:
+            totals[day_num] = totals.get(day_num, 0.0) + (total or 0) / 60.0
+        return {num_to_day(d): totals[d] for d in sorted(totals)}
 
-        with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT day, SUM(duration_sec)/60.0 AS minutes
-                FROM sessions
-                WHERE day >= ? AND day <= ? AND is_idle = 0
-                GROUP BY day
-                ORDER BY day
-                """,
-                (start_day, end_day),
-            )
-            rows = cur.fetchall()
+    def get_daily_totals(self, start_day: str, end_day: str) -> Dict[str, float]:
 
-        return {r["day"]: (r["minutes"] or 0.0) for r in rows}
+        return self._daily_minutes(start_day, end_day)
 
     def get_daily_totals_by_category(self, start_day: str, end_day: str, category: str) -> Dict[str, float]:
 
-        with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT day, SUM(duration_sec)/60.0 AS minutes
-                FROM sessions
-                WHERE day >= ? AND day <= ? AND category = ? AND is_idle = 0
-                GROUP BY day
-                ORDER BY day
+        category_id = self._lookup_id("categories", "name", category)
+        if category_id is None:
+            return {}
+        return self._daily_minutes(start_day, end_day, " AND category_id = ?", (category_id,))
+
+    def get_daily_totals_by_app(self, start_day: str, end_day: str, app: str) -> Dict[str, float]:
+
+        app_id = self._lookup_id("apps", "name", app)
+        if app_id is None:
+            return {}
+        return self._daily_minutes(start_day, end_day, " AND app_id = ?", (app_id,))
+
+    def get_hourly_heatmap(self, start_day: str, end_day: str) -> Dict[str, Dict[int, float]]:
+        """
+        Хвилини активності day -> {hour: minutes}. Сесії розподіляються
+        по годинах точно: 3-годинна сесія з 09:58 дає 2 хв у 9-й годині,
+        по 60 хв у 10-й та 11-й і 58 хв у 12-й (так само через північ).
+        """
+        from core.hour_split import heatmap_to_dict
+
+        days, matrix = self.get_hourly_heatmap_matrix(start_day, end_day)
+        return heatmap_to_dict(days, matrix)
+
+    def get_hourly_heatmap_matrix(self, start_day: str, end_day: str):
+        """
+        Те саме, що get_hourly_heatmap, але щільною матрицею: (усі дні
+        діапазону, ndarray днів × 24 у хвилинах) — для imshow без обходу словників.
+        """
+        # numpy потрібен лише аналітиці — не тягнемо його у воркер
+        import numpy as np
+        from core.hour_split import local_offsets, split_by_hour
+
+        first = day_to_num(start_day)
+        n_days = max(day_to_num(end_day) - first + 1, 0)
+        days = [num_to_day(first + i) for i in range(n_days)]
+        if n_days == 0:
+            return days, np.zeros((0, 24), dtype=np.float64)
+
+        # + попередній день: сесії, що почалися до півночі, заходять у діапазон
+        rows = list(
+            self._query_shards(
+                self._months_for_days(first - 1, first + n_days - 1),
+                f"""
+                SELECT start_ts, duration_sec
+                FROM {SHARD_ALIAS}.session_rows
+                WHERE day_num BETWEEN ? AND ? AND is_idle = 0
                 """,
-                (start_day, end_day, category),
+                (first - 1, first + n_days - 1),
             )
-            rows = cur.fetchall()
+        )
 
-        return {r["day"]: (r["minutes"] or 0.0) for r in rows}
+        if not rows:
+            return days, np.zeros((n_days, 24), dtype=np.float64)
 
-    def get_daily_totals_by_app(self, start_day: str, end_day: str, app: str) -> Dict[str, float]:
+        starts, durations = zip(*rows)
+        start_ts = np.array(starts, dtype=np.int64)
+        matrix = split_by_hour(
+            start_ts + local_offsets(start_ts),
+            np.array(durations, dtype=np.int64),
+            first,
+            n_days,
+        ) / 60.0
+        return days, matrix
 
-        with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT day, SUM(duration_sec)/60.0 AS minutes
-                FROM sessions
-                WHERE day >= ? AND day <= ? AND app = ? AND is_idle = 0
-                GROUP BY day
-                ORDER BY day
+    # ---------- Сирі рядки для колонкової аналітики ----------
+
+    def get_session_rows(self, start_day: str, end_day: str) -> List[tuple]:
+        """
+        Усі сесії діапазону без агрегації та JOIN-ів:
+        (start_ts, duration_sec, category_id, app_id, title_id, is_idle).
+        Назви — через get_dimension().
+        """
+        first, last = day_to_num(start_day), day_to_num(end_day)
+        return list(
+            self._query_shards(
+                self._months_for_days(first, last),
+                f"""
+                SELECT start_ts, duration_sec, category_id, app_id, title_id, is_idle
+                FROM {SHARD_ALIAS}.session_rows
+                WHERE day_num BETWEEN ? AND ?
                 """,
-                (start_day, end_day, app),
+                (first, last),
             )
-            rows = cur.fetchall()
+        )
 
-        return {r["day"]: (r["minutes"] or 0.0) for r in rows}
+    # ---------- Злиття фрагментів в історії ----------
+
+    def compact_history(self, max_gap_sec: Optional[int] = None) -> int:
+        """
+        Пакетне злиття сусідніх фрагментів (див. session_compaction) у
+        закритих місяцях, які ще не проходили поточну версію правил.
+        Поточний місяць не чіпаємо — там злиття відбувається під час запису.
+        Повертає кількість видалених рядків.
+        """
+        gap = self.merge_gap_sec if max_gap_sec is None else int(max_gap_sec)
+        current = self._current_month()
+        months = [
+            path.stem
+            for path in sorted(self.shards_dir.glob("*.sqlite3"))
+            if path.stem < current and self._shard_user_version(path) < COMPACTION_VERSION
+        ]
+        if not months:
+            return 0
+
+        removed = 0
+        changed: List[str] = []
+        conn = self._shard_conn()
+        try:
+            for month in months:
+                was_read_only = not self._is_writable(self._shard_path(month))
+                self._attach_shard(conn, month, writable=True)
+                try:
+                    merged = self._merge_fragments(conn, gap)
+                    conn.execute(f"PRAGMA {SHARD_ALIAS}.user_version = {COMPACTION_VERSION}")
+                finally:
+                    self._detach_shard(conn)
+                removed += merged
+                if merged:
+                    changed.append(month)
+                if was_read_only and not merged:
+                    # змінилась лише позначка версії — повторний VACUUM не потрібен
+                    self._lock_shard(month)
+        finally:
+            conn.close()
+
+        if removed:
+            self._bump_version(changed)
+        return removed
+
+    def _merge_fragments(self, conn, max_gap_sec: int) -> int:
+        rows = conn.execute(
+            f"""
+            SELECT id, start_ts, end_ts, duration_sec, app_id, title_id, category_id, is_idle
+            FROM {SHARD_ALIAS}.session_facts
+            ORDER BY start_ts, id
+            """
+        ).fetchall()
+
+        # Нормалізований заголовок — лише ключ злиття; довідник не змінюється,
+        # а рядок зберігає заголовок першого фрагмента
+        title_keys = {
+            title_id: normalize_title(text)
+            for title_id, text in self.get_dimension("titles", {row[5] for row in rows}).items()
+        }
+
+        updates: List[tuple] = []
+        deleted: List[tuple] = []
+        head: Optional[list] = None   # [id, start, end, duration, app, title_key, category, idle, changed]
+
+        for row_id, start_ts, end_ts, duration, app_id, title_id, category_id, is_idle in rows:
+            fragment = (start_ts, end_ts, app_id, title_keys.get(title_id, ""), category_id, is_idle)
+            if head is not None and can_merge(tuple(head[1:3] + head[4:8]), fragment, max_gap_sec):
+                head[2] = max(head[2], end_ts)
+                head[3] += duration
+                head[8] = True
+                deleted.append((row_id,))
+                continue
+            if head is not None and head[8]:
+                updates.append((head[2], head[3], head[0]))
+            head = [row_id, start_ts, end_ts, duration, *fragment[2:], False]
+        if head is not None and head[8]:
+            updates.append((head[2], head[3], head[0]))
+
+        conn.executemany(
+            f"UPDATE {SHARD_ALIAS}.session_facts SET end_ts = ?, duration_sec = ? WHERE id = ?",
+            updates,
+        )
+        conn.executemany(f"DELETE FROM {SHARD_ALIAS}.session_facts WHERE id = ?", deleted)
+        conn.commit()
+        return len(deleted)
+
+    @staticmethod
+    def _shard_user_version(path: Path) -> int:
+        conn = sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            return int(conn.execute("PRAGMA user_version").fetchone()[0])
+        finally:
+            conn.close()
+
+    # ---------- Термін зберігання сирих сесій ----------
+
+    def apply_retention(self, max_age_days: int) -> int:
+        """
+        Сирі сесії, старші за max_age_days, згортаються в погодинні агрегати
+        по застосунку / категорії (session_rollups) і видаляються пакетами.
+        Читачі бачать агрегати через session_rows, тож довгі діапазони
+        не ламаються. Повертає кількість згорнутих сесій.
+        """
+        if not max_age_days or max_age_days <= 0:
+            return 0
+
+        cutoff_day = day_to_num(date.today()) - int(max_age_days)
+        shards = sorted(p.stem for p in self.shards_dir.glob("*.sqlite3"))
+        # Спершу лише читання: місяці, де старих сирих сесій уже немає
+        # (закриті, read-only), не перевідкриваються для запису
+        months = [
+            m for m in shards
+            if m <= month_of_day_num(cutoff_day) and self._has_facts_before(m, cutoff_day)
+        ]
+        if not months:
+            return 0
 
-    def get_hourly_heatmap(self, start_day: str, end_day: str) -> Dict[str, Dict[int, float]]:
         with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT day,
-                       strftime('%H', start) AS hour,
-                       SUM(duration_sec)/60.0 AS minutes
-                FROM sessions
-                WHERE day >= ? AND day <= ? AND is_idle = 0
-                GROUP BY day, hour
-                ORDER BY day, hour
+            empty_title_id = self._intern(conn.cursor(), "titles", "text", "")
+            conn.commit()
+
+        folded = 0
+        conn = self._shard_conn()
+        try:
+            for month in months:
+                self._attach_shard(conn, month, writable=True)
+                try:
+                    folded += self._fold_old_sessions(conn, cutoff_day, empty_title_id)
+                finally:
+                    self._detach_shard(conn)
+        finally:
+            conn.close()
+
+        if folded:
+            self._bump_version(months)
+        return folded
+
+    def _has_facts_before(self, month: str, cutoff_day: int) -> bool:
+        rows = self._query_shards(
+            [month],
+            f"SELECT 1 FROM {SHARD_ALIAS}.session_facts WHERE day_num < ? LIMIT 1",
+            (cutoff_day,),
+        )
+        return any(True for _ in rows)
+
+    def _fold_old_sessions(self, conn, cutoff_day: int, title_id: int) -> int:
+        folded = 0
+        while True:
+            rows = conn.execute(
+                f"""
+                SELECT id, start_ts, duration_sec, app_id, category_id, is_idle
+                FROM {SHARD_ALIAS}.session_facts
+                WHERE day_num < ?
+                ORDER BY id
+                LIMIT ?
                 """,
-                (start_day, end_day),
-            )
-            rows = cur.fetchall()
+                (cutoff_day, MIGRATION_BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                return folded
 
-        result: Dict[str, Dict[int, float]] = {}
-        for r in rows:
-            day = r["day"]
-            hour_str = r["hour"]
-            if hour_str is None:
-                continue
-            try:
-                h = int(hour_str)
-            except ValueError:
-                continue
-            minutes = float(r["minutes"] or 0.0)
-            if day not in result:
-                result[day] = {}
-            result[day][h] = minutes
+            buckets: Dict[tuple, List[int]] = {}
+            for _, start_ts, duration, app_id, category_id, is_idle in rows:
+                for hour_ts, day_num, part in _hour_pieces(start_ts, duration):
+                    key = (hour_ts, day_num, app_id, category_id, is_idle)
+                    acc = buckets.setdefault(key, [0, 0])
+                    acc[0] += part
+                    acc[1] += 1
 
-        return result
+            conn.executemany(
+                f"""
+                INSERT INTO {SHARD_ALIAS}.session_rollups (
+                    hour_ts, day_num, app_id, title_id, category_id, is_idle,
+                    duration_sec, sessions_count
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hour_ts, app_id, category_id, is_idle) DO UPDATE SET
+                    duration_sec = duration_sec + excluded.duration_sec,
+                    sessions_count = sessions_count + excluded.sessions_count
+                """,
+                [
+                    (hour_ts, day_num, app_id, title_id, category_id, is_idle, sec, cnt)
+                    for (hour_ts, day_num, app_id, category_id, is_idle), (sec, cnt) in buckets.items()
+                ],
+            )
+            conn.execute(
+                f"DELETE FROM {SHARD_ALIAS}.session_facts WHERE id BETWEEN ? AND ? AND day_num < ?",
+                (rows[0][0], rows[-1][0], cutoff_day),
+            )
+            conn.commit()
+            folded += len(rows)
 
     # =======================================================
     # ================       BREAKS API      ================
@@ -217,58 +1120,65 @@ class SQLiteSessionRepository:
         """Зберігає одну перерву."""
         duration_sec = max(0, end_ts - start_ts)
         with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO breaks (start_ts, end_ts, duration_sec, last_category)
-                VALUES (?, ?, ?, ?)
-                """,
-                (start_ts, end_ts, duration_sec, last_category),
-            )
-            conn.commit()
-            return cur.lastrowid
+            self._attach_shard(conn, month_of_ts(start_ts), writable=True)
+            try:
+                cur = conn.cursor()
+                cur.execute(
+                    f"""
+                    INSERT INTO {SHARD_ALIAS}.breaks (start_ts, end_ts, duration_sec, last_category)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (start_ts, end_ts, duration_sec, last_category),
+                )
+                break_id = cur.lastrowid
+            finally:
+                self._detach_shard(conn)
+
+        last_month = month_of_ts(max(start_ts, end_ts - 1))
+        self._bump_version(months_between(month_of_ts(start_ts), last_month))
+        return break_id
 
     def get_breaks_for_range(self, start_ts: int, end_ts: int) -> List[Dict]:
         """Повертає всі перерви у діапазоні timestamp."""
-        with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT id, start_ts, end_ts, duration_sec, last_category
-                FROM breaks
-                WHERE start_ts >= ? AND start_ts < ?
-                ORDER BY start_ts ASC
-                """,
-                (start_ts, end_ts),
-            )
-            rows = cur.fetchall()
+        rows = self._query_shards(
+            self._months_for_ts(start_ts, end_ts),
+            f"""
+            SELECT id, start_ts, end_ts, duration_sec, last_category
+            FROM {SHARD_ALIAS}.breaks
+            WHERE start_ts >= ? AND start_ts < ?
+            ORDER BY start_ts ASC
+            """,
+            (start_ts, end_ts),
+        )
 
         return [
             {
-                "id": r["id"],
-                "start_ts": r["start_ts"],
-                "end_ts": r["end_ts"],
-                "duration_sec": r["duration_sec"],
-                "last_category": r["last_category"],
+                "id": r[0],
+                "start_ts": r[1],
+                "end_ts": r[2],
+                "duration_sec": r[3],
+                "last_category": r[4],
             }
             for r in rows
         ]
 
     def get_breaks_summary_for_range(self, start_ts: int, end_ts: int) -> Dict:
         """Агрегація перерв: кількість + загальна тривалість."""
-        with self._get_conn() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT COUNT(*), COALESCE(SUM(duration_sec), 0)
-                FROM breaks
-                WHERE start_ts >= ? AND start_ts < ?
-                """,
-                (start_ts, end_ts),
-            )
-            count, total = cur.fetchone()
+        rows = self._query_shards(
+            self._months_for_ts(start_ts, end_ts),
+            f"""
+            SELECT COUNT(*), COALESCE(SUM(duration_sec), 0)
+            FROM {SHARD_ALIAS}.breaks
+            WHERE start_ts >= ? AND start_ts < ?
+            """,
+            (start_ts, end_ts),
+        )
+        count = total = 0
+        for c, t in rows:
+            count += int(c or 0)
+            total += int(t or 0)
 
         return {
-            "count": int(count or 0),
-            "total_duration_sec": int(total or 0),
+            "count": count,
+            "total_duration_sec": total,
         }
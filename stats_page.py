@@ -1,9 +1,12 @@
 import html
+import logging
+from collections import OrderedDict
 from datetime import date, timedelta, datetime, time as dtime
+from functools import partial
 from pathlib import Path
-import sqlite3
+from typing import Callable
 
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import Qt, QDate, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -21,17 +24,69 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
 )
 
+import numpy as np
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from matplotlib.ticker import FuncFormatter
 
-from config.settings import DB_PATH
+from core.app_context import AppContext
 from core.utils import format_duration_human
-from core.period_analysis import PeriodAnalysisService
+from core.columnar_analytics import AnalyticsCancelled, ColumnarAnalyticsEngine, RangeAnalytics
+from core.hour_split import visible_hours
 from ui.components.category_chart import CATEGORY_LABELS, CATEGORY_COLORS
-from storage.sqlite_repo import SQLiteSessionRepository
-from storage.settings_repo import SettingsRepository
-from core.settings_service import SettingsService
+from ui.components.chart_artists import (
+    BalanceBarChart,
+    CategoryPieChart,
+    DailyTrendChart,
+    HourHeatmapChart,
+    day_label,
+)
+
+
+# Скільки останніх періодів (результатів аналітики) тримати в пам'яті
+RESULT_CACHE_SIZE = 8
+
+log = logging.getLogger(__name__)
+
+
+class _RangeLoadSignals(QObject):
+    # (generation, RangeAnalytics) / (generation, помилка)
+    loaded = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _RangeLoadTask(QRunnable):
+    """
+    SQL + колонкові обчислення періоду поза UI-потоком. Повертає один
+    незмінний RangeAnalytics; застарілий запит (generation вже не поточний)
+    зупиняється на найближчій перевірці і нічого не віддає.
+    """
+
+    def __init__(self, engine: ColumnarAnalyticsEngine, start_day: date, end_day: date,
+                 generation: int, is_current):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.engine = engine
+        self.start_day = start_day
+        self.end_day = end_day
+        self.generation = generation
+        self.is_current = is_current
+        self.signals = _RangeLoadSignals()
+
+    def _cancelled(self) -> bool:
+        return not self.is_current(self.generation)
+
+    def run(self):
+        if self._cancelled():
+            return
+        try:
+            result = self.engine.compute(self.start_day, self.end_day, cancelled=self._cancelled)
+        except AnalyticsCancelled:
+            return
+        except Exception as e:
+            log.exception("failed to load period %s..%s", self.start_day, self.end_day)
+            self.signals.failed.emit(self.generation, repr(e))
+            return
+        self.signals.loaded.emit(self.generation, result)
 
 
 class StatsPage(QWidget):
@@ -39,22 +94,54 @@ class StatsPage(QWidget):
     Розширена аналітика: категорії, перерви, топ застосунків, трендовий графік, теплова карта, AI-звіт.
     """
 
-    def __init__(self, db_path: str | Path | None = None, parent=None):
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        parent=None,
+        context: AppContext | None = None,
+    ):
         super().__init__(parent)
 
-        self.db_path = Path(db_path or DB_PATH)
-        self.repo = SQLiteSessionRepository(str(self.db_path))
-        self.period_ai_service = PeriodAnalysisService()
+        # Репозиторій і сервіси — спільні з вікном (без власної ініціалізації схеми)
+        context = context or AppContext(db_path)
+        self.db_path = Path(context.db_path)
+        self.repo = context.sqlite_repo
+        self.engine = context.analytics_engine
+        self.period_ai_service = context.period_analysis
 
         # сервіс налаштувань (для break_min_visible_sec та ін.)
-        self._settings_repo = SettingsRepository(DB_PATH)
-        self._settings = SettingsService(self._settings_repo)
+        self._settings_repo = context.settings_repo
+        self._settings = context.settings
 
         self._last_daily_totals_all: dict[str, float] = {}
         self._last_period: tuple[str, str] | None = None
-        self._hourly_heatmap_data: dict[str, dict[int, float]] = {}
         self._cached_cat_minutes: dict[str, float] = {}
         self._cached_apps: list[tuple[str, str, str, float]] = []
+        self._last_result: RangeAnalytics | None = None
+
+        # Ключ поточного періоду (start, end, версія даних) — для кешу
+        # результатів і кешів кадрів графіків: повернення до недавнього
+        # періоду не повторює ні SQL, ні малювання
+        self._result_key: tuple | None = None
+        # Ключ показаного результату (_last_result): поки новий період
+        # вантажиться, _result_key уже належить йому
+        self._last_result_key: tuple | None = None
+        self._result_cache: OrderedDict[tuple, RangeAnalytics] = OrderedDict()
+        # Графіки, що чекають, поки їх стане видно: name -> render()
+        self._dirty_charts: dict[str, Callable[[], None]] = {}
+
+        # Завантаження періоду — в окремому пулі з одним потоком: новий запит
+        # знімає з черги ще не розпочаті, а результат застарілого відкидається
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._generation = 0
+        self._pending_task: _RangeLoadTask | None = None
+
+        # Debounce для дат: перемикання періоду змінює обидві дати поспіль
+        self._refresh_debounce = QTimer(self)
+        self._refresh_debounce.setSingleShot(True)
+        self._refresh_debounce.setInterval(300)
+        self._refresh_debounce.timeout.connect(self.refresh)
 
         # ----------------- ROOT -----------------
         root = QVBoxLayout(self)
@@ -100,6 +187,8 @@ class StatsPage(QWidget):
         filters_layout.addWidget(self.btn_apply)
 
         self._init_dates_defaults()
+        self.from_date.dateChanged.connect(self._schedule_refresh)
+        self.to_date.dateChanged.connect(self._schedule_refresh)
 
         # ----------------- ЧАС ЗА КАТЕГОРІЯМИ ТА ПЕРЕРВИ (верхній блок зліва) ---------
         chart_group = QGroupBox("Час за категоріями та перерви")
@@ -128,6 +217,10 @@ class StatsPage(QWidget):
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
         )
 
+        # Артисти графіків створюються один раз — refresh() лише міняє дані
+        self.pie_chart = CategoryPieChart(self.pie_fig, self.pie_canvas)
+        self.balance_chart = BalanceBarChart(self.breaks_balance_fig, self.breaks_balance_canvas)
+
         chart_layout.addWidget(self.pie_canvas, 5)
         chart_layout.addWidget(self.breaks_balance_canvas, 3)
 
@@ -211,6 +304,7 @@ class StatsPage(QWidget):
         self.trend_canvas.setMinimumHeight(250)
         self.trend_canvas.setMaximumHeight(250)
         trend_layout.addWidget(self.trend_canvas)
+        self.trend_chart = DailyTrendChart(self.trend_fig, self.trend_canvas)
 
         # ----------------- HEATMAP (праворуч по центру) ---------
         heatmap_group = QGroupBox("Теплова карта активності (година × день)")
@@ -221,6 +315,7 @@ class StatsPage(QWidget):
         self.heatmap_canvas.setMinimumHeight(240)
         self.heatmap_canvas.setMaximumHeight(240)
         heatmap_layout.addWidget(self.heatmap_canvas)
+        self.heatmap_chart = HourHeatmapChart(self.heatmap_fig, self.heatmap_canvas)
 
         # ----------------- AI REPORT (праворуч знизу) -----------
         ai_group = QGroupBox("AI-звіт за період")
@@ -273,11 +368,23 @@ class StatsPage(QWidget):
         self._splitter = splitter
         root.addWidget(splitter)
 
+        # Прихований графік (інша сторінка, згорнута частина сплітера)
+        # не малюється, доки його не покажуть
+        self._chart_canvases = {
+            "pie": self.pie_canvas,
+            "balance": self.breaks_balance_canvas,
+            "trend": self.trend_canvas,
+            "heatmap": self.heatmap_canvas,
+        }
+        splitter.splitterMoved.connect(self._flush_charts)
+
         self.refresh()
 
 
     def showEvent(self, event):
         super().showEvent(event)
+        # після того, як розкладка отримає остаточні розміри
+        QTimer.singleShot(0, self._flush_charts)
 
         total = self.width()
         if total <= 0:
@@ -295,6 +402,7 @@ class StatsPage(QWidget):
         total_width = self._splitter.size().width()
         half = int(total_width / 2)
         self._splitter.setSizes([half, half])
+        self._flush_charts()
 
     # ----------------- HELPERS ---------------------------------
     def _init_dates_defaults(self):
@@ -327,26 +435,110 @@ class StatsPage(QWidget):
         self.from_date.setDate(QDate(start.year, start.month, start.day))
         self.to_date.setDate(QDate(end.year, end.month, end.day))
 
+    def _schedule_refresh(self, *_args):
+        self._refresh_debounce.start()
+
+    def _is_current_generation(self, generation: int) -> bool:
+        # викликається з потоку пулу — лише читання int
+        return generation == self._generation
+
     def refresh(self):
+        """Запускає завантаження періоду у фоні; рендериться лише останній запит."""
+        self._refresh_debounce.stop()
         start_day, end_day = self._get_selected_days()
-        cat_minutes, apps = self._query_categories(start_day, end_day)
+
+        self._generation += 1
+        if self._pending_task is not None:
+            self._pool.tryTake(self._pending_task)
+            self._pending_task = None
+
+        # Період, уже порахований на цій версії даних, — одразу з кешу.
+        # Версія — лише місяців періоду: запис поточних сесій не скидає
+        # кеш минулих місяців
+        self._result_key = (start_day, end_day, self.repo.data_version(start_day, end_day))
+        cached = self._result_cache.get(self._result_key)
+        if cached is not None:
+            self._result_cache.move_to_end(self._result_key)
+            self._on_range_loaded(self._generation, cached)
+            return
+
+        # Усі дані періоду — одним завантаженням у колонковий рушій
+        task = _RangeLoadTask(
+            self.engine, start_day, end_day, self._generation, self._is_current_generation
+        )
+        task.signals.loaded.connect(self._on_range_loaded)
+        task.signals.failed.connect(self._on_range_failed)
+        self._pending_task = task
+        self.btn_apply.setText("Оновлення…")
+        self._pool.start(task)
+
+    def _on_range_failed(self, generation: int, error: str):
+        if generation != self._generation:
+            return
+        # виняток з трасою стеку вже записав _RangeLoadTask
+        self._pending_task = None
+        self.btn_apply.setText("Оновити")
+
+    def _on_range_loaded(self, generation: int, result: RangeAnalytics):
+        if generation != self._generation:
+            return
+        self._pending_task = None
+        self.btn_apply.setText("Оновити")
+
+        start_day, end_day = result.start_day, result.end_day
+        self._last_result = result
+        self._last_result_key = self._result_key
+        self._remember_result(result)
 
         start_str = start_day.strftime("%Y-%m-%d")
         end_str = end_day.strftime("%Y-%m-%d")
         self._last_period = (start_str, end_str)
-        self._last_daily_totals_all = self.repo.get_daily_totals(start_str, end_str)
-        self._hourly_heatmap_data = self.repo.get_hourly_heatmap(start_str, end_str)
+        self._last_daily_totals_all = result.daily_totals
 
-        self._cached_cat_minutes = cat_minutes
-        self._cached_apps = apps
+        self._cached_cat_minutes = result.cat_minutes
+        self._cached_apps = result.apps
 
-        self._update_pie(cat_minutes)
+        self._update_pie(result.cat_minutes)
         self._update_breaks_table(start_day, end_day)
         self._update_breaks_balance_bar(start_day, end_day)
-        self._update_apps_table(apps)
-        self._update_trend_app_combo(apps)
+        self._update_apps_table(result.apps)
+        self._update_trend_app_combo(result.apps)
         self._update_trend_for_current_mode()
-        self._update_heatmap(self._hourly_heatmap_data)
+        self._update_heatmap(result.days, result.heatmap)
+
+    def _remember_result(self, result: RangeAnalytics):
+        key = self._result_key
+        if key is None:
+            return
+        self._result_cache[key] = result
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
+    # ----------------- ВИДИМІСТЬ ГРАФІКІВ ----------------------
+    def _chart_key(self) -> tuple | None:
+        """Ключ кадру графіка: період + версія показаних даних (береться разом з ними)."""
+        return self._last_result_key
+
+    def _render_chart(self, name: str, render: Callable[[], None]):
+        """
+        Графік малюється зараз, якщо його видно, інакше — при появі.
+        render має вже містити ключ кадру і дані: до показу графіка
+        self._result_key може змінитись.
+        """
+        self._dirty_charts[name] = render
+        self._flush_charts()
+
+    def _flush_charts(self, *_args):
+        for name, render in list(self._dirty_charts.items()):
+            if self._is_chart_visible(self._chart_canvases[name]):
+                del self._dirty_charts[name]
+                render()
+
+    def _is_chart_visible(self, canvas) -> bool:
+        if not canvas.isVisible() or self.window().isMinimized():
+            return False
+        return not canvas.visibleRegion().isEmpty()
 
     def _get_selected_days(self) -> tuple[date, date]:
         d1 = self.from_date.date()
@@ -356,53 +548,6 @@ class StatsPage(QWidget):
             date(d2.year(), d2.month(), d2.day()),
         )
 
-    def _query_categories(self, start_day: date, end_day: date):
-        start = start_day.strftime("%Y-%m-%d")
-        end = end_day.strftime("%Y-%m-%d")
-
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-
-        cur.execute(
-            """
-            SELECT category, SUM(duration_sec) AS total_sec
-            FROM sessions
-            WHERE day >= ? AND day <= ?
-            GROUP BY category
-            """,
-            (start, end),
-        )
-        rows_cat = cur.fetchall()
-        cat_minutes = {
-            (r["category"] or "other"): (r["total_sec"] or 0) / 60.0 for r in rows_cat
-        }
-
-        cur.execute(
-            """
-            SELECT app, title, category, SUM(duration_sec) AS total_sec
-            FROM sessions
-            WHERE day >= ? AND day <= ?
-            GROUP BY app, title, category
-            ORDER BY total_sec DESC
-            LIMIT 50
-            """,
-            (start, end),
-        )
-        rows_apps = cur.fetchall()
-        apps = [
-            (
-                r["app"],
-                r["title"],
-                r["category"] or "other",
-                (r["total_sec"] or 0) / 60.0,
-            )
-            for r in rows_apps
-        ]
-
-        conn.close()
-        return cat_minutes, apps
-
     # ----------------- BREAKS TABLE ----------------------------
     def _get_break_min_visible_sec(self) -> int:
         cfg = self._settings_repo.all()
@@ -419,8 +564,15 @@ class StatsPage(QWidget):
         start_ts = int(day_start_dt.timestamp())
         end_ts = int(day_end_dt.timestamp())
 
-        breaks = self.repo.get_breaks_for_range(start_ts, end_ts)
-        summary = self.repo.get_breaks_summary_for_range(start_ts, end_ts)
+        if self._last_result is not None:
+            breaks = self._last_result.breaks
+            summary = {
+                "count": self._last_result.breaks_count,
+                "total_duration_sec": self._last_result.breaks_total_sec,
+            }
+        else:
+            breaks = self.repo.get_breaks_for_range(start_ts, end_ts)
+            summary = self.repo.get_breaks_summary_for_range(start_ts, end_ts)
 
         min_visible_sec = self._get_break_min_visible_sec()
 
@@ -495,13 +647,6 @@ class StatsPage(QWidget):
 
 
     def _update_breaks_balance_bar(self, start_day: date, end_day: date):
-
-
-        self.breaks_balance_fig.clear()
-        ax = self.breaks_balance_fig.add_subplot(111)
-        ax.set_facecolor("#202020")
-        self.breaks_balance_fig.patch.set_facecolor("#202020")
-
         # Обчислення періоду
         day_start_dt = datetime.combine(start_day, dtime.min)
         day_end_dt = datetime.combine(end_day + timedelta(days=1), dtime.min)
@@ -509,8 +654,11 @@ class StatsPage(QWidget):
         end_ts = int(day_end_dt.timestamp())
 
         # Дані по перервах
-        summary = self.repo.get_breaks_summary_for_range(start_ts, end_ts)
-        break_sec = int(summary.get("total_duration_sec", 0) or 0)
+        if self._last_result is not None:
+            break_sec = self._last_result.breaks_total_sec
+        else:
+            summary = self.repo.get_breaks_summary_for_range(start_ts, end_ts)
+            break_sec = int(summary.get("total_duration_sec", 0) or 0)
 
         # Дані по активності (з daily_totals)
         if not self._last_daily_totals_all:
@@ -521,180 +669,13 @@ class StatsPage(QWidget):
         active_min = sum(self._last_daily_totals_all.values())
         active_sec = int(active_min * 60)
 
-        total = active_sec + break_sec
-        if total <= 0:
-            ax.text(0.5, 0.5, "Немає даних", ha="center", va="center", color="white")
-            ax.axis("off")
-            self.breaks_balance_canvas.draw()
-            return
-
-        active_pct = active_sec / total
-        break_pct = break_sec / total
-
-        # Формат часу для підпису
-        def fmt(sec: int) -> str:
-            if sec < 60:
-                return f"{sec} с"
-            m = sec // 60
-            h = m // 60
-            m = m % 60
-            if h > 0:
-                return f"{h} год {m} хв"
-            return f"{m} хв"
-
-        active_str = fmt(active_sec)
-        break_str = fmt(break_sec)
-
-        # Y-позиції (дві тонкі смуги)
-        y_pos = [0.7, 0.2]
-        bar_height = 0.18  # тонші смуги
-
-        # --- Активність ---
-        ax.barh(y_pos[0], active_pct, height=bar_height, color="#4CAF50")
-        text_x = active_pct - 0.02 if active_pct > 0.15 else active_pct + 0.02
-        ha = "right" if active_pct > 0.15 else "left"
-        ax.text(
-            text_x,
-            y_pos[0],
-            f"Активність — {active_pct * 100:.0f}%",
-            va="center",
-            ha=ha,
-            color="white",
-            fontsize=9,
+        key = self._chart_key()
+        self._render_chart(
+            "balance",
+            lambda: self.balance_chart.render(key, active_sec, break_sec),
         )
 
-        # --- Перерви ---
-        ax.barh(y_pos[1], break_pct, height=bar_height, color="#B0BEC5")
-        text_x2 = break_pct - 0.02 if break_pct > 0.15 else break_pct + 0.02
-        ha2 = "right" if break_pct > 0.15 else "left"
-        ax.text(
-            text_x2,
-            y_pos[1],
-            f"Перерви — {break_pct * 100:.0f}%",
-            va="center",
-            ha=ha2,
-            color="white",
-            fontsize=9,
-        )
-
-        # Оформлення осей і сітки (все біле)
-        ax.set_yticks([])
-        ax.set_xlim(0, 1)
-        ax.set_xlabel("")
-        ax.set_title("Баланс активність / перерви", color="white", pad=8)
-
-        ax.grid(True, axis="x", linestyle="--", alpha=0.25, color="#AAAAAA")
-        ax.tick_params(axis="x", colors="white")
-        for spine in ax.spines.values():
-            spine.set_color("#404040")
-
-        # Підпис під графіком
-        caption = (
-            f"За період: {active_str} активності, {break_str} перерв "
-            f"({break_pct*100:.0f}%)."
-        )
-
-        ax.text(
-            0.5,
-            -0.32,    
-            caption,
-            ha="center",
-            va="center",
-            color="white",
-            fontsize=9,
-        )
-
-        self.breaks_balance_fig.subplots_adjust(
-            left=0.10, right=0.95, top=0.80, bottom=0.32
-        )
-
-        self.breaks_balance_canvas.draw()
-
     # ----------------- BREAKS CHART -----------------------------
-    def _update_breaks_chart(self, start_day: date, end_day: date):
-        self.breaks_fig_chart.clear()
-        ax = self.breaks_fig_chart.add_subplot(111)
-        ax.set_facecolor("#202020")
-        self.breaks_fig_chart.patch.set_facecolor("#202020")
-
-        day_start_dt = datetime.combine(start_day, dtime.min)
-        day_end_dt = datetime.combine(end_day + timedelta(days=1), dtime.min)
-        start_ts = int(day_start_dt.timestamp())
-        end_ts = int(day_end_dt.timestamp())
-
-        breaks = self.repo.get_breaks_for_range(start_ts, end_ts)
-
-        if not breaks:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає перерв за обраний період",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            self.breaks_canvas_chart.draw()
-            return
-
-        # агрегуємо по годинах доби
-        hour_to_min = {h: 0.0 for h in range(24)}
-        for br in breaks:
-            start_dt = datetime.fromtimestamp(br["start_ts"])
-            h = start_dt.hour
-            hour_to_min[h] += (br["duration_sec"] or 0) / 60.0
-
-        hours = [h for h, val in hour_to_min.items() if val > 0]
-        if not hours:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає значущих перерв",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            self.breaks_canvas_chart.draw()
-            return
-
-        hours.sort()
-        values = [hour_to_min[h] for h in hours]
-
-        x_idx = list(range(len(hours)))
-        labels = [f"{h:02d}:00" for h in hours]
-
-        def _ytick_fmt(v, pos):
-            seconds = int(round(v * 60))
-            if seconds <= 0:
-                return "0"
-            return format_duration_human(seconds)
-
-        ax.yaxis.set_major_formatter(FuncFormatter(_ytick_fmt))
-
-        bar_color = CATEGORY_COLORS.get("other", "#4FC3F7")
-        ax.bar(x_idx, values, width=0.6, color=bar_color)
-
-        ax.set_xticks(x_idx)
-        ax.set_xticklabels(labels, rotation=0, ha="center", color="white")
-
-        ax.set_ylabel("Час у перервах", color="white")
-        ax.set_title("Перерви по годинах (сума за період)", color="white")
-
-        ax.grid(True, linestyle="--", alpha=0.3, color="#AAAAAA")
-        ax.tick_params(axis="y", colors="white")
-        ax.spines["bottom"].set_color("white")
-        ax.spines["left"].set_color("white")
-        ax.spines["top"].set_color("#404040")
-        ax.spines["right"].set_color("#404040")
-
-        ymin = 0
-        ymax = max(values) * 1.15 if values else 1
-        ax.set_ylim(ymin, ymax)
-
-        self.breaks_fig_chart.subplots_adjust(left=0.20, right=0.98, top=0.9, bottom=0.2)
-        self.breaks_canvas_chart.draw()
-
     # ----------------- TREND APP COMBO --------------------------
     def _update_trend_app_combo(self, apps):
         current_app = self._get_selected_app_key()
@@ -719,39 +700,64 @@ class StatsPage(QWidget):
 
     # ----------------- TREND MODE -------------------------------
     def _update_trend_for_current_mode(self):
-        if not self._last_period:
+        # ключ, дані й вибір фіксуються зараз, а ряд по категорії /
+        # застосунку рахується лише для видимого графіка
+        render = partial(
+            self._render_trend,
+            self._chart_key(),
+            self._last_period,
+            self._last_result,
+            self._last_daily_totals_all,
+            self.trend_mode_combo.currentData(),
+            self._get_selected_category_key(),
+            self._get_selected_app_key(),
+        )
+        self._render_chart("trend", render)
+
+    def _render_trend(self, key, period, result, totals_all, mode, cat_key, app_key):
+        if not period:
             self._update_trend({})
             return
 
-        start_str, end_str = self._last_period
-        mode = self.trend_mode_combo.currentData()
+        start_str, end_str = period
 
         if mode == "category":
-            cat_key = self._get_selected_category_key()
             if cat_key:
-                daily_totals = self.repo.get_daily_totals_by_category(start_str, end_str, cat_key)
+                daily_totals = self._daily_totals_for(result, start_str, end_str, category=cat_key)
                 color_key = cat_key
                 title_suffix = f" – {CATEGORY_LABELS.get(cat_key, cat_key)}"
             else:
-                daily_totals = self._last_daily_totals_all
+                daily_totals = totals_all
                 color_key = "work"
                 title_suffix = ""
         elif mode == "app":
-            app_key = self._get_selected_app_key()
             if app_key:
-                daily_totals = self.repo.get_daily_totals_by_app(start_str, end_str, app_key)
+                daily_totals = self._daily_totals_for(result, start_str, end_str, app=app_key)
                 color_key = "other"
                 title_suffix = f" – {app_key}"
             else:
-                daily_totals = self._last_daily_totals_all
+                daily_totals = totals_all
                 color_key = "work"
                 title_suffix = ""
         else:
-            daily_totals = self._last_daily_totals_all
+            daily_totals = totals_all
             color_key = "work"
             title_suffix = ""
 
-        self._update_trend(daily_totals, color_key=color_key, title_suffix=title_suffix)
+        self._update_trend(
+            daily_totals,
+            color_key=color_key,
+            title_suffix=title_suffix,
+            cache_key=key + (mode, color_key, title_suffix) if key is not None else None,
+        )
+
+    def _daily_totals_for(self, result, start_str: str, end_str: str, category=None, app=None):
+        # Ряд рахується з уже завантажених колонок, без нового SQL-запиту
+        if result is not None:
+            return result.daily_totals_for(category=category, app=app)
+        if category is not None:
+            return self.repo.get_daily_totals_by_category(start_str, end_str, category)
+        return self.repo.get_daily_totals_by_app(start_str, end_str, app)
 
     def _get_selected_category_key(self):
         idx = self.trend_category_combo.currentIndex()
@@ -792,269 +798,50 @@ class StatsPage(QWidget):
 
     # ----------------- PIE CHART -------------------------------
     def _update_pie(self, cat_minutes: dict[str, float]):
-        from matplotlib.gridspec import GridSpec
-
-        self.pie_fig.clear()
-
-        gs = self.pie_fig.add_gridspec(1, 2, width_ratios=[2, 1], wspace=0.01)
-        ax = self.pie_fig.add_subplot(gs[0, 0])       # пай-чарт
-        leg_ax = self.pie_fig.add_subplot(gs[0, 1])   # легенда
-
-        ax.set_facecolor("#202020")
-        leg_ax.set_facecolor("#202020")
-        self.pie_fig.patch.set_facecolor("#202020")
-
-        if not cat_minutes:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає даних",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            leg_ax.axis("off")
-            self.pie_canvas.draw()
-            return
-
-        categories = list(cat_minutes.keys())
-        values = [cat_minutes[c] for c in categories]
-        colors = [CATEGORY_COLORS.get(c, CATEGORY_COLORS["other"]) for c in categories]
-
-        total = sum(values) or 1.0
-
-        def _fmt_pct(pct: float) -> str:
-            if pct < 5:
-                return ""
-            return f"{pct:.0f}%"
-
-        def _fmt_minutes_human(m: float) -> str:
-            total_sec = int(m * 60)
-            if total_sec < 60:
-                return f"{total_sec} с"
-            minutes = total_sec // 60
-            hours = minutes // 60
-            minutes = minutes % 60
-            if hours > 0:
-                if minutes > 0:
-                    return f"{hours} год {minutes} хв"
-                return f"{hours} год"
-            return f"{minutes} хв"
-
-        wedges, texts, autotexts = ax.pie(
-            values,
-            labels=None,
-            colors=colors,
-            startangle=90,
-            autopct=_fmt_pct,
-            textprops={"color": "white"},
+        key = self._chart_key()
+        self._render_chart(
+            "pie",
+            lambda: self.pie_chart.render(key, cat_minutes or {}),
         )
 
-        for t in autotexts:
-            t.set_color("white")
-            t.set_fontsize(9)
-
-        ax.set_title("Час за категоріями", color="white")
-        ax.axis("equal")
-
-        legend_labels = []
-        for cat, val in zip(categories, values):
-            pct = val / total * 100
-            label = CATEGORY_LABELS.get(cat, cat)
-            human = _fmt_minutes_human(val)
-            legend_labels.append(f"{label} — {human} ({pct:.0f}%)")
-
-        leg_ax.axis("off")
-        legend = leg_ax.legend(
-            wedges,
-            legend_labels,
-            loc="center left",
-            bbox_to_anchor=(-0.05, 0.5),  
-            fontsize=9,
-            frameon=False,
-        )
-
-
-        for txt in legend.get_texts():
-            txt.set_color("white")
-
-        self.pie_fig.subplots_adjust(left=0.02, right=0.98, top=0.88, bottom=0.12)
-
-        self.pie_canvas.draw()
-
     # ----------------- TREND CHART -----------------------------
-    def _format_trend_ytick(self, value, pos):
-        seconds = int(round(value * 60))
-        if seconds <= 0:
-            return "0"
-        return format_duration_human(seconds)
-
     def _update_trend(
         self,
         daily_totals: dict[str, float],
         color_key: str | None = None,
         title_suffix: str = "",
+        cache_key: tuple | None = None,
     ):
-        self.trend_fig.clear()
-        ax = self.trend_fig.add_subplot(111)
-
-        ax.set_facecolor("#202020")
-        self.trend_fig.patch.set_facecolor("#202020")
-
-        ax.yaxis.set_major_formatter(FuncFormatter(self._format_trend_ytick))
-        ax.set_ylabel("Час", color="white")
-
-        if not daily_totals:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає даних за обраний період",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            self.trend_canvas.draw()
-            return
-
-        days = sorted(daily_totals.keys())
-        values = [daily_totals[d] for d in days]
-
-        x_idx = list(range(len(days)))
-        labels = [f"{d[8:10]}.{d[5:7]}" for d in days]
-
-        line_color = CATEGORY_COLORS.get(color_key or "work", "#4FC3F7")
-
-        ax.plot(x_idx, values, marker="o", linewidth=2.0, color=line_color)
-
-        ax.set_xticks(x_idx)
-        ax.set_xticklabels(labels, rotation=0, ha="center", color="white")
-
         title = "Динаміка активності по днях"
         if title_suffix:
             title += title_suffix
-        ax.set_title(title, color="white")
 
-        ax.grid(True, linestyle="--", alpha=0.3, color="#AAAAAA")
-
-        ax.tick_params(axis="y", colors="white")
-        ax.spines["bottom"].set_color("white")
-        ax.spines["left"].set_color("white")
-        ax.spines["top"].set_color("#404040")
-        ax.spines["right"].set_color("#404040")
-
-        ymin = 0
-        ymax = max(values) * 1.15 if values else 1
-        ax.set_ylim(ymin, ymax)
-
-        self.trend_fig.subplots_adjust(left=0.20, right=0.98, top=0.9, bottom=0.18)
-        self.trend_canvas.draw()
+        self.trend_chart.render(
+            cache_key,
+            daily_totals or {},
+            color=CATEGORY_COLORS.get(color_key or "work", "#4FC3F7"),
+            title=title,
+        )
 
     # ----------------- HEATMAP --------------------------------
-    def _update_heatmap(self, heatmap_data: dict[str, dict[int, float]]):
-        self.heatmap_fig.clear()
-        ax = self.heatmap_fig.add_subplot(111)
-
-        ax.set_facecolor("#202020")
-        self.heatmap_fig.patch.set_facecolor("#202020")
-
-        if not heatmap_data:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає даних для побудови теплової карти",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            self.heatmap_canvas.draw()
-            return
-
-        days = sorted(heatmap_data.keys())
-        if not days:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає даних для побудови теплової карти",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            self.heatmap_canvas.draw()
+    def _update_heatmap(self, days: tuple[str, ...], heatmap: np.ndarray):
+        """heatmap — щільна матриця днів × 24 (хвилини) з RangeAnalytics."""
+        self._render_chart("heatmap", partial(self._render_heatmap, self._chart_key(), days, heatmap))
+
+    def _render_heatmap(self, key, days: tuple[str, ...], heatmap: np.ndarray):
+        hours = visible_hours(heatmap)
+        if hours.size == 0:
+            self.heatmap_chart.show_message("Немає даних для побудови теплової карти")
             return
 
-        active_hours = set()
-        for d in days:
-            for h, minutes in heatmap_data.get(d, {}).items():
-                if minutes and minutes > 0:
-                    active_hours.add(h)
-
-        if not active_hours:
-            ax.text(
-                0.5,
-                0.5,
-                "Немає істотної активності за обраний період",
-                color="white",
-                ha="center",
-                va="center",
-            )
-            ax.axis("off")
-            self.heatmap_canvas.draw()
-            return
-
-        hours_list = sorted(active_hours)
-        if len(hours_list) > 16:
-            hours_list = list(range(24))
-
-        data_matrix = []
-        for h in hours_list:
-            row = []
-            for d in days:
-                minutes = heatmap_data.get(d, {}).get(h, 0.0)
-                row.append(minutes)
-            data_matrix.append(row)
-
-        img = ax.imshow(
-            data_matrix,
-            aspect="auto",
-            origin="lower",
-            cmap="magma",
+        # години × дні: одна вибірка стовпців замість обходу словників
+        self.heatmap_chart.render(
+            key,
+            heatmap[:, hours].T,
+            [day_label(d) for d in days],
+            [f"{h:02d}:00" for h in hours],
         )
 
-        x_idx = list(range(len(days)))
-        x_labels = [f"{d[8:10]}.{d[5:7]}" for d in days]
-        ax.set_xticks(x_idx)
-        ax.set_xticklabels(x_labels, rotation=0, ha="center", color="white")
-
-        y_idx = list(range(len(hours_list)))
-        ax.set_yticks(y_idx)
-        ax.set_yticklabels(
-            [f"{h:02d}:00" for h in hours_list],
-            color="white",
-        )
-
-        ax.set_xlabel("Дні", color="white")
-        ax.set_ylabel("Години доби", color="white")
-        ax.set_title("Активність по годинах", color="white")
-
-        ax.tick_params(axis="x", colors="white")
-        ax.tick_params(axis="y", colors="white")
-        for spine in ax.spines.values():
-            spine.set_color("#404040")
-
-        self.heatmap_fig.subplots_adjust(left=0.18, right=0.98, top=0.9, bottom=0.18)
-
-        cbar = self.heatmap_fig.colorbar(img, ax=ax)
-        cbar.set_label("хвилини активності", color="white")
-        cbar.ax.yaxis.set_tick_params(color="white")
-        for t in cbar.ax.get_yticklabels():
-            t.set_color("white")
-
-        self.heatmap_canvas.draw()
-
     # ----------------- APPS TABLE ------------------------------
     def _update_apps_table(self, apps):
         self.table_apps.setRowCount(0)
@@ -1084,7 +871,7 @@ class StatsPage(QWidget):
             "cat_minutes": self._cached_cat_minutes or {},
             "apps": self._cached_apps or [],
             "daily_totals": self._last_daily_totals_all or {},
-            "heatmap_data": self._hourly_heatmap_data or {},
+            "heatmap_data": self._last_result.heatmap_data if self._last_result is not None else {},
         }
 
         text = self.period_ai_service.build_period_report(data)
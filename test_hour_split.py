@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from core.hour_split import split_by_hour, visible_hours
+
+
+def split(intervals, n_days: int = 2):
+    local_start = np.array([s for s, _ in intervals], dtype=np.int64)
+    duration = np.array([d for _, d in intervals], dtype=np.int64)
+    return split_by_hour(local_start, duration, first_day=0, n_days=n_days)
+
+
+class SplitByHourTest(unittest.TestCase):
+    def test_inside_one_hour(self):
+        out = split([(9 * 3600 + 600, 1200)])
+        self.assertEqual(out[0, 9], 1200)
+        self.assertEqual(out.sum(), 1200)
+
+    def test_crosses_hour_boundary(self):
+        # 09:50 → 10:20
+        out = split([(9 * 3600 + 3000, 1800)])
+        self.assertEqual(out[0, 9], 600)
+        self.assertEqual(out[0, 10], 1200)
+        self.assertEqual(out.sum(), 1800)
+
+    def test_spans_full_hours(self):
+        # 09:30 → 12:15: часткова, дві повні, часткова
+        out = split([(9 * 3600 + 1800, 2 * 3600 + 2700)])
+        np.testing.assert_array_equal(out[0, 9:13], [1800, 3600, 3600, 900])
+        self.assertEqual(out.sum(), 2 * 3600 + 2700)
+
+    def test_crosses_midnight(self):
+        # 23:30 першого дня → 00:45 другого
+        out = split([(23 * 3600 + 1800, 4500)])
+        self.assertEqual(out[0, 23], 1800)
+        self.assertEqual(out[1, 0], 2700)
+        self.assertEqual(out.sum(), 4500)
+
+    def test_totals_preserved_for_many_sessions(self):
+        rng = np.random.default_rng(0)
+        starts = rng.integers(0, 86400, 500)
+        durations = rng.integers(1, 6 * 3600, 500)
+        out = split(list(zip(starts, durations)), n_days=2)
+        self.assertEqual(out.sum(), durations.sum())
+
+    def test_clipped_to_range(self):
+        # почалась до діапазону і закінчилась після нього
+        out = split([(-1800, 86400 + 3600)], n_days=1)
+        self.assertEqual(out.sum(), 86400)
+        self.assertEqual(out[0, 0], 3600)
+
+    def test_empty(self):
+        self.assertEqual(split([]).shape, (2, 24))
+        self.assertEqual(split([(3600, 0)]).sum(), 0)
+
+
+class VisibleHoursTest(unittest.TestCase):
+    def test_sparse_and_dense(self):
+        minutes = np.zeros((2, 24))
+        minutes[0, 9] = minutes[1, 14] = 5
+        np.testing.assert_array_equal(visible_hours(minutes), [9, 14])
+        self.assertEqual(visible_hours(np.ones((1, 24)), max_sparse_hours=16).size, 24)
+
+
+if __name__ == "__main__":
+    unittest.main()
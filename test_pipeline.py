@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import unittest
+
+from core.pipeline import BLOCK, DROP_OLDEST, MERGE, STAGE_RESTARTS, StageMetrics, StageQueue, TrackingPipeline
+from core.probes import ProbeSample
+from core.replay import NullWriter, TraceFeed, TraceScheduler
+from core.session_builder import SessionBuilder
+
+
+def merge_small(last: int, new: int):
+    return last + new if last < 10 else None
+
+
+class StageQueueTest(unittest.IsolatedAsyncioTestCase):
+    def make(self, policy: str, maxsize: int = 2, merge=None) -> StageQueue:
+        return StageQueue(StageMetrics("test"), maxsize, policy, merge)
+
+    async def drain(self, queue: StageQueue) -> list:
+        await queue.close()
+        items = []
+        while (item := await queue.get()) is not None:
+            items.append(item)
+        return items
+
+    async def test_block_waits_for_consumer(self):
+        queue = self.make(BLOCK, maxsize=1)
+        await queue.put("a")
+        producer = asyncio.ensure_future(queue.put("b"))
+        await asyncio.sleep(0)
+        self.assertFalse(producer.done())
+        self.assertEqual(queue.metrics.blocked, 1)
+
+        self.assertEqual(await queue.get(), "a")
+        await producer
+        self.assertEqual(await self.drain(queue), ["b"])
+        self.assertEqual(queue.metrics.dropped, 0)
+
+    async def test_drop_oldest(self):
+        queue = self.make(DROP_OLDEST)
+        for item in (1, 2, 3):
+            await queue.put(item)
+        self.assertEqual(queue.metrics.dropped, 1)
+        self.assertEqual(queue.metrics.max_depth, 2)
+        self.assertEqual(await self.drain(queue), [2, 3])
+
+    async def test_merge_then_drop_oldest(self):
+        queue = self.make(MERGE, merge=merge_small)
+        for item in (1, 2, 3):
+            await queue.put(item)
+        self.assertEqual(queue.metrics.merged, 1)
+
+        # 5 + 20 ще зливається, 25 + 30 — ні: відкидається найстаріший
+        await queue.put(20)
+        await queue.put(30)
+        self.assertEqual(queue.metrics.merged, 2)
+        self.assertEqual(queue.metrics.dropped, 1)
+        self.assertEqual(await self.drain(queue), [25, 30])
+
+    async def test_closed_queue(self):
+        queue = self.make(BLOCK)
+        await queue.put(1)
+        self.assertEqual(await self.drain(queue), [1])
+        await queue.put(2)
+        self.assertEqual(queue.metrics.dropped, 1)
+        self.assertIsNone(await queue.get())
+
+
+class PipelineFailureTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def run_pipeline(self, classify, **kwargs):
+        # вікна по 20 с — кожне стає окремою сесією
+        items = [
+            (1_700_000_000 + i * 5, ProbeSample(app=f"app{i // 4}.exe", title="doc"))
+            for i in range(40)
+        ]
+        sessions = []
+        feed = TraceFeed(items)
+        pipeline = TrackingPipeline(
+            sample=feed.sample,
+            builder=SessionBuilder(classify=None),
+            classify=classify,
+            sqlite_repo=NullWriter(),
+            json_repo=NullWriter(),
+            scheduler=TraceScheduler(feed),
+            on_session=sessions.append,
+            clock=feed.clock,
+            **kwargs,
+        )
+        feed.pipeline = pipeline
+        asyncio.run(pipeline.run())
+        return sessions
+
+    def test_stage_is_restarted(self):
+        calls = []
+
+        def classify(app: str, title: str) -> str:
+            calls.append(app)
+            if len(calls) == 1:
+                raise ValueError("llm down")
+            return "work"
+
+        sessions = self.run_pipeline(classify)
+        self.assertEqual(len(sessions), len(calls) - 1)
+        self.assertGreater(len(sessions), 5)
+
+    def test_heartbeat_when_stage_fails(self):
+        beats = []
+        # класифікація падає одразу, але heartbeat встигає спрацювати
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(lambda app, title: 1 / 0, on_heartbeat=lambda: beats.append(1))
+        self.assertEqual(len(beats), 1)
+
+    def test_run_fails_after_restarts(self):
+        calls = []
+
+        def classify(app: str, title: str) -> str:
+            calls.append(app)
+            raise ValueError("llm down")
+
+        with self.assertRaises(RuntimeError) as ctx:
+            self.run_pipeline(classify)
+        self.assertIsInstance(ctx.exception.__cause__, ValueError)
+        self.assertEqual(len(calls), STAGE_RESTARTS + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
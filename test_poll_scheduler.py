@@ -0,0 +1,53 @@
+import unittest
+from datetime import datetime, timedelta
+
+from core.poll_scheduler import CLOCK_JUMP, SUSPEND, ClockGapDetector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ClockGapDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.detector = ClockGapDetector(clock=self.clock)
+        self.t0 = datetime(2025, 3, 1, 12, 0, 0)
+        self.assertIsNone(self.detector.observe(self.t0, expected_sec=5))
+
+    def observe(self, wall_sec: float, elapsed_sec: float, expected_sec: float = 5):
+        self.clock.now += elapsed_sec
+        return self.detector.observe(self.t0 + timedelta(seconds=wall_sec), expected_sec)
+
+    def test_regular_tick(self):
+        self.assertIsNone(self.observe(wall_sec=5, elapsed_sec=5))
+
+    def test_forward_jump_is_not_suspend(self):
+        # NTP / ручна зміна часу на дві години вперед, реально минуло 2 с
+        gap = self.observe(wall_sec=2 * 3600, elapsed_sec=2)
+        self.assertEqual(gap.kind, CLOCK_JUMP)
+        self.assertEqual(self.detector.suspends, 0)
+
+    def test_backward_jump(self):
+        gap = self.observe(wall_sec=-600, elapsed_sec=5)
+        self.assertEqual(gap.kind, CLOCK_JUMP)
+
+    def test_suspend(self):
+        # сон: обидва годинники пройшли годину
+        gap = self.observe(wall_sec=3600, elapsed_sec=3600)
+        self.assertEqual(gap.kind, SUSPEND)
+        self.assertEqual(gap.last_dt, self.t0)
+
+    def test_wall_only_mode(self):
+        detector = ClockGapDetector(clock=None)
+        detector.observe(self.t0)
+        gap = detector.observe(self.t0 + timedelta(hours=1))
+        self.assertEqual(gap.kind, SUSPEND)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+from datetime import datetime, timedelta
+
+from core.probes import ProbeSample
+from core.session_builder import ActivityDelta, SessionBuilder
+
+
+T0 = datetime(2025, 3, 1, 12, 0, 0)
+CATEGORIES = {"code.exe": "work", "chrome.exe": "work", "vlc.exe": "media", "player.exe": "media"}
+
+
+def at(sec: float) -> datetime:
+    return T0 + timedelta(seconds=sec)
+
+
+def ts(sec: float) -> int:
+    return int(at(sec).timestamp())
+
+
+class SessionBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self.builder = self.make()
+
+    def make(self, **kwargs) -> SessionBuilder:
+        kwargs.setdefault("min_session_sec", 10)
+        kwargs.setdefault("idle_timeout", 300)
+        return SessionBuilder(classify=lambda app, title: CATEGORIES.get(app, "other"), **kwargs)
+
+    def feed(self, sec: float, app: str = "code.exe", title: str = "main.py",
+             idle_sec: int = 0, locked: bool = False, builder: SessionBuilder = None):
+        builder = builder or self.builder
+        return builder.feed(ProbeSample(app, title, idle_sec=idle_sec, locked=locked), at(sec))
+
+    # ---------- Межі сесій ----------
+
+    def test_first_sample_starts_session(self):
+        result = self.feed(0)
+        self.assertEqual(result.sessions, [])
+        self.assertEqual(result.activity["app"], "code.exe")
+        self.assertTrue(result.changed)
+
+    def test_short_switch_is_debounced(self):
+        self.feed(0)
+        self.feed(5, app="chrome.exe", title="docs")
+        self.assertEqual(self.feed(10).sessions, [])
+
+        sessions = self.builder.close(at(30)).sessions
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0]["app"], "code.exe")
+        self.assertEqual(sessions[0]["duration_sec"], 30)
+
+    def test_stable_switch_starts_at_first_sample(self):
+        self.feed(0)
+        self.feed(20, app="chrome.exe", title="docs")
+        self.assertEqual(self.feed(25, app="chrome.exe", title="docs").sessions, [])
+
+        sessions = self.feed(30, app="chrome.exe", title="docs").sessions
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0]["end"], at(20).isoformat())
+        self.assertEqual(sessions[0]["category"], "work")
+
+        sessions = self.builder.close(at(40)).sessions
+        self.assertEqual(sessions[0]["start"], at(20).isoformat())
+        self.assertEqual(sessions[0]["duration_sec"], 20)
+
+    def test_title_counter_keeps_session_and_raw_title(self):
+        self.feed(0, app="chrome.exe", title="(3) Inbox - Gmail")
+        result = self.feed(30, app="chrome.exe", title="(4) Inbox - Gmail")
+        self.assertFalse(result.changed)
+
+        sessions = self.builder.close(at(60)).sessions
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0]["title"], "(3) Inbox - Gmail")
+
+    # ---------- Idle і перерви ----------
+
+    def test_idle_becomes_break(self):
+        self.feed(0)
+        self.assertTrue(self.feed(300, idle_sec=300).activity["idle"])
+        result = self.feed(600)
+        self.assertEqual(len(result.breaks), 1)
+        self.assertEqual((result.breaks[0].start_ts, result.breaks[0].end_ts), (ts(300), ts(600)))
+
+    def test_passive_app_is_never_idle(self):
+        builder = self.make(passive_apps=["vlc.exe", "chrome.exe::youtube.com"])
+        self.feed(0, app="vlc.exe", title="film.mkv", builder=builder)
+        result = self.feed(600, app="vlc.exe", title="film.mkv", idle_sec=600, builder=builder)
+        self.assertFalse(result.activity["idle"])
+
+        result = self.feed(900, app="chrome.exe", title="Lecture - YouTube.com", idle_sec=900,
+                           builder=builder)
+        self.assertFalse(result.activity["idle"])
+        self.assertEqual(result.breaks, [])
+
+    def test_passive_category_overrides_idle(self):
+        builder = self.make(passive_categories=["media"])
+        self.feed(0, app="player.exe", title="song", idle_sec=600, builder=builder)
+        sessions = builder.close(at(60)).sessions
+        self.assertEqual(sessions[0]["category"], "media")
+        self.assertFalse(sessions[0]["idle"])
+
+    # ---------- Блокування та розриви ----------
+
+    def test_lock_closes_session_and_unlock_ends_break(self):
+        self.feed(0)
+        result = self.feed(30, locked=True)
+        self.assertEqual(len(result.sessions), 1)
+        self.assertEqual(result.sessions[0]["end"], at(30).isoformat())
+        self.assertTrue(result.activity["locked"])
+
+        self.assertEqual(self.feed(60, locked=True).sessions, [])
+
+        result = self.feed(90)
+        self.assertEqual(len(result.breaks), 1)
+        self.assertEqual((result.breaks[0].start_ts, result.breaks[0].end_ts), (ts(30), ts(90)))
+        self.assertEqual(result.breaks[0].last_category, "work")
+
+    def test_lock_right_after_unlock_skips_zero_length(self):
+        self.feed(0, locked=True)
+        self.feed(60)
+        self.assertEqual(self.feed(60, locked=True).sessions, [])
+
+    def test_short_session_before_lock_is_kept(self):
+        self.feed(0)
+        sessions = self.feed(5, locked=True).sessions
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0]["duration_sec"], 5)
+
+    def test_suspend_closes_at_last_sample(self):
+        self.feed(0)
+        self.feed(5)
+        result = self.builder.interrupt(at(5), at(3605), as_break=True)
+        self.assertEqual(result.sessions[0]["end"], at(5).isoformat())
+        self.assertEqual((result.breaks[0].start_ts, result.breaks[0].end_ts), (ts(5), ts(3605)))
+
+    def test_clock_jump_is_not_a_break(self):
+        self.feed(0)
+        self.feed(15)
+        result = self.builder.interrupt(at(15), at(15 + 7200), as_break=False)
+        self.assertEqual(result.sessions[0]["duration_sec"], 15)
+        self.assertEqual(result.breaks, [])
+
+
+class ActivityDeltaTest(unittest.TestCase):
+    def activity(self, **kwargs) -> dict:
+        activity = {"app": "code.exe", "title": "main.py", "idle": False, "is_fullscreen": False,
+                    "category": "work", "locked": False, "start_ts": 100, "duration_sec": 5}
+        activity.update(kwargs)
+        return activity
+
+    def test_first_delta_has_all_fields(self):
+        delta = ActivityDelta().diff(self.activity())
+        self.assertEqual(set(delta), set(ActivityDelta.FIELDS) | {"duration_sec"})
+
+    def test_duration_only_is_skipped(self):
+        deltas = ActivityDelta()
+        deltas.diff(self.activity())
+        self.assertIsNone(deltas.diff(self.activity(duration_sec=10)))
+
+    def test_changed_fields_only(self):
+        deltas = ActivityDelta()
+        deltas.diff(self.activity())
+        delta = deltas.diff(self.activity(title="util.py", duration_sec=0))
+        self.assertEqual(delta, {"title": "util.py", "duration_sec": 0})
+
+    def test_reset(self):
+        deltas = ActivityDelta()
+        deltas.diff(self.activity())
+        deltas.reset()
+        self.assertIn("app", deltas.diff(self.activity()))
+
+
+if __name__ == "__main__":
+    unittest.main()
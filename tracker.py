@@ -1,55 +1,50 @@
 from PyQt6.QtCore import QObject
-from typing import Tuple
-from datetime import datetime
-import win32gui
-import win32process
-import psutil
-import ctypes
+import time
+from typing import Optional, Tuple
 
+from core.probes import ProbeSample, WindowProbe, select_probe
 
-class ActiveWindowTracker(QObject):
 
+class ActiveWindowTracker(QObject):
+    """
+    Тонка обгортка над платформною пробою (core.probes): Windows, X11
+    або synthetic обирається один раз при створенні.
+    """
 
     IDLE_THRESHOLD_SECONDS = 300  # 5 хвилин без активності = idle
 
-    def get_active_window_info(self) -> Tuple[str, str]:
- 
-        hwnd = win32gui.GetForegroundWindow()
-        title = win32gui.GetWindowText(hwnd)
+    # Скільки секунд знімок вважається "поточним тіком": get_active_window_info,
+    # is_user_idle та is_foreground_fullscreen в межах тіку ділять одне опитування
+    SAMPLE_MAX_AGE_SECONDS = 1.0
+
+    def __init__(self, probe: Optional[WindowProbe] = None):
+        super().__init__()
+        self.probe = probe or select_probe()
+        self._sample: Optional[ProbeSample] = None
+        self._sampled_at: float = 0.0
+
+    def sample(self) -> ProbeSample:
+        """Нове опитування: вікно, процес, idle та fullscreen за один раз."""
+        self._sample = self.probe.sample()
+        self._sampled_at = time.monotonic()
+        return self._sample
+
+    def _tick_sample(self) -> ProbeSample:
+        if (
+            self._sample is None
+            or time.monotonic() - self._sampled_at > self.SAMPLE_MAX_AGE_SECONDS
+        ):
+            return self.sample()
+        return self._sample
 
-        app = "unknown"
-        try:
-            pid = win32process.GetWindowThreadProcessId(hwnd)[1]
-            process = psutil.Process(pid)
-            app = process.name()
-        except Exception:
-            pass
-
-        return app, title
+    def get_active_window_info(self) -> Tuple[str, str]:
+        sample = self._tick_sample()
+        return sample.app, sample.title
 
     # ---- Idle detection ----
 
-    class _LASTINPUTINFO(ctypes.Structure):
-        _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_ulong)]
-
-    class _RECT(ctypes.Structure):
-        _fields_ = [
-            ("left", ctypes.c_long),
-            ("top", ctypes.c_long),
-            ("right", ctypes.c_long),
-            ("bottom", ctypes.c_long),
-        ]
-
     def get_idle_time_seconds(self) -> int:
-
-        last_input_info = self._LASTINPUTINFO()
-        last_input_info.cbSize = ctypes.sizeof(last_input_info)
-
-        if ctypes.windll.user32.GetLastInputInfo(ctypes.byref(last_input_info)):
-            millis = ctypes.windll.kernel32.GetTickCount() - last_input_info.dwTime
-            return int(millis / 1000)
-
-        return 0
+        return self._tick_sample().idle_sec
 
     def is_user_idle(self, timeout_sec=None):
 
@@ -59,23 +54,6 @@ class ActiveWindowTracker(QObject):
             timeout_sec = self.IDLE_THRESHOLD_SECONDS
 
         return idle_sec >= timeout_sec
-    
-    def is_foreground_fullscreen(self) -> bool:
-
-        hwnd = win32gui.GetForegroundWindow()
-        if not hwnd:
-            return False
-
-        rect = self._RECT()
-        if not ctypes.windll.user32.GetWindowRect(hwnd, ctypes.byref(rect)):
-            return False
-
-        width = rect.right - rect.left
-        height = rect.bottom - rect.top
-
-        screen_w = ctypes.windll.user32.GetSystemMetrics(0)
-        screen_h = ctypes.windll.user32.GetSystemMetrics(1)
-
-        # Невелика похибка на рамки / панель задач
-        return width >= screen_w - 1 and height >= screen_h - 1
 
+    def is_foreground_fullscreen(self) -> bool:
+        return self._tick_sample().fullscreen